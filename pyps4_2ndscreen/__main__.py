@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 """Main File for pyps4-2ndscreen."""
-import curses
 import logging
 import time
 from collections import OrderedDict
@@ -9,11 +8,15 @@ import click
 
 from .credential import DEFAULT_DEVICE_NAME
 from .ddp import DDP_PORT, DEFAULT_UDP_PORT
-from .helpers import Helper
+from .helpers import Helper, get_config_store
+from .lazy import lazy_import
 from .ps4 import NotReady, Ps4Legacy
 
 _LOGGER = logging.getLogger(__name__)
 
+# Only needed for interactive mode.
+curses = lazy_import('curses')
+
 
 def _get_ps4(
     ip_address=None,
@@ -22,7 +25,7 @@ def _get_ps4(
     port=DEFAULT_UDP_PORT
 ):
 
-    helper = Helper()
+    helper = Helper(get_config_store())
 
     if credentials is None:
         data = helper.load_files('credentials')
@@ -36,7 +39,7 @@ def _get_ps4(
     if ip_address is not None and credentials is not None:
         return Ps4Legacy(ip_address, credentials, port=port)
 
-    helper = Helper()
+    helper = Helper(get_config_store())
     is_data = helper.check_data('ps4')
     if not is_data:
         prompt_configure = input(
@@ -59,7 +62,7 @@ def _get_ps4(
 
 
 def _check_creds(credentials):
-    helper = Helper()
+    helper = Helper(get_config_store())
     existing_creds = False
     if credentials is None:
         _data = helper.load_files('credentials')
@@ -196,12 +199,14 @@ def link(ctx, ip_address=None, credentials=None):
 
 # pylint: disable=too-many-return-statements
 def _link_func(ip_address, credentials, port):
-    helper = Helper()
+    helper = Helper(get_config_store())
     credentials = _check_creds(credentials)
     if credentials is None:
         return False
 
-    device_list = _search_func(port=port)
+    # Wait for all responses unless linking a known address.
+    expected = [ip_address] if ip_address is not None else []
+    device_list = _search_func(port=port, expected=expected)
     if not device_list:
         return False
     if ip_address not in device_list and ip_address is not None:
@@ -250,11 +255,12 @@ def search(ctx) -> list:
     _search_func(port)
 
 
-def _search_func(port=DEFAULT_UDP_PORT):
-    helper = Helper()
-    devices = helper.has_devices(port=port)
+def _search_func(port=DEFAULT_UDP_PORT, expected=None):
+    helper = Helper(get_config_store())
+    devices = helper.has_devices(port=port, expected=expected)
     device_list = [device["host-ip"] for device in devices]
-    print("Found {} devices:".format(len(device_list)))
+    print("Found {} devices in {:.2f} seconds:".format(
+        len(device_list), helper.search_time))
     for ip_address in device_list:
         print(ip_address)
     return device_list
@@ -270,7 +276,7 @@ def status(ctx, ip_address=None):
     d_status = {}
     if ip_address is None:
         print("Getting status for any...")
-        helper = Helper()
+        helper = Helper(get_config_store())
         devices = helper.has_devices(ip_address, port=port)
         if devices:
             for d_status in devices:
@@ -303,7 +309,7 @@ def credential():
 
 
 def _credentials_func():
-    helper = Helper()
+    helper = Helper(get_config_store())
     is_creds = helper.check_data('credentials')
     if is_creds:
         if not _overwrite_creds():
@@ -437,17 +443,16 @@ def _show_mapping(stdscr, key_mapping):
 
 
 def _handle_status(stdscr, _status, key_mapping):
-    helper = Helper()
-    games = helper.load_files('games')
     _write_str(
         stdscr,
         "Status Updated: {} | {}\n".format(
             _status.get('status'), _status.get('running-app-name')), 2)
     title_id = _status.get('running-app-titleid')
     if title_id is not None:
-        if title_id not in games:
-            games[title_id] = _status.get('running-app-name')
-            helper.save_files(games, 'games')
+        helper = Helper(get_config_store())
+        if helper.store.get('games', title_id) is None:
+            helper.store.update(
+                'games', {title_id: _status.get('running-app-name')})
     cur_pos = stdscr.getyx()
     _init_window(stdscr, _status, key_mapping)
     stdscr.move(cur_pos[0], cur_pos[1])
@@ -455,7 +460,7 @@ def _handle_status(stdscr, _status, key_mapping):
 
 def _show_game_mapping():
     mapping = {}
-    helper = Helper()
+    helper = Helper(get_config_store())
     games = helper.load_files('games')
     if games:
         g_index = 1
@@ -0,0 +1,173 @@
+"""Offline title catalog packs."""
+import logging
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, Optional
+
+from .media_art import ResultItem
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"PS4CAT01"
+HEADER = struct.Struct("<8sI")
+INDEX_ENTRY = struct.Struct("<16sII")
+KEY_SIZE = 16
+SEPARATOR = b"\x1f"
+
+
+def _pack_record(item: ResultItem) -> bytes:
+    """Return record bytes of name, game type and art reference."""
+    return SEPARATOR.join(
+        (value or "").encode("utf-8")
+        for value in (item.name, item.game_type, item.cover_art)
+    )
+
+
+def write_catalog(path: str, items: Iterable[ResultItem]) -> int:
+    """Write catalog pack. Return number of titles written.
+
+    The file is a header, an index sorted by title ID and the records.
+
+    :param path: Path of catalog file
+    :param items: Results to write; Last item for a title ID is kept
+    """
+    titles = {}
+    for item in items:
+        key = item.sku_id.encode("utf-8")
+        if len(key) > KEY_SIZE:
+            _LOGGER.warning("Skipping invalid title ID: %s", item.sku_id)
+            continue
+        titles[key] = item
+    index = bytearray()
+    data = bytearray()
+    for key in sorted(titles):
+        record = _pack_record(titles[key])
+        index += INDEX_ENTRY.pack(key, len(data), len(record))
+        data += record
+    temp_path = "{}.tmp".format(path)
+    with open(temp_path, "wb") as _w_file:
+        _w_file.write(HEADER.pack(MAGIC, len(titles)))
+        _w_file.write(index)
+        _w_file.write(data)
+    os.replace(temp_path, path)
+    return len(titles)
+
+
+def export_catalog(path: str, metadata_cache) -> int:
+    """Write catalog pack from metadata cache. Return number of titles.
+
+    :param path: Path of catalog file
+    :param metadata_cache: :class: `pyps4_2ndscreen.media_cache.MetadataCache`
+    """
+    return write_catalog(
+        path, (item for _, _, item in metadata_cache.items()))
+
+
+def import_catalog(path: str, metadata_cache, region: str) -> int:
+    """Add titles in catalog pack to metadata cache. Return number added.
+
+    :param path: Path of catalog file
+    :param metadata_cache: :class: `pyps4_2ndscreen.media_cache.MetadataCache`
+    :param region: Region name to add titles for
+    """
+    count = 0
+    with Catalog(path) as catalog:
+        for item in catalog:
+            metadata_cache.set(item.sku_id, region, item)
+            count += 1
+    return count
+
+
+class Catalog:
+    """Read only catalog pack. Index is memory mapped.
+
+    :param path: Path of catalog file
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as _r_file:
+            self._map = mmap.mmap(_r_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError("Invalid catalog file: {}".format(self.path))
+        self._data_start = HEADER.size + self._count * INDEX_ENTRY.size
+
+    def __repr__(self):
+        return "<{}.{} path={} titles={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.path,
+            self._count,
+        )
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, title_id: str):
+        return self._find(title_id) is not None
+
+    def __iter__(self) -> Iterator[ResultItem]:
+        for position in range(self._count):
+            key, offset, length = self._entry(position)
+            title_id = key.rstrip(b"\x00").decode("utf-8")
+            yield self._item(title_id, offset, length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _entry(self, position: int) -> tuple:
+        return INDEX_ENTRY.unpack_from(
+            self._map, HEADER.size + position * INDEX_ENTRY.size)
+
+    def _find(self, title_id: str) -> Optional[tuple]:
+        """Binary search index. Return offset and length of record."""
+        key = title_id.encode("utf-8")
+        if len(key) > KEY_SIZE:
+            return None
+        key = key.ljust(KEY_SIZE, b"\x00")
+        index = self._map
+        size = INDEX_ENTRY.size
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start = HEADER.size + middle * size
+            found = index[start:start + KEY_SIZE]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return self._entry(middle)[1:]
+        return None
+
+    def _item(self, title_id: str, offset: int, length: int) -> ResultItem:
+        start = self._data_start + offset
+        name, game_type, cover_art = (
+            value.decode("utf-8") or None
+            for value in self._map[start:start + length].split(SEPARATOR)
+        )
+        data = {
+            "title_name": name,
+            "gameContentTypesList": [{"key": game_type}],
+        }
+        return ResultItem(title_id, cover_art, data)
+
+    def get(self, title_id: str) -> Optional[ResultItem]:
+        """Return title. Return None if not in catalog.
+
+        :param title_id: Title ID of title
+        """
+        found = self._find(title_id)
+        if found is None:
+            return None
+        return self._item(title_id, *found)
+
+    def close(self):
+        """Close catalog."""
+        self._map.close()
@@ -0,0 +1,189 @@
+"""Queue of pending commands for PS4 devices."""
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PendingCommand:
+    """Command waiting to be sent to PS4.
+
+    :param name: Name of command
+    :param args: Args to pass to command
+    :param expires: Timestamp after which command is discarded
+    """
+
+    __slots__ = ('name', 'args', 'expires')
+
+    def __init__(
+            self, name: str, args: tuple = (),
+            expires: Optional[float] = None):
+        self.name = name
+        self.args = tuple(args)
+        self.expires = expires
+
+    def __repr__(self):
+        return "<{}.{} name={} args={} expires={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.name,
+            self.args,
+            self.expires,
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, PendingCommand):
+            return NotImplemented
+        return (self.name, self.args, self.expires) == \
+            (other.name, other.args, other.expires)
+
+    @property
+    def expired(self) -> bool:
+        """Return True if command has expired."""
+        return self.expires is not None and time.time() > self.expires
+
+    def as_dict(self) -> dict:
+        """Return dict of command."""
+        return {'name': self.name, 'args': list(self.args),
+                'expires': self.expires}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Return command from dict."""
+        return cls(data['name'], data.get('args', ()), data.get('expires'))
+
+
+class CommandQueue:
+    """Ordered queue of commands to send once PS4 is logged in.
+
+    Commands should be removed only after they are sent, so commands not
+    sent are kept for the next connection.
+
+    :param path: File to persist pending commands to; Not persisted if None
+    :param ttl: Default seconds before a command expires; Never if None
+    """
+
+    def __init__(
+            self, path: Optional[str] = None, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self._commands = deque()
+        if self.path is not None:
+            self._load()
+
+    def __repr__(self):
+        return "<{}.{} pending={} path={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            len(self._commands),
+            self.path,
+        )
+
+    def __len__(self):
+        self._discard_expired()
+        return len(self._commands)
+
+    def __iter__(self):
+        return iter(list(self._commands))
+
+    def put(
+            self, name: str, *args,
+            ttl: Optional[float] = None) -> PendingCommand:
+        """Add command to end of queue. Return command.
+
+        :param name: Name of command
+        :param args: Args to pass to command
+        :param ttl: Seconds before command expires; Uses queue default if None
+        """
+        if ttl is None:
+            ttl = self.ttl
+        expires = None if ttl is None else time.time() + ttl
+        command = PendingCommand(name, args, expires)
+        self._commands.append(command)
+        _LOGGER.debug("Queued command: %s", command)
+        self._save()
+        return command
+
+    def peek(self) -> Optional[PendingCommand]:
+        """Return first command without removing it. Expired are discarded.
+
+        Returns None if queue is empty.
+        """
+        self._discard_expired()
+        return self._commands[0] if self._commands else None
+
+    def remove(self, command: PendingCommand):
+        """Remove command from queue.
+
+        :param command: Command to remove
+        """
+        try:
+            self._commands.remove(command)
+        except ValueError:
+            return
+        self._save()
+
+    def pop_all(self) -> list:
+        """Remove and return all commands in order. Expired are discarded."""
+        commands = []
+        while self._commands:
+            command = self._commands.popleft()
+            if command.expired:
+                _LOGGER.info("Discarding expired command: %s", command.name)
+                continue
+            commands.append(command)
+        self._save()
+        return commands
+
+    def _discard_expired(self):
+        """Remove expired commands."""
+        expired = [command for command in self._commands if command.expired]
+        if not expired:
+            return
+        for command in expired:
+            _LOGGER.info("Discarding expired command: %s", command.name)
+            self._commands.remove(command)
+        self._save()
+
+    def clear(self):
+        """Remove all commands."""
+        self._commands.clear()
+        self._save()
+
+    def _load(self):
+        """Load commands from file."""
+        try:
+            with open(self.path, "r") as _r_file:
+                data = json.load(_r_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as error:
+            _LOGGER.error(
+                "Could not load command queue: %s; %s", self.path, error)
+            return
+        for item in data:
+            try:
+                command = PendingCommand.from_dict(item)
+            except (KeyError, TypeError):
+                _LOGGER.warning("Skipping invalid command: %s", item)
+                continue
+            if not command.expired:
+                self._commands.append(command)
+
+    def _save(self):
+        """Save commands to file atomically."""
+        if self.path is None:
+            return
+        data = [command.as_dict() for command in self._commands]
+        temp_path = "{}.tmp".format(self.path)
+        try:
+            with open(temp_path, "w") as _w_file:
+                json.dump(fp=_w_file, obj=data)
+            os.replace(temp_path, self.path)
+        except OSError as error:
+            _LOGGER.error(
+                "Could not save command queue: %s; %s", self.path, error)
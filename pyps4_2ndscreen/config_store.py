@@ -0,0 +1,269 @@
+"""Persistent store of consoles, credentials and games."""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from .paths import DEFAULT_PATH
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_FILE = DEFAULT_PATH / ".ps4_config.db"
+DB_TIMEOUT = 5
+
+MIGRATED_KEY = "migrated"
+# Mtime and size of JSON file when last imported.
+IMPORTED_KEY = "imported_{}"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "file_type TEXT NOT NULL, "
+    "key TEXT NOT NULL, "
+    "value TEXT NOT NULL, "
+    "PRIMARY KEY (file_type, key))",
+    "CREATE TABLE IF NOT EXISTS meta ("
+    "key TEXT PRIMARY KEY, "
+    "value TEXT NOT NULL)",
+)
+
+
+class ConfigStore:
+    """SQLite backed store of configuration data.
+
+    Data is grouped by file type, 'ps4', 'credentials' or 'games', and
+    each group is read and written as a dict like the JSON files.
+    Writes are transactional so the store is safe to share between
+    processes. Existing JSON files are imported when first opened. If a
+    JSON file is changed afterwards, its entries are imported again the
+    next time the store is opened and replace those in the store.
+    Loaded data is cached until the database is changed. The store may be
+    used from more than one thread.
+
+    :param path: Path of database file
+    :param json_files: Dict of file type to JSON file path to import
+    """
+
+    def __init__(
+            self, path: Optional[str] = None,
+            json_files: Optional[dict] = None):
+        if path is None:
+            path = str(DEFAULT_CONFIG_FILE)
+        self.path = str(path)
+        self.json_files = json_files or {}
+        self._conn = None
+        self._cache = {}
+        self._data_version = None
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return "<{}.{} path={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.path,
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return connection. Open database and migrate if needed."""
+        with self._lock:
+            if self._conn is None:
+                if self.path != ":memory:":
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(
+                    self.path, timeout=DB_TIMEOUT, isolation_level=None,
+                    check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "PRAGMA busy_timeout={}".format(DB_TIMEOUT * 1000))
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                self._conn = conn
+                self._migrate()
+            return self._conn
+
+    def _transaction(self, statements: list):
+        """Execute statements in one write transaction."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement, params in statements:
+                    conn.execute(statement, params)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._cache.clear()
+
+    def _migrate(self):
+        """Import JSON files once. Import again if changed since."""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key=?",
+                (MIGRATED_KEY,)).fetchone()
+            if row is None:
+                for file_type, file_name in self.json_files.items():
+                    self._import(conn, file_type, file_name, replace=False)
+                conn.execute(
+                    "INSERT INTO meta VALUES (?, ?)", (MIGRATED_KEY, "1"))
+                if self.json_files:
+                    _LOGGER.info(
+                        "Imported config files to: %s", self.path)
+            else:
+                for file_type, file_name in self.json_files.items():
+                    self._import_changed(conn, file_type, file_name)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _import(
+            self, conn: sqlite3.Connection, file_type: str, file_name: str,
+            replace: bool):
+        """Import JSON file and record its mtime and size."""
+        statement = "INSERT OR {} INTO entries VALUES (?, ?, ?)".format(
+            "REPLACE" if replace else "IGNORE")
+        for key, value in _read_json(file_name).items():
+            conn.execute(statement, (file_type, key, json.dumps(value)))
+        conn.execute(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            (IMPORTED_KEY.format(file_type),
+             json.dumps(_stat_key(file_name))))
+
+    def _import_changed(
+            self, conn: sqlite3.Connection, file_type: str, file_name: str):
+        """Import JSON file if changed since last imported."""
+        key = _stat_key(file_name)
+        if key is None:
+            return
+        row = conn.execute(
+            "SELECT value FROM meta WHERE key=?",
+            (IMPORTED_KEY.format(file_type),)).fetchone()
+        if row is None:
+            # Imported by earlier version; Changes since are unknown.
+            conn.execute(
+                "INSERT INTO meta VALUES (?, ?)",
+                (IMPORTED_KEY.format(file_type), json.dumps(key)))
+        elif json.loads(row[0]) != key:
+            self._import(conn, file_type, file_name, replace=True)
+            _LOGGER.info("Imported changes of: %s", file_name)
+
+    def load(self, file_type: str) -> dict:
+        """Return all data of file type.
+
+        :param file_type: Type of file
+        """
+        with self._lock:
+            conn = self._connection()
+            # Changes when another connection commits to the database.
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                self._cache.clear()
+                self._data_version = version
+            data = self._cache.get(file_type)
+            if data is None:
+                rows = conn.execute(
+                    "SELECT key, value FROM entries WHERE file_type=? "
+                    "ORDER BY rowid", (file_type,)).fetchall()
+                data = {key: json.loads(value) for key, value in rows}
+                self._cache[file_type] = data
+            return dict(data)
+
+    def get(self, file_type: str, key: str, default: Any = None) -> Any:
+        """Return value of key. Return default if missing.
+
+        :param file_type: Type of file
+        :param key: Key of value
+        :param default: Value to return if key is missing
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM entries WHERE file_type=? AND key=?",
+                (file_type, key)).fetchone()
+            if row is None:
+                return default
+            return json.loads(row[0])
+
+    def has_data(self, file_type: str) -> bool:
+        """Return True if file type has any data.
+
+        :param file_type: Type of file
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM entries WHERE file_type=? LIMIT 1",
+                (file_type,)).fetchone()
+            return row is not None
+
+    def update(self, file_type: str, data: dict):
+        """Add or replace keys in data. Other keys are kept.
+
+        :param file_type: Type of file
+        :param data: Dict of keys and values to save
+        """
+        self._transaction([
+            ("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+             (file_type, key, json.dumps(value)))
+            for key, value in data.items()
+        ])
+
+    def replace(self, file_type: str, data: dict):
+        """Replace all data of file type. Keys not in data are removed.
+
+        :param file_type: Type of file
+        :param data: Dict of keys and values to save
+        """
+        self._transaction(
+            [("DELETE FROM entries WHERE file_type=?", (file_type,))] + [
+                ("INSERT INTO entries VALUES (?, ?, ?)",
+                 (file_type, key, json.dumps(value)))
+                for key, value in data.items()
+            ])
+
+    def delete(self, file_type: str, key: str):
+        """Remove key.
+
+        :param file_type: Type of file
+        :param key: Key to remove
+        """
+        self._transaction([(
+            "DELETE FROM entries WHERE file_type=? AND key=?",
+            (file_type, key))])
+
+    def close(self):
+        """Close database."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._cache.clear()
+            self._data_version = None
+
+
+def _stat_key(file_name: str) -> Optional[list]:
+    """Return list of mtime and size of file. Return None if missing."""
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_json(file_name: str) -> dict:
+    """Return data of JSON file. Return empty dict if unreadable."""
+    if not os.path.isfile(file_name):
+        return {}
+    try:
+        with open(file_name, "r") as _r_file:
+            data = json.load(_r_file)
+    except (OSError, ValueError) as error:
+        _LOGGER.warning("Could not import %s: %s", file_name, error)
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return data
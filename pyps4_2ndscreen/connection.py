@@ -9,11 +9,15 @@ import time
 from typing import Optional, Union, cast
 
 from async_timeout import timeout
-from construct import Bytes, Const, Container, Int32ul, Padding, Struct
-from Cryptodome.Cipher import AES, PKCS1_OAEP
-from Cryptodome.PublicKey import RSA
 
 from .errors import PSConnectionError
+from .lazy import lazy_import
+
+# Loaded on first use to keep imports fast.
+construct = lazy_import('construct')
+AES = lazy_import('Cryptodome.Cipher.AES')
+PKCS1_OAEP = lazy_import('Cryptodome.Cipher.PKCS1_OAEP')
+RSA = lazy_import('Cryptodome.PublicKey.RSA')
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -41,7 +45,7 @@ PUBLIC_KEY = (
     '-----END PUBLIC KEY-----')
 
 
-def _get_public_key_rsa() -> RSA.RsaKey:
+def _get_public_key_rsa() -> 'RSA.RsaKey':
     """Return RSA Key."""
     key = RSA.importKey(PUBLIC_KEY)
     return key.publickey()
@@ -85,25 +89,25 @@ def _handle_response(command: str, msg: bytes) -> bool:
 
 def _get_hello_request() -> bytes:
     """Return hello request packet."""
-    fmt = Struct(
-        'length' / Const(b'\x1c\x00\x00\x00'),
-        'type' / Const(b'\x70\x63\x63\x6f'),
-        'version' / Const(b'\x00\x00\x02\x00'),
-        'dummy' / Padding(16),
+    fmt = construct.Struct(
+        'length' / construct.Const(b'\x1c\x00\x00\x00'),
+        'type' / construct.Const(b'\x70\x63\x63\x6f'),
+        'version' / construct.Const(b'\x00\x00\x02\x00'),
+        'dummy' / construct.Padding(16),
     )
 
     msg = fmt.build({})
     return msg
 
 
-def _parse_hello_request(msg: bytes) -> Container:
+def _parse_hello_request(msg: bytes) -> 'construct.Container':
     """Parse hello response packet."""
-    fmt = Struct(
-        'length' / Int32ul,
-        'type' / Int32ul,
-        'version' / Int32ul,
-        'dummy' / Bytes(8),
-        'seed' / Bytes(16),
+    fmt = construct.Struct(
+        'length' / construct.Int32ul,
+        'type' / construct.Int32ul,
+        'version' / construct.Int32ul,
+        'dummy' / construct.Bytes(8),
+        'seed' / construct.Bytes(16),
     )
 
     data = fmt.parse(msg)
@@ -112,11 +116,11 @@ def _parse_hello_request(msg: bytes) -> Container:
 
 def _get_handshake_request(seed: bytes) -> bytes:
     """Return handshake request from received seed."""
-    fmt = Struct(
-        'length' / Const(b'\x18\x01\x00\x00'),
-        'type' / Const(b'\x20\x00\x00\x00'),
-        'key' / Bytes(256),
-        'seed' / Bytes(16),
+    fmt = construct.Struct(
+        'length' / construct.Const(b'\x18\x01\x00\x00'),
+        'type' / construct.Const(b'\x20\x00\x00\x00'),
+        'key' / construct.Bytes(256),
+        'seed' / construct.Bytes(16),
     )
 
     recipient_key = _get_public_key_rsa()
@@ -137,16 +141,16 @@ def _get_login_request(
     :param name: Name that will be used for model and app_label
     :param pin: 8 digit pin as str
     """
-    fmt = Struct(
-        'length' / Const(b'\x80\x01\x00\x00'),
-        'type' / Const(b'\x1e\x00\x00\x00'),
-        'pass_code' / Const(b'\x00\x00\x00\x00'),
-        'magic_number' / Const(b'\x01\x02\x00\x00'),
-        'account_id' / Bytes(64),
-        'app_label' / Bytes(256),
-        'os_version' / Bytes(16),
-        'model' / Bytes(16),
-        'pin_code' / Bytes(16),
+    fmt = construct.Struct(
+        'length' / construct.Const(b'\x80\x01\x00\x00'),
+        'type' / construct.Const(b'\x1e\x00\x00\x00'),
+        'pass_code' / construct.Const(b'\x00\x00\x00\x00'),
+        'magic_number' / construct.Const(b'\x01\x02\x00\x00'),
+        'account_id' / construct.Bytes(64),
+        'app_label' / construct.Bytes(256),
+        'os_version' / construct.Bytes(16),
+        'model' / construct.Bytes(16),
+        'pin_code' / construct.Bytes(16),
     )
 
     pin = pin.encode()
@@ -171,10 +175,10 @@ def _get_login_request(
 
 def _get_standby_request() -> bytes:
     """Return standby packet."""
-    fmt = Struct(
-        'length' / Const(b'\x08\x00\x00\x00'),
-        'type' / Const(b'\x1a\x00\x00\x00'),
-        'dummy' / Padding(8),
+    fmt = construct.Struct(
+        'length' / construct.Const(b'\x08\x00\x00\x00'),
+        'type' / construct.Const(b'\x1a\x00\x00\x00'),
+        'dummy' / construct.Padding(8),
     )
 
     msg = fmt.build({})
@@ -186,11 +190,11 @@ def _get_boot_request(title_id: str) -> bytes:
 
     :param title_id: Title ID to boot; CUSA00000
     """
-    fmt = Struct(
-        'length' / Const(b'\x18\x00\x00\x00'),
-        'type' / Const(b'\x0a\x00\x00\x00'),
-        'title_id' / Bytes(16),
-        'dummy' / Padding(8),
+    fmt = construct.Struct(
+        'length' / construct.Const(b'\x18\x00\x00\x00'),
+        'type' / construct.Const(b'\x0a\x00\x00\x00'),
+        'title_id' / construct.Bytes(16),
+        'dummy' / construct.Padding(8),
     )
 
     msg = fmt.build({'title_id': title_id.encode().ljust(16, b'\x00')})
@@ -219,11 +223,11 @@ def _get_remote_control_request(operation: int, hold_time: int) -> bytes:
 
 def _get_remote_control_msg(operation: int, hold_time: int) -> bytes:
     """Return remote control command msg."""
-    fmt = Struct(
-        'length' / Const(b'\x10\x00\x00\x00'),
-        'type' / Const(b'\x1c\x00\x00\x00'),
-        'op' / Int32ul,
-        'hold_time' / Int32ul,
+    fmt = construct.Struct(
+        'length' / construct.Const(b'\x10\x00\x00\x00'),
+        'type' / construct.Const(b'\x1c\x00\x00\x00'),
+        'op' / construct.Int32ul,
+        'hold_time' / construct.Int32ul,
     )
 
     msg = fmt.build({'op': operation, 'hold_time': hold_time})
@@ -250,11 +254,11 @@ def _get_remote_control_key_off_request(hold_time: Optional[int] = 0) -> bytes:
 
 def _get_status_ack() -> bytes:
     """Return Status Ack packet."""
-    fmt = Struct(
-        'length' / Const(b'\x0c\x00\x00\x00'),
-        'type' / Const(b'\x14\x00\x00\x00'),
-        'status' / Const(b'\x00\x00\x00\x00'),
-        'dummy' / Padding(4),
+    fmt = construct.Struct(
+        'length' / construct.Const(b'\x0c\x00\x00\x00'),
+        'type' / construct.Const(b'\x14\x00\x00\x00'),
+        'status' / construct.Const(b'\x00\x00\x00\x00'),
+        'dummy' / construct.Padding(4),
     )
 
     msg = fmt.build({})
@@ -497,20 +501,9 @@ class TCPProtocol(asyncio.Protocol):
         self.ps4._connected = True  # noqa: pylint: disable=protected-access
         _LOGGER.debug("PS4 Transport Connected @ %s", self.ps4.host)
 
-        if self.ps4.task_queue is not None:
-            valid_initial_tasks = {'start_title': self.start_title,
-                                   "remote_control": self.remote_control}
-            args = None
-            initial_task = self.ps4.task_queue
-            self.ps4.task_queue = None
-
-            if self.ps4._power_on:  # noqa: pylint: disable=protected-access
-                args = initial_task[1:]
-                initial_task = initial_task[0]
-                task = valid_initial_tasks.get(initial_task)
-                if task is not None:
-                    _LOGGER.info("Queued command: %s", initial_task)
-                    asyncio.ensure_future(task(*args))
+        if self.ps4.task_queue:
+            power_on = self.ps4._power_on  # noqa: pylint: disable=protected-access
+            asyncio.ensure_future(self._run_queued_tasks(power_on))
 
         #  Schedule to close after some time as PS4 doesn't respond.
         self._last_activity = time.time()
@@ -519,6 +512,33 @@ class TCPProtocol(asyncio.Protocol):
             self._timeout_close,
         )
 
+    async def _run_queued_tasks(self, power_on: Optional[bool] = False):
+        """Login and run queued commands in order.
+
+        :param power_on: True if powering on from standby.
+        """
+        valid_tasks = {'start_title': self.start_title,
+                       'remote_control': self.remote_control}
+        task_queue = self.ps4.task_queue
+        # Login is left to queued commands; Login even if they have expired.
+        if not self.ps4.loggedin:
+            await self.login(power_on=power_on, delay=self.ps4.login_delay)
+        # Commands are removed once sent and kept if not logged in.
+        while self.ps4 is not None and self.ps4.loggedin:
+            command = task_queue.peek()
+            if command is None:
+                return
+            task = valid_tasks.get(command.name)
+            if task is None:
+                _LOGGER.warning("Unknown queued command: %s", command.name)
+            else:
+                _LOGGER.info("Queued command: %s", command.name)
+                await task(*command.args)
+            task_queue.remove(command)
+        if task_queue:
+            _LOGGER.warning(
+                "Not logged in; Keeping %s queued commands", len(task_queue))
+
     def data_received(self, data: bytes):
         """Call when data received.
 
@@ -1,8 +1,11 @@
 """Credential fetcher for PS4 2nd Screen app."""
+import asyncio
 import logging
+import secrets
 import socket
 import time
-from typing import Optional
+from collections import namedtuple
+from typing import Iterable, Optional
 
 from .ddp import (DDP_PORT, DDP_TYPE_SEARCH, DDP_TYPE_WAKEUP, DDP_VERSION,
                   UDP_IP)
@@ -18,6 +21,9 @@ REQ_PORT = 997
 PARSE_TYPE_SEARCH = 'search'
 PARSE_TYPE_WAKEUP = 'wakeup'
 
+CredentialResult = namedtuple(
+    'CredentialResult', ['credential', 'address', 'host_id'])
+
 
 class Credentials:
     """The PSN Credentials Service. Masquerades as a PS4 to get credentials.
@@ -117,6 +123,213 @@ class Credentials:
         return None
 
 
+class VirtualConsole:
+    """A PS4 shown to companion apps by the async credential service.
+
+    :param device_name: Name to display as
+    :param host_id: Host-id to display; Random if None
+    :param host: Local IP address to listen on
+    """
+
+    def __init__(
+            self,
+            device_name: Optional[str] = DEFAULT_DEVICE_NAME,
+            host_id: Optional[str] = None,
+            host: str = UDP_IP):
+        if host_id is None:
+            host_id = secrets.token_hex(6).upper()
+        self.device_name = device_name
+        self.host_id = host_id
+        self.host = host
+        self.response = {
+            'host-id': host_id,
+            'host-type': 'PS4',
+            'host-name': device_name,
+            'host-request-port': REQ_PORT
+        }
+        self.message = get_ddp_message(STANDBY, self.response).encode('utf-8')
+
+    def __repr__(self):
+        return "<{}.{} name={} host_id={} host={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.device_name,
+            self.host_id,
+            self.host,
+        )
+
+
+class CredentialProtocol(asyncio.DatagramProtocol):
+    """Answers searches for virtual consoles and captures credentials.
+
+    :param consoles: Virtual consoles listening on this endpoint
+    :param queue: Queue to put :class:`CredentialResult` in
+    """
+
+    def __init__(self, consoles: list, queue: asyncio.Queue):
+        super().__init__()
+        self.consoles = consoles
+        self.queue = queue
+        self.credentials = set()
+        self._transport = None
+
+    def connection_made(self, transport):
+        """On Connection."""
+        self._transport = transport
+        sock = transport.get_extra_info('socket')
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+    def datagram_received(self, data, addr):
+        """When data is received."""
+        try:
+            parse_type = parse_ddp_response(data)
+        except (UnknownDDPResponse, UnicodeDecodeError):
+            _LOGGER.warning("Received unknown DDP Response")
+            return
+        if parse_type == PARSE_TYPE_SEARCH:
+            _LOGGER.debug("Search from: %s", addr)
+            for console in self.consoles:
+                self._transport.sendto(console.message, addr)
+        elif parse_type == PARSE_TYPE_WAKEUP:
+            _LOGGER.debug("Wakeup from: %s", addr)
+            try:
+                creds = get_creds(data)
+            except KeyError:
+                _LOGGER.warning("Wakeup from %s has no credential", addr)
+                return
+            # Apps may resend wakeup. Only report each credential once.
+            if creds in self.credentials:
+                return
+            self.credentials.add(creds)
+            # Wakeup does not name a console unless only one listens here.
+            host_id = None
+            if len(self.consoles) == 1:
+                host_id = self.consoles[0].host_id
+            self.queue.put_nowait(CredentialResult(creds, addr, host_id))
+
+    def error_received(self, exc):
+        """Handle Exceptions."""
+        _LOGGER.warning("Error received at Credential Transport: %s", exc)
+
+    def close(self):
+        """Close Transport."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    @property
+    def sockname(self) -> Optional[tuple]:
+        """Return bound address. Return None if not connected."""
+        if self._transport is None:
+            return None
+        return self._transport.get_extra_info('sockname')
+
+
+class AsyncCredentials:
+    """Async PSN Credentials Service.
+
+    Masquerades as one or more PS4s and answers any number of companion
+    apps at once. Credentials are returned as they are captured.
+    Consoles with different hosts listen on separate endpoints, so the
+    console woken by an app is known.
+
+    :param consoles: Virtual consoles to show; Defaults to one console
+    :param port: Port to listen on
+    """
+
+    def __init__(
+            self,
+            consoles: Optional[Iterable[VirtualConsole]] = None,
+            port: int = DDP_PORT):
+        if consoles is None:
+            consoles = [VirtualConsole(host_id=HOST_ID)]
+        self.consoles = list(consoles)
+        self.port = port
+        self.protocols = []
+        self.queue = None
+
+    def __repr__(self):
+        return "<{}.{} consoles={} port={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            len(self.consoles),
+            self.port,
+        )
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> CredentialResult:
+        return await self.get()
+
+    @property
+    def addresses(self) -> list:
+        """Return list of bound addresses."""
+        return [
+            protocol.sockname
+            for protocol in self.protocols
+            if protocol.sockname is not None
+        ]
+
+    async def start(self) -> bool:
+        """Start listening. Return True if all endpoints started."""
+        loop = asyncio.get_event_loop()
+        self.queue = asyncio.Queue()
+        hosts = {}
+        for console in self.consoles:
+            hosts.setdefault(console.host, []).append(console)
+        for host, consoles in hosts.items():
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind((host, self.port))
+            except socket.error as error:
+                sock.close()
+                self.close()
+                _LOGGER.error(
+                    "Could not bind to %s:%s; "
+                    "Ensure port is accessible and unused, %s",
+                    host, self.port, error)
+                return False
+            sock.setblocking(False)
+            _, protocol = await loop.create_datagram_endpoint(
+                lambda consoles=consoles: CredentialProtocol(
+                    consoles, self.queue),
+                sock=sock,
+            )
+            self.protocols.append(protocol)
+        _LOGGER.info(
+            "Started Credential Service with %s consoles",
+            len(self.consoles))
+        return True
+
+    async def get(self, timeout: Optional[float] = None) -> CredentialResult:
+        """Return next captured credential.
+
+        :param timeout: Timeout in seconds; Waits forever if None
+        """
+        if self.queue is None:
+            raise CredentialTimeout("Credential service is not started")
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.info("Credential service has timed out with no response")
+            raise CredentialTimeout from None
+
+    def close(self):
+        """Stop listening."""
+        for protocol in self.protocols:
+            protocol.close()
+        self.protocols = []
+
+
 def get_ddp_message(status: str, data: Optional[dict] = None) -> bytes:
     """Return DDP message.
 
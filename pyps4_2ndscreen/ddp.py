@@ -7,8 +7,10 @@ import logging
 import re
 import select
 import socket
+import sqlite3
 import time
-from typing import Optional
+from functools import lru_cache, partial
+from typing import Iterable, Optional, Union
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,11 +28,32 @@ DDP_MSG_TYPES = (DDP_TYPE_SEARCH, DDP_TYPE_LAUNCH, DDP_TYPE_WAKEUP)
 
 DEFAULT_POLL_COUNT = 5
 
+# Max number of credentials to keep encoded messages for.
+MESSAGE_CACHE_SIZE = 1024
+
 DEFAULT_STANDBY_DELAY = 50
 
 STATUS_OK = 200
 STATUS_STANDBY = 620
 
+# Seconds to wait for a PS4 at its last known address.
+UNICAST_TIMEOUT = 1
+HOSTS_FILE_TYPE = 'hosts'
+
+# Min seconds between broadcasts for PS4s that may have moved.
+MOVED_SEARCH_INTERVAL = 30
+
+# Seconds to collect address changes before writing them to store.
+HOST_SAVE_DELAY = 1
+
+# Last known IP address of each host-id. Updated by every DDP response.
+_HOST_IPS = {}
+# Host-id last seen at each IP address.
+_HOST_IDS = {}
+# Address changes not yet written to store.
+_PENDING_HOSTS = {}
+_HOST_STORE = None
+
 
 class DDPProtocol(asyncio.DatagramProtocol):
     """Async UDP Client."""
@@ -43,8 +66,10 @@ class DDPProtocol(asyncio.DatagramProtocol):
         self._transport = None
         self._remote_port = DDP_PORT
         self._local_port = UDP_PORT
-        self._message = get_ddp_search_message()
-        self._standby_start = 0
+        self._message = get_ddp_search_bytes()
+        self._moved_search_time = None
+        self._save_handle = None
+        self.move_callbacks = []
 
     def __repr__(self):
         return (
@@ -71,24 +96,28 @@ class DDPProtocol(asyncio.DatagramProtocol):
         self._local_port = sock.getsockname()[1]
         _LOGGER.debug("PS4 Transport created with port: %s", self.local_port)
 
-    def send_msg(self, ps4, message=None):
-        """Send Message."""
-        # PS4 won't respond to polls right after standby
-        if self.polls_disabled:
-            elapsed = time.time() - self._standby_start
-            seconds = DEFAULT_STANDBY_DELAY - elapsed
-            _LOGGER.debug("Polls disabled for %s seconds", round(seconds, 2))
-            return
-        self._standby_start = 0
+    def send_msg(self, ps4, message: Optional[Union[bytes, str]] = None):
+        """Send Message.
+
+        :param ps4: PS4 object to send to
+        :param message: Encoded message; Defaults to search message
+        """
         if message is None:
+            # PS4 won't respond to polls right after standby
+            if ps4.polls_disabled:
+                elapsed = time.time() - ps4.standby_start
+                seconds = DEFAULT_STANDBY_DELAY - elapsed
+                _LOGGER.debug(
+                    "Polls to %s disabled for %s seconds",
+                    ps4.host, round(seconds, 2))
+                return
             message = self._message
-        sock = self._transport.get_extra_info('socket')
+        elif isinstance(message, str):
+            message = message.encode('utf-8')
         _LOGGER.debug(
             "SENT MSG @ DDP Proto SPORT=%s DEST=%s",
-            sock.getsockname()[1], (ps4.host, self._remote_port))
-        self._transport.sendto(
-            message.encode('utf-8'),
-            (ps4.host, self._remote_port))
+            self._local_port, (ps4.host, self._remote_port))
+        self._transport.sendto(message, (ps4.host, self._remote_port))
 
         # Track polls that were never returned.
         ps4.poll_count += 1
@@ -98,19 +127,44 @@ class DDPProtocol(asyncio.DatagramProtocol):
             if not ps4.unreachable:
                 _LOGGER.info("PS4 @ %s is unreachable", ps4.host)
                 ps4.unreachable = True
+                # The PS4 may have moved to a new address.
+                if get_host_id(ps4.host) is not None:
+                    self._search_moved()
             ps4.status = None
             if ps4.host in self.callbacks:
                 callback = self.callbacks[ps4.host].get(ps4)
                 if callback is not None:
                     callback()
 
+    def _search_moved(self):
+        """Broadcast search for moved PS4s. Rate limited."""
+        now = time.monotonic()
+        if self._moved_search_time is not None and \
+                now - self._moved_search_time < MOVED_SEARCH_INTERVAL:
+            return
+        self._moved_search_time = now
+        self.send_broadcast()
+
+    def send_broadcast(self, message: Optional[bytes] = None):
+        """Send Message to broadcast address. Polls are not tracked.
+
+        :param message: Encoded message; Defaults to search message
+        """
+        if message is None:
+            message = self._message
+        sock = self._transport.get_extra_info('socket')
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        _LOGGER.debug(
+            "SENT BROADCAST @ DDP Proto SPORT=%s DEST=%s",
+            self._local_port, (BROADCAST_IP, self._remote_port))
+        self._transport.sendto(message, (BROADCAST_IP, self._remote_port))
+
     def datagram_received(self, data, addr):
         """When data is received."""
         if data is not None:
-            sock = self._transport.get_extra_info('socket')
             _LOGGER.debug(
                 "RECV MSG @ DDP Proto DPORT=%s SRC=%s",
-                sock.getsockname()[1], addr)
+                self._local_port, addr)
             self._handle(data, addr)
 
     def _handle(self, data, addr):
@@ -118,6 +172,13 @@ class DDPProtocol(asyncio.DatagramProtocol):
         data[u'host-ip'] = addr[0]
 
         address = addr[0]
+        host_id = data.get('host-id')
+        previous = get_host_ip(host_id)
+        if update_host(host_id, address, save=False):
+            self._schedule_save()
+        if previous is not None and previous != address and \
+                previous in self.callbacks and address not in self.callbacks:
+            self._move_callbacks(previous, address)
 
         if address in self.callbacks:
             for ps4, callback in self.callbacks[address].items():
@@ -127,17 +188,60 @@ class DDPProtocol(asyncio.DatagramProtocol):
                 ps4.status = data
                 if old_status != data:
                     _LOGGER.debug("Status: %s", ps4.status)
+                    title_id = data.get('running-app-titleid')
+                    if title_id and (
+                            old_status is None or
+                            old_status.get('running-app-titleid') != title_id):
+                        # Start store lookup before callback runs.
+                        ps4.title_changed(title_id)
                     callback()
                     # Status changed from OK to Standby/Turned Off
                     if old_status is not None and \
                             old_status.get('status_code') == STATUS_OK and \
                             ps4.status.get('status_code') == STATUS_STANDBY:
-                        self._standby_start = time.time()
+                        ps4.standby_start = time.time()
                         _LOGGER.debug(
                             "Status changed from OK to Standby."
                             "Disabling polls for %s seconds",
                             DEFAULT_STANDBY_DELAY)
 
+    def _move_callbacks(self, previous: str, address: str):
+        """Move PS4 objects at previous address to new address."""
+        callbacks = self.callbacks.pop(previous)
+        for ps4 in callbacks:
+            ps4.host = address
+        self.callbacks[address] = callbacks
+        _LOGGER.info("PS4 @ %s moved to %s", previous, address)
+        for ps4 in callbacks:
+            for callback in self.move_callbacks:
+                callback(ps4, previous)
+
+    def add_move_callback(self, callback):
+        """Add callback called when a PS4 moves to a new address.
+
+        :param callback: Callback to call; Takes PS4 object and previous
+            address as args
+        """
+        self.move_callbacks.append(callback)
+
+    def remove_move_callback(self, callback):
+        """Remove move callback."""
+        if callback in self.move_callbacks:
+            self.move_callbacks.remove(callback)
+
+    def _schedule_save(self):
+        """Write host addresses to store later. Changes are batched."""
+        if _HOST_STORE is None or self._save_handle is not None:
+            return
+        loop = asyncio.get_event_loop()
+        self._save_handle = loop.call_later(HOST_SAVE_DELAY, self._save)
+
+    def _save(self):
+        """Write host addresses to store in executor."""
+        self._save_handle = None
+        loop = asyncio.get_event_loop()
+        loop.run_in_executor(None, save_hosts)
+
     def connection_lost(self, exc):
         """On Connection Lost."""
         if self._transport is not None:
@@ -150,6 +254,10 @@ class DDPProtocol(asyncio.DatagramProtocol):
 
     def close(self):
         """Close Transport."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            save_hosts()
         self._transport.close()
         self._transport = None
         _LOGGER.debug(
@@ -182,15 +290,6 @@ class DDPProtocol(asyncio.DatagramProtocol):
         """Return remote port."""
         return self._remote_port
 
-    @property
-    def polls_disabled(self):
-        """Return true if polls disabled."""
-        elapsed = time.time() - self._standby_start
-        if elapsed < DEFAULT_STANDBY_DELAY:
-            return True
-        self._standby_start = 0
-        return False
-
 
 async def async_create_ddp_endpoint(sock=None, port=DEFAULT_UDP_PORT):
     """Create Async UDP endpoint."""
@@ -211,12 +310,12 @@ def get_ddp_message(msg_type, data=None):
     if msg_type not in DDP_MSG_TYPES:
         raise TypeError(
             "DDP MSG type: '{}' is not a valid type".format(msg_type))
-    msg = u'{} * HTTP/1.1\n'.format(msg_type)
+    lines = [u'{} * HTTP/1.1'.format(msg_type)]
     if data is not None:
-        for key, value in data.items():
-            msg += '{}:{}\n'.format(key, value)
-    msg += 'device-discovery-protocol-version:{}\n'.format(DDP_VERSION)
-    return msg
+        lines.extend('{}:{}'.format(key, value) for key, value in data.items())
+    lines.append('device-discovery-protocol-version:{}'.format(DDP_VERSION))
+    lines.append('')
+    return '\n'.join(lines)
 
 
 def parse_ddp_response(rsp):
@@ -271,6 +370,24 @@ def get_ddp_launch_message(credential):
     return get_ddp_message(DDP_TYPE_LAUNCH, data)
 
 
+@lru_cache(maxsize=1)
+def get_ddp_search_bytes() -> bytes:
+    """Return encoded DDP search message. Cached."""
+    return get_ddp_search_message().encode('utf-8')
+
+
+@lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def get_ddp_wake_bytes(credential: str) -> bytes:
+    """Return encoded DDP wake message. Cached per credential."""
+    return get_ddp_wake_message(credential).encode('utf-8')
+
+
+@lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def get_ddp_launch_bytes(credential: str) -> bytes:
+    """Return encoded DDP launch message. Cached per credential."""
+    return get_ddp_launch_message(credential).encode('utf-8')
+
+
 def get_socket(port: Optional[int] = DEFAULT_UDP_PORT):
     """Return DDP socket object."""
     retries = 0
@@ -312,7 +429,9 @@ def _send_recv_msg(
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
             _LOGGER.debug("Broadcast enabled")
 
-        sock.sendto(msg.encode('utf-8'), (host, DDP_PORT))
+        if isinstance(msg, str):
+            msg = msg.encode('utf-8')
+        sock.sendto(msg, (host, DDP_PORT))
         _LOGGER.debug(
             "SENT DDP MSG: SPORT=%s DEST=%s",
             sock.getsockname()[1], (host, DDP_PORT))
@@ -355,14 +474,23 @@ def _recv_msg(host, msg, sock=None, close=True):
 
 def send_search_msg(host, sock=None):
     """Send SRCH message only."""
-    msg = get_ddp_search_message()
+    msg = get_ddp_search_bytes()
     return _send_msg(host, msg, sock=sock)
 
 
-def search(host=BROADCAST_IP, port=UDP_PORT, sock=None, timeout=3) -> list:
-    """Return list of discovered PS4s."""
+def search(
+        host=BROADCAST_IP, port=UDP_PORT, sock=None, timeout=3,
+        expected: Optional[Iterable[str]] = None) -> list:
+    """Return list of discovered PS4s.
+
+    :param timeout: Max seconds to wait for responses
+    :param expected: Host IP addresses or host-ids of PS4s expected to
+        respond; Returns once all have responded
+    """
     ps_list = []
-    msg = get_ddp_search_message()
+    found = set()
+    expected = set(expected or ())
+    msg = get_ddp_search_bytes()
     start = time.time()
 
     if host is None:
@@ -381,12 +509,126 @@ def search(host=BROADCAST_IP, port=UDP_PORT, sock=None, timeout=3) -> list:
             if data not in ps_list and data:
                 data[u'host-ip'] = addr[0]
                 ps_list.append(data)
+                found.add(addr[0])
+                found.add(data.get('host-id'))
+                update_host(data.get('host-id'), addr[0])
             if host != BROADCAST_IP:
                 break
+            if expected and expected <= found:
+                break
     sock.close()
+    _LOGGER.debug(
+        "Search found %s devices in %.3f seconds",
+        len(ps_list), time.time() - start)
     return ps_list
 
 
+def get_host_ip(host_id: Optional[str]) -> Optional[str]:
+    """Return last known IP address of host-id."""
+    return _HOST_IPS.get(host_id)
+
+
+def get_host_id(host: str) -> Optional[str]:
+    """Return host-id last seen at IP address."""
+    return _HOST_IDS.get(host)
+
+
+def get_host_cache() -> dict:
+    """Return dict of host-id to last known IP address."""
+    return dict(_HOST_IPS)
+
+
+def update_host(
+        host_id: Optional[str], host: str, save: bool = True) -> bool:
+    """Set last known IP address of host-id. Return True if changed.
+
+    :param save: Write to store now; Otherwise waits for save_hosts
+    """
+    if not host_id or _HOST_IPS.get(host_id) == host:
+        return False
+    _LOGGER.debug("Host-id %s @ %s", host_id, host)
+    previous = _HOST_IPS.get(host_id)
+    if _HOST_IDS.get(previous) == host_id:
+        _HOST_IDS.pop(previous)
+    _HOST_IPS[host_id] = host
+    _HOST_IDS[host] = host_id
+    if _HOST_STORE is not None:
+        _PENDING_HOSTS[host_id] = host
+        if save:
+            save_hosts()
+    return True
+
+
+def save_hosts():
+    """Write changed host addresses to store."""
+    pending = {}
+    for host_id in list(_PENDING_HOSTS):
+        host = _PENDING_HOSTS.pop(host_id, None)
+        if host is not None:
+            pending[host_id] = host
+    store = _HOST_STORE
+    if store is None or not pending:
+        return
+    try:
+        store.update(HOSTS_FILE_TYPE, pending)
+    except sqlite3.Error as error:
+        _LOGGER.error("Error saving host addresses: %s", error)
+        for host_id, host in pending.items():
+            _PENDING_HOSTS.setdefault(host_id, host)
+
+
+def set_host_store(store):
+    """Persist known host addresses in store. Known addresses are loaded.
+
+    :param store: :class: `pyps4_2ndscreen.config_store.ConfigStore`
+    """
+    global _HOST_STORE  # pylint: disable=global-statement
+    _HOST_STORE = None
+    _PENDING_HOSTS.clear()
+    if store is not None:
+        for host_id, host in store.load(HOSTS_FILE_TYPE).items():
+            if host_id not in _HOST_IPS:
+                _HOST_IPS[host_id] = host
+                _HOST_IDS.setdefault(host, host_id)
+    _HOST_STORE = store
+
+
+def resolve_host_id(
+        host_id: str, port=UDP_PORT, timeout=3) -> Optional[str]:
+    """Return IP address of PS4 with host-id. Return None if not found.
+
+    The last known address is checked first. A broadcast search is only
+    sent if the PS4 does not respond there.
+
+    :param host_id: Host-id of PS4
+    :param port: Local UDP Port to use
+    :param timeout: Max seconds to wait for broadcast responses
+    """
+    host = get_host_ip(host_id)
+    if host is not None:
+        devices = search(host, port=port, timeout=UNICAST_TIMEOUT)
+        if any(device.get('host-id') == host_id for device in devices):
+            return host
+        _LOGGER.debug("Host-id %s not found @ %s", host_id, host)
+    devices = search(
+        BROADCAST_IP, port=port, timeout=timeout, expected=[host_id])
+    for device in devices:
+        if device.get('host-id') == host_id:
+            return device['host-ip']
+    return None
+
+
+async def async_resolve_host_id(
+        host_id: str, port=UDP_PORT, timeout=3) -> Optional[str]:
+    """Return IP address of PS4 with host-id. Return None if not found.
+
+    Runs :func:`resolve_host_id` in an executor.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        None, partial(resolve_host_id, host_id, port, timeout))
+
+
 def get_status(host, port=UDP_PORT, sock=None):
     """Return status dict."""
     ps_list = search(host=host, port=port, sock=sock)
@@ -397,11 +639,11 @@ def get_status(host, port=UDP_PORT, sock=None):
 
 def wakeup(host, credential, sock=None):
     """Wakeup PS4."""
-    msg = get_ddp_wake_message(credential)
+    msg = get_ddp_wake_bytes(credential)
     _send_msg(host, msg, sock)
 
 
 def launch(host, credential, sock=None):
     """Launch."""
-    msg = get_ddp_launch_message(credential)
+    msg = get_ddp_launch_bytes(credential)
     _send_msg(host, msg, sock)
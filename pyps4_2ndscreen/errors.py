@@ -21,6 +21,10 @@ class PSDataIncomplete(Exception):
     """PS Store data missing attributes."""
 
 
+class PSStoreUnavailable(Exception):
+    """PS Store requests are rejected while store is unhealthy."""
+
+
 class UnknownButton(Exception):
     """Button not valid."""
 
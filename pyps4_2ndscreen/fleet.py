@@ -0,0 +1,428 @@
+"""Manage many PS4 consoles from a single DDP endpoint."""
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+from .credential import DEFAULT_DEVICE_NAME
+from .ddp import DEFAULT_UDP_PORT, async_create_ddp_endpoint
+from .errors import LoginFailed, PSConnectionError
+from .ps4 import Ps4Async
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 50
+DEFAULT_BOOTSTRAP_TIMEOUT = 3
+DEFAULT_DEADLINE = 30
+
+STAGE_CONNECT = 'connect'
+STAGE_LOGIN = 'login'
+STAGE_COMMAND = 'command'
+
+FAN_OUT_COMMANDS = ('standby', 'start_title', 'remote_control')
+
+
+class FanOutResult:
+    """Result of a fan out command for one device.
+
+    :param ps4: Device command was sent to
+    :param command: Name of command
+    """
+
+    __slots__ = ('ps4', 'command', 'stage', 'success', 'error', 'timings')
+
+    def __init__(self, ps4: Ps4Async, command: str):
+        self.ps4 = ps4
+        self.command = command
+        self.stage = None
+        self.success = False
+        self.error = None
+        self.timings = {}
+
+    def __repr__(self):
+        return (
+            "<{}.{} host={} command={} success={} stage={} elapsed={}>".format(
+                self.__module__,
+                self.__class__.__name__,
+                self.host,
+                self.command,
+                self.success,
+                self.stage,
+                round(self.elapsed, 3),
+            )
+        )
+
+    @property
+    def host(self) -> str:
+        """Return host IP address of device."""
+        return self.ps4.host
+
+    @property
+    def elapsed(self) -> float:
+        """Return total seconds spent in all stages."""
+        return sum(self.timings.values())
+
+
+async def _timed_stage(result: FanOutResult, stage: str, coro):
+    """Await coro and record elapsed time for stage."""
+    result.stage = stage
+    start = time.monotonic()
+    try:
+        await coro
+    finally:
+        result.timings[stage] = time.monotonic() - start
+
+
+async def _connect(ps4: Ps4Async):
+    if not ps4.connected:
+        await ps4.async_connect(auto_login=False)
+        if not ps4.connected:
+            raise PSConnectionError("PS4 Refused Connection")
+
+
+async def _login(ps4: Ps4Async):
+    if not ps4.loggedin:
+        await ps4.login()
+        if not ps4.loggedin:
+            raise LoginFailed("PS4 Refused Login")
+
+
+async def _execute(
+        ps4: Ps4Async, command: str, args: tuple, result: FanOutResult):
+    await _timed_stage(result, STAGE_CONNECT, _connect(ps4))
+    await _timed_stage(result, STAGE_LOGIN, _login(ps4))
+    await _timed_stage(result, STAGE_COMMAND, getattr(ps4, command)(*args))
+
+
+async def _run_command(
+        ps4: Ps4Async,
+        command: str,
+        args: tuple,
+        semaphore: asyncio.Semaphore,
+        deadline: float) -> FanOutResult:
+    result = FanOutResult(ps4, command)
+    async with semaphore:
+        try:
+            await asyncio.wait_for(
+                _execute(ps4, command, args, result), deadline)
+        except asyncio.TimeoutError as error:
+            _LOGGER.info(
+                "Command: %s @ %s timed out at stage: %s",
+                command, ps4.host, result.stage)
+            result.error = error
+        except Exception as error:  # noqa: pylint: disable=broad-except
+            _LOGGER.info(
+                "Command: %s @ %s failed at stage: %s; %s",
+                command, ps4.host, result.stage, repr(error))
+            result.error = error
+        else:
+            result.success = True
+    return result
+
+
+async def fan_out(
+        devices: Iterable[Ps4Async],
+        command: str,
+        *args,
+        concurrency: Optional[int] = DEFAULT_CONCURRENCY,
+        deadline: Optional[float] = DEFAULT_DEADLINE,
+) -> AsyncIterator[FanOutResult]:
+    """Send command to devices concurrently. Yield results as completed.
+
+    Connect, login and command stages are run for each device.
+    Failures are reported in the result and do not affect other devices.
+
+    :param devices: Devices to send command to
+    :param command: One of 'standby', 'start_title', 'remote_control'
+    :param args: Args to pass to command
+    :param concurrency: Max number of devices to run at once
+    :param deadline: Max seconds for each device to complete all stages
+    """
+    if command not in FAN_OUT_COMMANDS:
+        raise ValueError("Command: {} is not valid".format(command))
+    if concurrency < 1:
+        raise ValueError("Concurrency must be greater than 0")
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.ensure_future(
+            _run_command(ps4, command, args, semaphore, deadline))
+        for ps4 in devices
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class Fleet:
+    """Manager for many :class:`pyps4_2ndscreen.ps4.Ps4Async` objects.
+
+    All devices share one :class:`pyps4_2ndscreen.ddp.DDPProtocol`.
+    Devices are indexed by host IP address and by host-id. Devices are
+    re-indexed when they move to a new address.
+
+    :param device_name: Name for client device
+    :param port: Local UDP Port to use
+    :param concurrency: Max number of devices to run bulk commands on at once
+    """
+
+    def __init__(
+            self,
+            device_name: Optional[str] = DEFAULT_DEVICE_NAME,
+            port: Optional[int] = DEFAULT_UDP_PORT,
+            concurrency: Optional[int] = DEFAULT_CONCURRENCY):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be greater than 0")
+        self.device_name = device_name
+        self.concurrency = concurrency
+        self.ddp_protocol = None
+        self._port = port
+        self._devices = {}
+        self._host_ids = {}
+        self._callbacks = []
+        self._pending = set()
+        self._bootstrapped = None
+
+    def __repr__(self):
+        return (
+            "<{}.{} devices={} local_port={}>".format(
+                self.__module__,
+                self.__class__.__name__,
+                len(self._devices),
+                self.port,
+            )
+        )
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(list(self._devices.values()))
+
+    def __contains__(self, host: str):
+        return host in self._devices
+
+    def add(self, host: str, credential: str) -> Ps4Async:
+        """Add and return a PS4 device. One per host.
+
+        :param host: The host PS4 IP address
+        :param credential: The credentials of a PSN account
+        """
+        if host in self._devices:
+            raise ValueError("PS4 @ {} already added".format(host))
+        ps4 = Ps4Async(host, credential, device_name=self.device_name)
+        self._devices[host] = ps4
+        if self.ddp_protocol is not None:
+            self._attach(ps4)
+        return ps4
+
+    def remove(self, host: str) -> Ps4Async:
+        """Remove and return PS4 device.
+
+        :param host: The host PS4 IP address
+        """
+        ps4 = self._devices.pop(host, None)
+        if ps4 is None:
+            return None
+        self._pending.discard(host)
+        if self._host_ids.get(ps4.host_id) is ps4:
+            self._host_ids.pop(ps4.host_id)
+        ps4._detach_protocol()  # noqa: pylint: disable=protected-access
+        return ps4
+
+    def get(self, host: str) -> Ps4Async:
+        """Return PS4 device by host IP address."""
+        return self._devices.get(host)
+
+    def get_by_host_id(self, host_id: str) -> Ps4Async:
+        """Return PS4 device by host-id."""
+        return self._host_ids.get(host_id)
+
+    def add_callback(self, callback: Callable[[Ps4Async], None]):
+        """Add callback called with device when any device status changes.
+
+        :param callback: Callback to call; Takes device as only arg
+        """
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[Ps4Async], None]):
+        """Remove fleet callback."""
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def _attach(self, ps4: Ps4Async):
+        ps4.set_protocol(self.ddp_protocol)
+        ps4.add_callback(partial(self._status_changed, ps4))
+        if ps4.status is None:
+            self._pending.add(ps4.host)
+
+    def _status_changed(self, ps4: Ps4Async):
+        """Callback called by DDP Protocol."""
+        host_id = ps4.host_id
+        if host_id is not None and self._host_ids.get(host_id) is not ps4:
+            self._host_ids[host_id] = ps4
+        if ps4.status is not None and ps4.host in self._pending:
+            self._pending.discard(ps4.host)
+            if not self._pending and self._bootstrapped is not None:
+                self._bootstrapped.set()
+        for callback in self._callbacks:
+            callback(ps4)
+
+    def _host_moved(self, ps4: Ps4Async, previous: str):
+        """Callback called by DDP Protocol when a device moves."""
+        if self._devices.get(previous) is not ps4:
+            return
+        self._devices[ps4.host] = self._devices.pop(previous)
+        if previous in self._pending:
+            self._pending.discard(previous)
+            self._pending.add(ps4.host)
+
+    async def start(
+            self, timeout: Optional[float] = DEFAULT_BOOTSTRAP_TIMEOUT) -> int:
+        """Create DDP endpoint and bootstrap devices. Return number found.
+
+        :param timeout: Max seconds to wait for devices to respond
+        """
+        if self.ddp_protocol is None:
+            _, self.ddp_protocol = await async_create_ddp_endpoint(
+                port=self._port)
+            self.ddp_protocol.add_move_callback(self._host_moved)
+            for ps4 in self._devices.values():
+                self._attach(ps4)
+        return await self.bootstrap(timeout)
+
+    async def bootstrap(
+            self, timeout: Optional[float] = DEFAULT_BOOTSTRAP_TIMEOUT) -> int:
+        """Get status for all devices with one broadcast. Return number found.
+
+        Returns once all devices have responded or timeout has elapsed.
+
+        :param timeout: Max seconds to wait for devices to respond
+        """
+        if self.ddp_protocol is None:
+            _LOGGER.error("DDP protocol is not set")
+            return 0
+        self._pending = {
+            host for host, ps4 in self._devices.items() if ps4.status is None}
+        if self._pending:
+            self._bootstrapped = asyncio.Event()
+            self.ddp_protocol.send_broadcast()
+            try:
+                await asyncio.wait_for(self._bootstrapped.wait(), timeout)
+            except asyncio.TimeoutError:
+                _LOGGER.info(
+                    "%s PS4 devices did not respond", len(self._pending))
+            self._bootstrapped = None
+        return len(self._devices) - len(self._pending)
+
+    def poll(self):
+        """Send status request to all devices."""
+        for ps4 in self._devices.values():
+            ps4.get_status()
+
+    def wakeup_all(
+            self,
+            predicate: Optional[Callable[[Ps4Async], bool]] = None) -> list:
+        """Wakeup devices in standby. Return list of devices sent to.
+
+        :param predicate: Only wakeup devices this returns True for
+        """
+        devices = []
+        for ps4 in self.where(predicate):
+            if ps4.is_standby:
+                ps4.wakeup()
+                devices.append(ps4)
+        return devices
+
+    async def standby_where(
+            self,
+            predicate: Optional[Callable[[Ps4Async], bool]] = None) -> list:
+        """Place running devices in standby. Return list of devices sent to.
+
+        :param predicate: Only standby devices this returns True for
+        """
+        devices = [ps4 for ps4 in self.where(predicate) if ps4.is_running]
+        await self.run_limited(lambda ps4: ps4.standby(), devices)
+        return devices
+
+    async def run_limited(
+            self,
+            func: Callable[[Ps4Async], asyncio.Future],
+            devices: Iterable[Ps4Async]) -> list:
+        """Run coroutine function for devices. Return results in order.
+
+        At most `concurrency` coroutines are run at once.
+        Exceptions are returned instead of raised.
+
+        :param func: Coroutine function; Takes device as only arg
+        :param devices: Devices to run for
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _run(ps4):
+            async with semaphore:
+                return await func(ps4)
+
+        return await asyncio.gather(
+            *[_run(ps4) for ps4 in devices], return_exceptions=True)
+
+    def fan_out(
+            self,
+            command: str,
+            *args,
+            predicate: Optional[Callable[[Ps4Async], bool]] = None,
+            deadline: Optional[float] = DEFAULT_DEADLINE,
+    ) -> AsyncIterator[FanOutResult]:
+        """Send command to devices concurrently. Yield results as completed.
+
+        :param command: One of 'standby', 'start_title', 'remote_control'
+        :param args: Args to pass to command
+        :param predicate: Only send to devices this returns True for
+        :param deadline: Max seconds for each device to complete all stages
+        """
+        return fan_out(
+            self.where(predicate),
+            command,
+            *args,
+            concurrency=self.concurrency,
+            deadline=deadline,
+        )
+
+    def where(
+            self,
+            predicate: Optional[Callable[[Ps4Async], bool]] = None) -> list:
+        """Return list of devices that predicate returns True for."""
+        if predicate is None:
+            return list(self._devices.values())
+        return [ps4 for ps4 in self._devices.values() if predicate(ps4)]
+
+    def status_snapshot(self) -> dict:
+        """Return dict of host IP address to status."""
+        return {
+            host: dict(ps4.status) if ps4.status is not None else None
+            for host, ps4 in self._devices.items()
+        }
+
+    async def close(self):
+        """Close all connections and DDP endpoint."""
+        for ps4 in self._devices.values():
+            if ps4.tcp_protocol is not None:
+                await ps4.close()
+        if self.ddp_protocol is not None:
+            self.ddp_protocol.close()
+            self.ddp_protocol = None
+
+    @property
+    def port(self) -> int:
+        """Return local port."""
+        if self.ddp_protocol is not None:
+            return self.ddp_protocol.local_port
+        return self._port
+
+    @property
+    def pending(self) -> list:
+        """Return hosts that have not responded to bootstrap."""
+        return list(self._pending)
@@ -6,15 +6,18 @@ import json
 import socket
 import sysconfig
 import sys
+import time
+from typing import Iterable, Optional
 
+from .config_store import ConfigStore
 from .errors import NotReady, LoginFailed
 from .credential import Credentials, DEFAULT_DEVICE_NAME
-from .ddp import search, DDP_PORT, DEFAULT_UDP_PORT
+from .ddp import search, set_host_store, DDP_PORT, DEFAULT_UDP_PORT
+from .paths import DEFAULT_PATH
 from .ps4 import Ps4Legacy
 
 _LOGGER = logging.getLogger(__name__)
 
-DEFAULT_PATH = Path.home() / ".pyps4-2ndscreen"
 DEFAULT_PS4_FILE = DEFAULT_PATH / ".ps4_info.json"
 DEFAULT_CREDS_FILE = DEFAULT_PATH / ".ps4_creds.json"
 DEFAULT_GAMES_FILE = DEFAULT_PATH / ".ps4_games.json"
@@ -26,21 +29,98 @@ FILE_TYPES = {
 }
 
 
+_CONFIG_STORE = None
+
+# File path: (mtime, size, data) of files last read or written.
+_FILE_CACHE = {}
+
+
+def get_config_store() -> ConfigStore:
+    """Return default config store. JSON files are imported once.
+
+    Known addresses of host-ids are also kept in the store.
+    """
+    global _CONFIG_STORE  # pylint: disable=global-statement
+    if _CONFIG_STORE is None:
+        _CONFIG_STORE = ConfigStore(json_files=FILE_TYPES)
+        set_host_store(_CONFIG_STORE)
+    return _CONFIG_STORE
+
+
+def _stat_key(file_name: str) -> Optional[tuple]:
+    """Return tuple of mtime and size of file. Return None if error."""
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_json(file_name: str) -> dict:
+    """Return data of JSON file. Parsed data is cached until file changes."""
+    key = _stat_key(file_name)
+    cached = _FILE_CACHE.get(str(file_name))
+    if key is not None and cached is not None and cached[0] == key:
+        return dict(cached[1])
+    with open(file_name, "r") as _r_file:
+        data = json.load(_r_file)
+    if key is not None and isinstance(data, dict):
+        _FILE_CACHE[str(file_name)] = (key, dict(data))
+    else:
+        _FILE_CACHE.pop(str(file_name), None)
+    return data
+
+
 # noqa: pylint: disable=no-self-use
 class Helper:
-    """Helpers for PS4. Used as class."""
+    """Helpers for PS4. Used as class.
+
+    :param store: :class: `pyps4_2ndscreen.config_store.ConfigStore`;
+        Data is kept in JSON files if None. Processes sharing data should
+        use the same store, see :func:`get_config_store`
+    """
 
-    def __init__(self):
+    def __init__(self, store: ConfigStore = None):
         """Init Class."""
+        self.store = store
+        self.search_time = None
+
+    def has_devices(
+            self, host=None, port=DEFAULT_UDP_PORT,
+            expected: Optional[Iterable[str]] = None) -> list:
+        """Return list of device status dicts that are discovered.
 
-    def has_devices(self, host=None, port=DEFAULT_UDP_PORT) -> list:
-        """Return list of device status dicts that are discovered."""
+        Returns early once all expected devices have responded.
+
+        :param host: Host IP Address to search; Broadcasts if None
+        :param expected: Host IP Addresses expected to respond;
+            Uses linked devices if None
+        """
+        if expected is None and host is None:
+            expected = self.get_linked_hosts()
         _LOGGER.debug("Searching for PS4 Devices")
-        devices = search(host, port)
+        start = time.time()
+        devices = search(host, port, expected=expected)
+        self.search_time = time.time() - start
         for device in devices:
             _LOGGER.debug("Found PS4 at: %s", device['host-ip'])
+        _LOGGER.debug(
+            "Discovered %s devices in %.3f seconds",
+            len(devices), self.search_time)
         return devices
 
+    def get_linked_hosts(self) -> list:
+        """Return list of host IP Addresses of linked devices."""
+        if self.store is not None:
+            return list(self.store.load('ps4'))
+        file_name = FILE_TYPES['ps4']
+        if not os.path.isfile(file_name):
+            return []
+        try:
+            return list(_read_json(file_name))
+        except (OSError, ValueError):
+            return []
+
     def link(
             self,
             host: str,
@@ -130,11 +210,11 @@ class Helper:
         :param file_type: Type of file
         :param file_name: Name of file
         """
+        if file_name is None and self.store is not None:
+            return self.store.has_data(file_type)
         if file_name is None:
             file_name = self.check_files(file_type)
-        with open(file_name, "r") as _r_file:
-            data = json.load(_r_file)
-            _r_file.close()
+        data = _read_json(file_name)
         if data:
             return True
         return False
@@ -144,6 +224,8 @@ class Helper:
 
         :param file_type: Type of file
         """
+        if self.store is not None:
+            return self.store.path if file_type in FILE_TYPES else None
         file_path = str(DEFAULT_PATH)
         if not os.path.exists(file_path):
             os.mkdir(file_path)
@@ -159,17 +241,20 @@ class Helper:
     def load_files(self, file_type: str) -> dict:
         """Load data as JSON. Return data.
 
+        Data is cached until the file's mtime or size changes.
+
         :param file_type: Type of file
         """
+        if self.store is not None:
+            return self.store.load(file_type)
         file_name = self.check_files(file_type)
-        with open(file_name, "r") as _r_file:
-            data = json.load(_r_file)
-            _r_file.close()
-        return data
+        return _read_json(file_name)
 
     def save_files(self, data: dict, file_type=None) -> str:
         """Save file with data dict. Return file path.
 
+        Existing data of file type is replaced.
+
         :param data: Data to save
         :param file_type: Type of file
         """
@@ -179,11 +264,21 @@ class Helper:
             file_name = FILE_TYPES[file_type]
         else:
             return None
+        if self.store is not None:
+            self.store.replace(file_type, data)
+            return self.store.path
 
         _data = data
-        with open(file_name, "w+") as _w_file:
+        # Replaced atomically so readers never see a partial file.
+        temp_name = "{}.tmp".format(file_name)
+        with open(temp_name, "w+") as _w_file:
             json.dump(fp=_w_file, obj=_data)
-            _w_file.close()
+        os.replace(temp_name, file_name)
+        key = _stat_key(file_name)
+        if key is not None:
+            _FILE_CACHE[file_name] = (key, dict(_data))
+        else:
+            _FILE_CACHE.pop(file_name, None)
         return file_name
 
     # noqa: pylint: disable=no-member
@@ -0,0 +1,314 @@
+"""Disk cache of cover art images."""
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from ssl import SSLError
+from typing import Any, Callable, Optional
+
+from .errors import PSDataIncomplete
+from .lazy import lazy_import
+from .media_art import (DEFAULT_HEADERS, FETCH_TIMEOUT, HTTP_STATUS_OK,
+                        async_search_ps_store, get_session_manager)
+from .media_cache import DB_TIMEOUT
+from .paths import DEFAULT_PATH
+
+# Loaded on first use to keep imports fast.
+aiohttp = lazy_import('aiohttp')
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_PATH = DEFAULT_PATH / "images"
+INDEX_FILE = "index.db"
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_MAX_AGE = 60 * 60 * 24
+
+HTTP_STATUS_NOT_MODIFIED = 304
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS images ("
+    "url TEXT PRIMARY KEY, "
+    "digest TEXT NOT NULL, "
+    "size INTEGER NOT NULL, "
+    "etag TEXT, "
+    "last_modified TEXT, "
+    "checked REAL NOT NULL, "
+    "last_access REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS images_last_access ON images (last_access)",
+)
+
+
+class ImageCache:
+    """Content addressed cache of images.
+
+    Images are downloaded once and revalidated with ETag and
+    Last-Modified after max_age. Least recently used images are evicted
+    once the total size is over max_bytes. Async methods run file and
+    index access in an executor so the event loop is not blocked.
+
+    :param path: Directory to store images in
+    :param max_bytes: Max total size of images
+    :param max_age: Seconds before an image is revalidated
+    """
+
+    def __init__(
+            self, path: Optional[str] = None,
+            max_bytes: int = DEFAULT_MAX_BYTES,
+            max_age: float = DEFAULT_MAX_AGE):
+        if path is None:
+            path = DEFAULT_IMAGE_PATH
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return "<{}.{} path={} max_bytes={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.path,
+            self.max_bytes,
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return connection. Open index if needed. Call with lock."""
+        if self._conn is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.path / INDEX_FILE), timeout=DB_TIMEOUT,
+                isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def _file(self, digest: str) -> Path:
+        """Return path of image file."""
+        return self.path / digest[:2] / digest
+
+    @property
+    def total_size(self) -> int:
+        """Return total size of cached images in bytes."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT SUM(size) FROM "
+                "(SELECT DISTINCT digest, size FROM images)").fetchone()
+        return row[0] or 0
+
+    def get_path(self, url: str) -> Optional[str]:
+        """Return path of cached image. Return None if not cached.
+
+        :param url: URL of image
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT digest FROM images WHERE url=?", (url,)).fetchone()
+            if row is None:
+                return None
+            file_path = self._file(row[0])
+            if not file_path.is_file():
+                conn.execute("DELETE FROM images WHERE url=?", (url,))
+                return None
+            conn.execute(
+                "UPDATE images SET last_access=? WHERE url=?",
+                (time.time(), url))
+        return str(file_path)
+
+    def open(self, url: str) -> Optional[mmap.mmap]:
+        """Return read only memory map of cached image.
+
+        Return None if not cached. Close the map when done.
+
+        :param url: URL of image
+        """
+        file_path = self.get_path(url)
+        if file_path is None:
+            return None
+        with open(file_path, "rb") as _r_file:
+            return mmap.mmap(_r_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    async def async_get(
+            self, url: str,
+            session: Optional['aiohttp.ClientSession'] = None
+    ) -> Optional[str]:
+        """Return path of image. Download or revalidate if needed.
+
+        A stale image is returned if the store cannot be reached.
+
+        :param url: URL of image
+        :param session: Session to use; Uses default pooled session if None
+        """
+        cached, file_path = await self._async_run(self._lookup, url)
+        if file_path is not None:
+            return file_path
+
+        headers = dict(DEFAULT_HEADERS)
+        if cached is not None:
+            if cached[1]:
+                headers["If-None-Match"] = cached[1]
+            if cached[2]:
+                headers["If-Modified-Since"] = cached[2]
+        if session is None:
+            session = get_session_manager().get_session()
+        try:
+            async with session.get(
+                    url, headers=headers, timeout=FETCH_TIMEOUT) as response:
+                if response.status == HTTP_STATUS_NOT_MODIFIED and cached:
+                    _LOGGER.debug("Image not modified: %s", url)
+                    return await self._async_run(self._revalidated, url)
+                if response.status != HTTP_STATUS_OK:
+                    _LOGGER.debug(
+                        "Image HTTP Error: %s; URL: %s", response.status, url)
+                    return await self._async_stale(url, cached)
+                content = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except (asyncio.TimeoutError, aiohttp.ClientError, SSLError) as error:
+            _LOGGER.debug("Image request error: %s; URL: %s", error, url)
+            return await self._async_stale(url, cached)
+        if not content:
+            return await self._async_stale(url, cached)
+        return await self._async_run(
+            self.store, url, content, etag, last_modified)
+
+    def _lookup(self, url: str) -> tuple:
+        """Return tuple of cached row and path of image if fresh."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT digest, etag, last_modified, checked FROM images "
+                "WHERE url=?", (url,)).fetchone()
+            if row is None or not self._file(row[0]).is_file():
+                return None, None
+            if time.time() - row[3] < self.max_age:
+                return row, self.get_path(url)
+            return row, None
+
+    def _revalidated(self, url: str) -> Optional[str]:
+        """Mark image as checked. Return path of image."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE images SET checked=? WHERE url=?", (time.time(), url))
+            return self.get_path(url)
+
+    async def _async_stale(
+            self, url: str, cached: Optional[tuple]) -> Optional[str]:
+        """Return path of stale image. Return None if not cached."""
+        if cached is None:
+            return None
+        return await self._async_run(self.get_path, url)
+
+    @staticmethod
+    async def _async_run(func: Callable, *args) -> Any:
+        """Return result of func run in an executor."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, partial(func, *args))
+
+    async def async_get_title(
+            self, title_id: str, region: str,
+            session: Optional['aiohttp.ClientSession'] = None
+    ) -> Optional[str]:
+        """Return path of cover art for title. Return None if not found.
+
+        :param title_id: Title ID of title
+        :param region: Region name of PS Store
+        :param session: Session to use; Uses default pooled session if None
+        """
+        try:
+            result_item = await async_search_ps_store(
+                title_id, region, session=session)
+        except PSDataIncomplete:
+            return None
+        if result_item is None or not result_item.cover_art:
+            return None
+        return await self.async_get(result_item.cover_art, session=session)
+
+    def store(
+            self, url: str, content: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> str:
+        """Store image content. Return path of image.
+
+        :param url: URL of image
+        :param content: Image content
+        :param etag: ETag header of response
+        :param last_modified: Last-Modified header of response
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        file_path = self._file(digest)
+        with self._lock:
+            if not file_path.is_file():
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = file_path.with_suffix(
+                    ".tmp{}".format(os.getpid()))
+                with open(temp_path, "wb") as _w_file:
+                    _w_file.write(content)
+                os.replace(temp_path, file_path)
+            conn = self._connection()
+            old = conn.execute(
+                "SELECT digest FROM images WHERE url=?", (url,)).fetchone()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, len(content), etag, last_modified, now, now))
+            if old is not None and old[0] != digest:
+                self._remove_unused(old[0])
+            self.evict(keep=url)
+        return str(file_path)
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove least recently used images until under max_bytes.
+
+        :param keep: URL of image not to remove
+        """
+        with self._lock:
+            conn = self._connection()
+            while self.total_size > self.max_bytes:
+                row = conn.execute(
+                    "SELECT url, digest FROM images WHERE url IS NOT ? "
+                    "ORDER BY last_access LIMIT 1", (keep,)).fetchone()
+                if row is None:
+                    break
+                conn.execute("DELETE FROM images WHERE url=?", (row[0],))
+                self._remove_unused(row[1])
+
+    def clear(self):
+        """Remove all images."""
+        with self._lock:
+            conn = self._connection()
+            digests = [row[0] for row in conn.execute(
+                "SELECT DISTINCT digest FROM images")]
+            conn.execute("DELETE FROM images")
+            for digest in digests:
+                self._remove_unused(digest)
+
+    def close(self):
+        """Close index."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remove_unused(self, digest: str):
+        """Remove image file if no URL refers to it. Call with lock."""
+        row = self._connection().execute(
+            "SELECT 1 FROM images WHERE digest=? LIMIT 1", (digest,)
+        ).fetchone()
+        if row is None:
+            try:
+                self._file(digest).unlink()
+            except OSError:
+                pass
@@ -1,12 +1,17 @@
 """Media Art Functions."""
 import asyncio
 import logging
+import time
+from collections import Counter, OrderedDict
+from functools import partial
 from ssl import SSLError
+from typing import AsyncIterator, Iterable, Optional
 
-import aiohttp
-from aiohttp.client_exceptions import ContentTypeError
+from .errors import PSDataIncomplete, PSStoreUnavailable
+from .lazy import lazy_import
 
-from .errors import PSDataIncomplete
+# Loaded on first use to keep imports fast.
+aiohttp = lazy_import('aiohttp')
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -114,6 +119,56 @@ BASE_IMAGE_URL = "{}/image"
 
 HTTP_STATUS_OK = 200
 
+DEFAULT_CONNECTION_LIMIT = 20
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+DEFAULT_RECENT_SIZE = 256
+DEFAULT_RECENT_TTL = 300
+
+FETCH_TIMEOUT = 3
+
+# Limits for all requests to PS Store.
+DEFAULT_STORE_RATE = 20
+DEFAULT_STORE_BURST = 20
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30
+STORE_ERROR_STATUSES = (429, 500, 502, 503, 504)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# Set True to keep full title data in search results.
+RETAIN_DATA = False
+
+# Regions searched concurrently in race mode, in order of preference.
+DEFAULT_RACE_REGIONS = (
+    "United States",
+    "United Kingdom",
+    "Japan",
+    "Hong Kong",
+    "Korea",
+    "Australia",
+)
+# Max number of titles to remember the answering region for.
+DEFAULT_HINT_SIZE = 1024
+
+DEFAULT_BATCH_CONCURRENCY = 10
+DEFAULT_BATCH_RATE = 10
+
+# Failed lookups are retried after a TTL which grows with each failure.
+DEFAULT_NEGATIVE_TTL = 600
+DEFAULT_NEGATIVE_MAX_TTL = 60 * 60 * 24
+DEFAULT_NEGATIVE_BACKOFF = 2
+DEFAULT_NEGATIVE_SIZE = 1024
+
+MISS_NOT_FOUND = "not_found"
+MISS_INCOMPLETE = "incomplete"
+MISS_TIMEOUT = "timeout"
+MISS_ERROR = "error"
+MISS_UNAVAILABLE = "unavailable"
+
 
 def get_region(region: str) -> str:
     """Validate and format region."""
@@ -129,6 +184,14 @@ def get_region(region: str) -> str:
     return regions[region]
 
 
+def normalize_region(region: str) -> str:
+    """Return region code used as cache key."""
+    code = get_region(region)
+    if code is None:
+        return region
+    return code
+
+
 def get_region_codes(region: str) -> list:
     """Return list of country and language codes."""
     region = get_region(region)
@@ -137,30 +200,140 @@ def get_region_codes(region: str) -> list:
 
 
 async def fetch(
-    url: str, params: dict, session: aiohttp.client.ClientSession
-) -> aiohttp.client_reqrep.ClientResponse:
-    """Return response from Get Request."""
+    url: str, params: dict, session: 'aiohttp.client.ClientSession'
+) -> 'aiohttp.client_reqrep.ClientResponse':
+    """Return response from Get Request. Return None if status is not OK.
+
+    Requests are rate limited and pass through the circuit breaker.
+    Raises asyncio.TimeoutError if request times out.
+    Raises PSStoreUnavailable if circuit breaker is open.
+    """
+    if not _BREAKER.allow():
+        raise PSStoreUnavailable("PS Store circuit breaker is open")
+    success = None
     try:
+        if not _LIMITER.try_acquire():
+            _STATS["rate_limited"] += 1
+            await _LIMITER.acquire()
         _LOGGER.debug("PS Store GET %s", url)
-        response = await session.get(url, params=params, timeout=3)
-        if response.status != HTTP_STATUS_OK:
-            content = await response.json()
-            _LOGGER.error("PS Store HTTP Error; Reason: %s", response.reason)
-            _LOGGER.debug("PS Store HTTP response: %s", content)
-            return None
-        return response
-    except (asyncio.TimeoutError, ContentTypeError, SSLError):
+        try:
+            response = await session.get(
+                url, params=params, timeout=FETCH_TIMEOUT)
+        except (asyncio.TimeoutError, aiohttp.ClientError, SSLError):
+            success = False
+            raise
+        success = response.status not in STORE_ERROR_STATUSES
+    finally:
+        _BREAKER.record(success)
+    if response.status != HTTP_STATUS_OK:
+        _LOGGER.debug(
+            "PS Store HTTP Error: %s; Reason: %s",
+            response.status, response.reason)
+        response.release()
         return None
+    return response
+
+
+class SessionManager:
+    """Lazily created pooled session for PS Store requests.
+
+    :param session: Session to use; Not closed by the manager
+    :param limit: Max number of simultaneous connections
+    """
+
+    def __init__(
+            self, session: Optional['aiohttp.ClientSession'] = None,
+            limit: int = DEFAULT_CONNECTION_LIMIT):
+        self.limit = limit
+        self._session = session
+        self._owned = session is None
+        self._loop = None
+
+    def __repr__(self):
+        return "<{}.{} limit={} closed={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.limit,
+            self.closed,
+        )
+
+    def get_session(self) -> 'aiohttp.ClientSession':
+        """Return session. Create session if needed."""
+        loop = asyncio.get_event_loop()
+        if self._owned and self._loop is not loop:
+            # Sessions are bound to the loop they were created in.
+            self._session = None
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._owned = True
+            self._loop = loop
+        return self._session
+
+    async def close(self):
+        """Close session if created by manager."""
+        session = self._session
+        self._session = None
+        self._loop = None
+        if session is not None and self._owned and not session.closed:
+            await session.close()
+
+    @property
+    def closed(self) -> bool:
+        """Return True if there is no open session."""
+        return self._session is None or self._session.closed
+
+
+_SESSION_MANAGER = SessionManager()
+
+
+def get_session_manager() -> SessionManager:
+    """Return default session manager."""
+    return _SESSION_MANAGER
+
+
+async def async_close_session():
+    """Close default session. Call on shutdown."""
+    await _SESSION_MANAGER.close()
+
+
+def parse_game_type(data: dict) -> Optional[str]:
+    """Return game type from title data."""
+    game_type = None
+    game_types = data.get("gameContentTypesList")
+    if game_types and isinstance(game_types, list):
+        _game_types = game_types[0]
+        if isinstance(_game_types, dict):
+            game_type = _game_types.get("key")
+    return game_type
 
 
 class ResultItem:
-    """Title data results from search."""
+    """Title data results from search.
+
+    Only the needed fields are kept unless retain_data is True.
+
+    :param title_id: Title ID of title
+    :param image_url: URL of cover art
+    :param data: Title data from PS Store
+    :param retain_data: Keep full title data
+    """
+
+    __slots__ = ('_sku_id', '_cover_art', '_name', '_game_type', '_data')
 
-    def __init__(self, title_id: str, image_url: str, data: dict):
+    def __init__(
+            self, title_id: str, image_url: str, data: dict,
+            retain_data: bool = False):
         """Init Class."""
-        self._data = data
         self._sku_id = title_id
         self._cover_art = image_url
+        self._name = data.get("title_name")
+        self._game_type = parse_game_type(data)
+        self._data = data if retain_data else None
 
     def __repr__(self):
         return "<{}.{} name={} sku_id={} game_type={}>".format(
@@ -174,18 +347,12 @@ class ResultItem:
     @property
     def name(self) -> str:
         """Return Item Name."""
-        return self.data.get("title_name")
+        return self._name
 
     @property
     def game_type(self) -> str:
         """Return Game Type."""
-        game_type = None
-        game_types = self.data.get("gameContentTypesList")
-        if game_types and isinstance(game_types, list):
-            _game_types = game_types[0]
-            if isinstance(_game_types, dict):
-                game_type = _game_types.get("key")
-        return game_type
+        return self._game_type
 
     @property
     def sku_id(self) -> str:
@@ -199,13 +366,460 @@ class ResultItem:
 
     @property
     def data(self) -> dict:
-        """Return dict of data attributes."""
-        return self._data
+        """Return dict of data attributes.
+
+        Only name and game type are included unless data was retained.
+        """
+        if self._data is not None:
+            return self._data
+        return {
+            "title_name": self._name,
+            "gameContentTypesList": [{"key": self._game_type}],
+        }
+
+
+class RecentResults:
+    """Bounded in-memory LRU of recent search results.
+
+    :param maxsize: Max number of results to keep
+    :param ttl: Seconds before a result expires
+    """
+
+    def __init__(
+            self, maxsize: int = DEFAULT_RECENT_SIZE,
+            ttl: float = DEFAULT_RECENT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: tuple) -> Optional[ResultItem]:
+        """Return result. Return None if missing or expired."""
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+        item, expires = entry
+        if expires <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return item
+
+    def set(self, key: tuple, item: ResultItem):
+        """Add result. Evict least recently used if full."""
+        self._items[key] = (item, time.monotonic() + self.ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        """Remove all results."""
+        self._items.clear()
+
+
+class NegativeCache:
+    """Bounded cache of failed lookups with backoff.
+
+    :param ttl: Seconds before a failed lookup is retried
+    :param max_ttl: Max seconds before a failed lookup is retried
+    :param backoff: Multiplier applied to TTL for each repeated failure
+    :param maxsize: Max number of entries to keep
+    """
+
+    def __init__(
+            self, ttl: float = DEFAULT_NEGATIVE_TTL,
+            max_ttl: float = DEFAULT_NEGATIVE_MAX_TTL,
+            backoff: float = DEFAULT_NEGATIVE_BACKOFF,
+            maxsize: int = DEFAULT_NEGATIVE_SIZE):
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.backoff = backoff
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Return reason if lookup failed recently. Return None if not."""
+        entry = self._items.get(key)
+        if entry is None or entry[2] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def failures(self, key: tuple) -> int:
+        """Return number of consecutive failures."""
+        entry = self._items.get(key)
+        if entry is None:
+            return 0
+        return entry[1]
+
+    def add(self, key: tuple, reason: str) -> float:
+        """Add failed lookup. Return seconds until retry."""
+        failures = self.failures(key) + 1
+        ttl = min(self.ttl * self.backoff ** (failures - 1), self.max_ttl)
+        # Entries are kept after expiry so repeated failures back off.
+        self._items[key] = (reason, failures, time.monotonic() + ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return ttl
+
+    def remove(self, key: tuple):
+        """Remove entry after a successful lookup."""
+        self._items.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        self._items.clear()
+
+
+class RateLimiter:
+    """Token bucket limiting requests per second.
+
+    :param rate: Requests per second
+    :param burst: Max requests allowed at once
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("Rate must be greater than 0")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Return True and take a token if available."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        while not self.try_acquire():
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Circuit breaker for PS Store requests.
+
+    Opens after consecutive failures and rejects requests. After
+    reset_timeout one trial request is allowed. The breaker closes if it
+    succeeds and opens again if it fails.
+
+    :param failure_threshold: Consecutive failures before opening
+    :param reset_timeout: Seconds to stay open before a trial request
+    """
+
+    def __init__(
+            self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+            reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self._opened_at = None
+        self._trial = False
 
+    def __repr__(self):
+        return "<{}.{} state={} failures={} rejected={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.state,
+            self.failures,
+            self.rejected,
+        )
 
-async def async_search_ps_store(title_id: str, region: str) -> ResultItem:
+    @property
+    def state(self) -> str:
+        """Return state of breaker."""
+        if self._opened_at is None:
+            return BREAKER_CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return BREAKER_HALF_OPEN
+        return BREAKER_OPEN
+
+    def allow(self) -> bool:
+        """Return True if request may be sent."""
+        state = self.state
+        if state == BREAKER_CLOSED:
+            return True
+        if state == BREAKER_HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: Optional[bool]):
+        """Record result of request. None if request did not complete."""
+        self._trial = False
+        if success is None:
+            return
+        if success:
+            if self._opened_at is not None:
+                _LOGGER.info("PS Store circuit breaker closed")
+            self.failures = 0
+            self._opened_at = None
+            return
+        self.failures += 1
+        if self._opened_at is not None or (
+                self.failures >= self.failure_threshold):
+            if self.state != BREAKER_OPEN:
+                self.opened += 1
+                _LOGGER.warning(
+                    "PS Store circuit breaker opened after %s failures",
+                    self.failures)
+            self._opened_at = time.monotonic()
+
+    def reset(self):
+        """Close breaker and reset counters."""
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self._opened_at = None
+        self._trial = False
+
+    def as_dict(self) -> dict:
+        """Return dict of state and counters."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
+
+
+_LIMITER = RateLimiter(DEFAULT_STORE_RATE, DEFAULT_STORE_BURST)
+_BREAKER = CircuitBreaker()
+_RECENT = RecentResults()
+_NEGATIVE = NegativeCache()
+_IN_FLIGHT = {}
+_WAITERS = Counter()
+_REGION_HINTS = OrderedDict()
+_STATS = Counter()
+_CATALOG = None
+
+
+def get_recent_results() -> RecentResults:
+    """Return in-memory LRU of recent results."""
+    return _RECENT
+
+
+def get_negative_cache() -> NegativeCache:
+    """Return cache of failed lookups."""
+    return _NEGATIVE
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return circuit breaker for PS Store requests."""
+    return _BREAKER
+
+
+def set_store_rate(rate: float, burst: int = DEFAULT_STORE_BURST):
+    """Set max PS Store requests per second.
+
+    :param rate: Requests per second
+    :param burst: Max requests allowed at once
+    """
+    global _LIMITER  # pylint: disable=global-statement
+    _LIMITER = RateLimiter(rate, burst)
+
+
+def set_catalog(catalog):
+    """Set catalog pack to search before PS Store.
+
+    :param catalog: :class: `pyps4_2ndscreen.catalog.Catalog`; None to remove
+    """
+    global _CATALOG  # pylint: disable=global-statement
+    _CATALOG = catalog
+
+
+def get_search_stats() -> dict:
+    """Return search counters and miss rate of store requests."""
+    stats = dict(_STATS)
+    requests = stats.get("requests", 0)
+    misses = sum(
+        count for name, count in stats.items() if name.startswith("miss_"))
+    stats["miss_rate"] = misses / requests if requests else 0.0
+    return stats
+
+
+def reset_search_stats():
+    """Reset search counters."""
+    _STATS.clear()
+
+
+def _search_done(key: tuple, future: asyncio.Future):
+    """Remove finished search and store result."""
+    _IN_FLIGHT.pop(key, None)
+    if future.cancelled():
+        return
+    # Retrieve exception so it is not reported if no caller is waiting.
+    if future.exception() is not None:
+        return
+    if future.result() is not None:
+        _RECENT.set(key, future.result())
+
+
+async def async_search_ps_store(
+        title_id: str, region: str,
+        session: Optional['aiohttp.ClientSession'] = None) -> ResultItem:
+    """Search PS Store for title data.
+
+    Concurrent searches for the same title and region share one request.
+
+    :param title_id: Title ID of title
+    :param region: Region name of PS Store
+    :param session: Session to use; Uses default pooled session if None
+    """
+    key = (title_id, normalize_region(region))
+    _STATS["lookups"] += 1
+    result_item = _RECENT.get(key)
+    if result_item is not None:
+        _STATS["recent_hits"] += 1
+        return result_item
+    if _CATALOG is not None:
+        result_item = _CATALOG.get(title_id)
+        if result_item is not None:
+            _STATS["catalog_hits"] += 1
+            return result_item
+    reason = _NEGATIVE.get(key)
+    if reason is not None:
+        _STATS["negative_hits"] += 1
+        if reason == MISS_INCOMPLETE:
+            raise PSDataIncomplete("Title data missing keys")
+        return None
+    future = _IN_FLIGHT.get(key)
+    if future is None:
+        future = asyncio.ensure_future(
+            _async_search_ps_store(key, title_id, region, session))
+        future.add_done_callback(partial(_search_done, key))
+        _IN_FLIGHT[key] = future
+    else:
+        _STATS["joined"] += 1
+        _LOGGER.debug("Joining search in progress: %s", key)
+    _WAITERS[key] += 1
+    try:
+        # Shield so that a cancelled caller does not cancel other callers.
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Cancel request if no other caller is waiting for it.
+        if _WAITERS[key] == 1:
+            future.cancel()
+        raise
+    finally:
+        _WAITERS[key] -= 1
+        if _WAITERS[key] <= 0:
+            del _WAITERS[key]
+
+
+def get_region_hint(title_id: str) -> Optional[str]:
+    """Return region which last answered for title."""
+    return _REGION_HINTS.get(title_id)
+
+
+def _set_region_hint(title_id: str, region: str):
+    """Remember region which answered for title."""
+    _REGION_HINTS[title_id] = region
+    _REGION_HINTS.move_to_end(title_id)
+    while len(_REGION_HINTS) > DEFAULT_HINT_SIZE:
+        _REGION_HINTS.popitem(last=False)
+
+
+async def async_search_ps_store_race(
+        title_id: str, regions: Optional[Iterable[str]] = None,
+        session: Optional['aiohttp.ClientSession'] = None) -> ResultItem:
+    """Search regions concurrently. Return first complete result.
+
+    Remaining searches are cancelled. The region which answered is
+    remembered for the title. If it is one of the regions given, next time
+    only it and the first region are searched, with the first region
+    preferred. The others are raced only if both miss.
+
+    :param title_id: Title ID of title
+    :param regions: Region names in order of preference
+    :param session: Session to use; Uses default pooled session if None
+    """
+    if regions is None:
+        regions = DEFAULT_RACE_REGIONS
+    if session is None:
+        session = _SESSION_MANAGER.get_session()
+
+    async def _search(region: str) -> tuple:
+        try:
+            return region, await async_search_ps_store(
+                title_id, region, session=session)
+        except PSDataIncomplete:
+            return region, None
+
+    ranked = OrderedDict()
+    for region in regions:
+        # Regions sharing a store are searched once.
+        ranked.setdefault(normalize_region(region), region)
+    hint = get_region_hint(title_id)
+    if hint is not None and normalize_region(hint) in ranked:
+        preferred = list(ranked)[:1]
+        preferred.append(normalize_region(hint))
+        tasks = [
+            asyncio.ensure_future(_search(ranked.pop(name)))
+            for name in OrderedDict.fromkeys(preferred)
+        ]
+        try:
+            # Results are taken in order of preference.
+            for task in tasks:
+                region, result_item = await task
+                if result_item is not None:
+                    _set_region_hint(title_id, region)
+                    return result_item
+        finally:
+            for task in tasks:
+                task.cancel()
+        _LOGGER.debug("Region hint: %s missed for title: %s", hint, title_id)
+
+    tasks = [
+        asyncio.ensure_future(_search(region)) for region in ranked.values()
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            region, result_item = await task
+            if result_item is not None:
+                _LOGGER.debug(
+                    "Region: %s answered for title: %s", region, title_id)
+                _set_region_hint(title_id, region)
+                return result_item
+    finally:
+        for task in tasks:
+            task.cancel()
+    return None
+
+
+def _search_failed(key: tuple, reason: str):
+    """Record failed search."""
+    _STATS["miss_{}".format(reason)] += 1
+    retry = _NEGATIVE.add(key, reason)
+    _LOGGER.info(
+        "PS Store search failed: %s; Reason: %s; Retry in %ss",
+        key, reason, round(retry))
+
+
+async def _async_search_ps_store(
+        key: tuple, title_id: str, region: str,
+        session: Optional['aiohttp.ClientSession'] = None) -> ResultItem:
     """Search PS Store for title data."""
     _LOGGER.debug("Starting search request")
+    _STATS["requests"] += 1
     result_item = None
     data = None
     codes = get_region_codes(region)
@@ -213,16 +827,98 @@ async def async_search_ps_store(title_id: str, region: str) -> ResultItem:
     image_url = BASE_IMAGE_URL.format(data_url)
     params = DEFAULT_HEADERS
 
-    async with aiohttp.ClientSession() as session:
+    if session is None:
+        session = _SESSION_MANAGER.get_session()
+    try:
         resp = await fetch(data_url, params, session)
         if resp is not None:
             data = await resp.json()
+    except asyncio.TimeoutError:
+        _search_failed(key, MISS_TIMEOUT)
+        return None
+    except PSStoreUnavailable:
+        # Store level failure; Title is not marked as failed.
+        _STATS["miss_{}".format(MISS_UNAVAILABLE)] += 1
+        return None
+    except (aiohttp.ClientError, SSLError) as error:
+        _LOGGER.debug("PS Store request error: %s", error)
+        _search_failed(key, MISS_ERROR)
+        return None
 
     if data is None or not data or not isinstance(data, dict):
+        _search_failed(key, MISS_NOT_FOUND)
         return None
 
     if data.get("gameContentTypesList") is None or data.get("title_name") is None:
+        _search_failed(key, MISS_INCOMPLETE)
         raise PSDataIncomplete("Title data missing keys")
 
-    result_item = ResultItem(title_id, image_url, data)
+    _NEGATIVE.remove(key)
+    result_item = ResultItem(
+        title_id, image_url, data, retain_data=RETAIN_DATA)
     return result_item
+
+
+def _needs_request(key: tuple) -> bool:
+    """Return True if search for key would send a store request."""
+    return (
+        _RECENT.get(key) is None
+        and _NEGATIVE.get(key) is None
+        and key not in _IN_FLIGHT
+    )
+
+
+async def async_search_ps_store_many(
+        titles: Iterable[str], region: str,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        rate: float = DEFAULT_BATCH_RATE,
+        session: Optional['aiohttp.ClientSession'] = None,
+        metadata_cache=None) -> AsyncIterator[ResultItem]:
+    """Search PS Store for many titles. Yield results as completed.
+
+    Titles which are not found are skipped.
+
+    :param titles: Title IDs to search for
+    :param region: Region name of PS Store
+    :param concurrency: Max number of searches to run at once
+    :param rate: Max store requests per second
+    :param session: Session to use; Uses default pooled session if None
+    :param metadata_cache: :class: `pyps4_2ndscreen.media_cache.MetadataCache`
+    """
+    if concurrency < 1:
+        raise ValueError("Concurrency must be greater than 0")
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+    if session is None:
+        session = _SESSION_MANAGER.get_session()
+
+    async def _search(title_id: str) -> Optional[ResultItem]:
+        if metadata_cache is not None:
+            result_item = await metadata_cache.async_get(title_id, region)
+            if result_item is not None:
+                return result_item
+        async with semaphore:
+            if _needs_request((title_id, normalize_region(region))):
+                await limiter.acquire()
+            try:
+                result_item = await async_search_ps_store(
+                    title_id, region, session=session)
+            except PSDataIncomplete:
+                return None
+        if result_item is not None and metadata_cache is not None:
+            await metadata_cache.async_set(title_id, region, result_item)
+        return result_item
+
+    # Remove duplicates and keep order.
+    tasks = [
+        asyncio.ensure_future(_search(title_id))
+        for title_id in dict.fromkeys(titles)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            result_item = await task
+            if result_item is not None:
+                yield result_item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,352 @@
+"""Persistent cache of PS Store title data."""
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from .errors import PSDataIncomplete
+from .media_art import ResultItem, normalize_region
+from .paths import DEFAULT_PATH
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = DEFAULT_PATH / ".ps_store_cache.db"
+
+DEFAULT_TTL = 60 * 60 * 24 * 7
+DEFAULT_MAX_ENTRIES = 5000
+DB_TIMEOUT = 5
+
+# Spread expiry and refreshes of entries cached at the same time.
+DEFAULT_TTL_JITTER = 0.1
+DEFAULT_REFRESH_JITTER = 5
+DEFAULT_REFRESH_CONCURRENCY = 4
+
+# Seconds between writes of access times. Hits are recorded in memory.
+ACCESS_FLUSH_INTERVAL = 60
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS titles ("
+    "title_id TEXT NOT NULL, "
+    "region TEXT NOT NULL, "
+    "cover_art TEXT, "
+    "data TEXT NOT NULL, "
+    "expires REAL NOT NULL, "
+    "last_access REAL NOT NULL, "
+    "PRIMARY KEY (title_id, region))",
+    "CREATE INDEX IF NOT EXISTS titles_last_access ON titles (last_access)",
+)
+
+
+class MetadataCache:
+    """SQLite backed cache of PS Store results.
+
+    Safe to share between processes. Least recently used entries are
+    evicted once the cache is full. Access times are written in batches
+    so cache hits do not wait on other writers. Async methods run the
+    database access in an executor so the event loop is not blocked.
+
+    :param path: Path of database file
+    :param ttl: Default seconds before an entry expires
+    :param max_entries: Max number of entries to keep
+    :param ttl_jitter: Max fraction of TTL randomly removed from each entry
+    :param refresh_jitter: Max seconds to delay a background refresh
+    :param refresh_concurrency: Max number of background refreshes at once
+    """
+
+    def __init__(
+            self, path: Optional[str] = None, ttl: float = DEFAULT_TTL,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            ttl_jitter: float = DEFAULT_TTL_JITTER,
+            refresh_jitter: float = DEFAULT_REFRESH_JITTER,
+            refresh_concurrency: int = DEFAULT_REFRESH_CONCURRENCY):
+        if path is None:
+            path = str(DEFAULT_CACHE_FILE)
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.ttl_jitter = ttl_jitter
+        self.refresh_jitter = refresh_jitter
+        self.refresh_concurrency = refresh_concurrency
+        self._conn = None
+        self._lock = threading.RLock()
+        self._accessed = {}
+        self._flush_time = time.time()
+        self._refreshing = {}
+        self._semaphore = None
+        self._loop = None
+
+    def __repr__(self):
+        return "<{}.{} path={} ttl={} max_entries={}>".format(
+            self.__module__,
+            self.__class__.__name__,
+            self.path,
+            self.ttl,
+            self.max_entries,
+        )
+
+    def __len__(self):
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT COUNT(*) FROM titles").fetchone()
+        except sqlite3.Error as error:
+            _LOGGER.error("Metadata cache error: %s", error)
+            return 0
+        return row[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return connection. Open database if needed. Call with lock."""
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=DB_TIMEOUT, isolation_level=None,
+                check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout={}".format(DB_TIMEOUT * 1000))
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def get(self, title_id: str, region: str) -> Optional[ResultItem]:
+        """Return cached item. Return None if missing or expired.
+
+        :param title_id: Title ID of title
+        :param region: Region name of PS Store
+        """
+        key = (title_id, normalize_region(region))
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT cover_art, data, expires FROM titles "
+                    "WHERE title_id=? AND region=?", key).fetchone()
+                if row is None:
+                    return None
+                if row[2] <= now:
+                    conn.execute(
+                        "DELETE FROM titles WHERE title_id=? AND region=?",
+                        key)
+                    return None
+            except sqlite3.Error as error:
+                _LOGGER.error("Metadata cache error: %s", error)
+                return None
+            self._touch(key, now)
+        return ResultItem(title_id, row[0], json.loads(row[1]))
+
+    async def async_get(
+            self, title_id: str, region: str) -> Optional[ResultItem]:
+        """Return cached item. Return None if missing or expired.
+
+        Runs :meth:`get` in an executor.
+        """
+        return await self._async_run(self.get, title_id, region)
+
+    def get_stale(self, title_id: str, region: str) -> tuple:
+        """Return tuple of cached item and True if item has expired.
+
+        Expired items are returned and not removed.
+
+        :param title_id: Title ID of title
+        :param region: Region name of PS Store
+        """
+        key = (title_id, normalize_region(region))
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._connection().execute(
+                    "SELECT cover_art, data, expires FROM titles "
+                    "WHERE title_id=? AND region=?", key).fetchone()
+                if row is None:
+                    return None, False
+            except sqlite3.Error as error:
+                _LOGGER.error("Metadata cache error: %s", error)
+                return None, False
+            self._touch(key, now)
+        item = ResultItem(title_id, row[0], json.loads(row[1]))
+        return item, row[2] <= now
+
+    async def async_get_stale(self, title_id: str, region: str) -> tuple:
+        """Return tuple of cached item and True if item has expired.
+
+        Runs :meth:`get_stale` in an executor.
+        """
+        return await self._async_run(self.get_stale, title_id, region)
+
+    def _touch(self, key: tuple, now: float):
+        """Record access time of entry. Flush if interval has passed."""
+        self._accessed[key] = now
+        if now - self._flush_time >= ACCESS_FLUSH_INTERVAL:
+            self.flush()
+
+    def _write_accessed(self, conn: sqlite3.Connection):
+        """Write recorded access times. Call inside a transaction."""
+        accessed, self._accessed = self._accessed, {}
+        self._flush_time = time.time()
+        conn.executemany(
+            "UPDATE titles SET last_access=? WHERE title_id=? AND region=?",
+            [(now, *key) for key, now in accessed.items()])
+
+    def flush(self):
+        """Write recorded access times in one transaction."""
+        with self._lock:
+            if not self._accessed:
+                self._flush_time = time.time()
+                return
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._write_accessed(conn)
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as error:
+                _LOGGER.error("Metadata cache error: %s", error)
+
+    def refresh(
+            self, title_id: str, region: str,
+            search: Callable[[], Awaitable]) -> asyncio.Future:
+        """Refresh entry in the background. Return task.
+
+        Refreshes of the same entry are combined. Each refresh is delayed
+        by a random jitter and limited by refresh_concurrency.
+
+        :param title_id: Title ID of title
+        :param region: Region name of PS Store
+        :param search: Coroutine function returning new result
+        """
+        key = (title_id, normalize_region(region))
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._async_refresh(title_id, region, search))
+            task.add_done_callback(
+                lambda _: self._refreshing.pop(key, None))
+            self._refreshing[key] = task
+        return task
+
+    async def _async_refresh(
+            self, title_id: str, region: str,
+            search: Callable[[], Awaitable]) -> Optional[ResultItem]:
+        await asyncio.sleep(random.uniform(0, self.refresh_jitter))
+        loop = asyncio.get_event_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.refresh_concurrency)
+            self._loop = loop
+        async with self._semaphore:
+            _LOGGER.debug("Refreshing title: %s, %s", title_id, region)
+            try:
+                item = await search()
+            except PSDataIncomplete:
+                item = None
+        if item is not None:
+            await self.async_set(title_id, region, item)
+        return item
+
+    def set(
+            self, title_id: str, region: str, item: ResultItem,
+            ttl: Optional[float] = None):
+        """Add item to cache. Evict least recently used if full.
+
+        :param title_id: Title ID of title
+        :param region: Region name of PS Store
+        :param item: Result to cache
+        :param ttl: Seconds before entry expires; Uses cache default if None
+        """
+        if ttl is None:
+            ttl = self.ttl
+        ttl *= 1 - random.uniform(0, self.ttl_jitter)
+        now = time.time()
+        values = (
+            title_id, normalize_region(region), item.cover_art,
+            json.dumps(item.data), now + ttl, now,
+        )
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Eviction needs current access times.
+                    self._write_accessed(conn)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO titles "
+                        "VALUES (?, ?, ?, ?, ?, ?)", values)
+                    conn.execute(
+                        "DELETE FROM titles WHERE rowid IN ("
+                        "SELECT rowid FROM titles ORDER BY last_access DESC "
+                        "LIMIT -1 OFFSET ?)", (self.max_entries,))
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as error:
+                _LOGGER.error("Metadata cache error: %s", error)
+
+    async def async_set(
+            self, title_id: str, region: str, item: ResultItem,
+            ttl: Optional[float] = None):
+        """Add item to cache. Evict least recently used if full.
+
+        Runs :meth:`set` in an executor.
+        """
+        await self._async_run(self.set, title_id, region, item, ttl)
+
+    def items(self) -> list:
+        """Return list of title ID, region code and item for all entries."""
+        try:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT title_id, region, cover_art, data FROM titles "
+                    "ORDER BY title_id").fetchall()
+        except sqlite3.Error as error:
+            _LOGGER.error("Metadata cache error: %s", error)
+            return []
+        return [
+            (row[0], row[1], ResultItem(row[0], row[2], json.loads(row[3])))
+            for row in rows
+        ]
+
+    def delete(self, title_id: str, region: str):
+        """Remove entry from cache."""
+        self._execute(
+            "DELETE FROM titles WHERE title_id=? AND region=?",
+            (title_id, normalize_region(region)))
+
+    def purge_expired(self):
+        """Remove all expired entries."""
+        self._execute("DELETE FROM titles WHERE expires<=?", (time.time(),))
+
+    def clear(self):
+        """Remove all entries."""
+        self._execute("DELETE FROM titles")
+
+    def close(self):
+        """Close database. Recorded access times are written."""
+        with self._lock:
+            if self._conn is not None:
+                self.flush()
+                self._conn.close()
+                self._conn = None
+
+    def _execute(self, statement: str, params: tuple = ()):
+        try:
+            with self._lock:
+                self._connection().execute(statement, params)
+        except sqlite3.Error as error:
+            _LOGGER.error("Metadata cache error: %s", error)
+
+    @staticmethod
+    async def _async_run(func: Callable, *args) -> Any:
+        """Return result of func run in an executor."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, partial(func, *args))
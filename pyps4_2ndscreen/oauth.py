@@ -2,10 +2,15 @@
 import logging
 import asyncio
 import base64
+import time
+from typing import AsyncIterator, Iterable, Optional
 from urllib.parse import urlparse, parse_qs
-from Cryptodome.Hash import SHA256
 
-import aiohttp
+from .lazy import lazy_import
+from .media_art import SessionManager
+
+aiohttp = lazy_import('aiohttp')
+SHA256 = lazy_import('Cryptodome.Hash.SHA256')
 
 CLIENT_ID = "ba495a24-818c-472b-b12d-ff231c1b5745"
 CLIENT_SECRET = "mvaiZkRsAsI1IBkY"
@@ -36,6 +41,9 @@ HEADERS = {
     "Content-Type": "application/x-www-form-urlencoded"
 }
 
+DEFAULT_CONCURRENCY = 5
+DEFAULT_TOKEN_TTL = 60 * 60
+
 logging.basicConfig(level=logging.INFO)
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,59 +55,160 @@ def get_user_account(redirect_url: str, loop=None):
         if not loop.is_running():
             task = asyncio.ensure_future(async_get_user_account(redirect_url))
             account = loop.run_until_complete(task)
+            loop.run_until_complete(async_close_session())
     else:
         account = loop.create_task(async_get_user_account(redirect_url))
     return account
 
 
-async def async_get_user_account(redirect_url: str) -> dict:
-    """Asyncio coroutine to get user account."""
+class AccountCache:
+    """Account info by access token. Entries expire with the token."""
+
+    def __init__(self):
+        self._accounts = {}
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return account info. Return None if missing or expired."""
+        entry = self._accounts.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._accounts.pop(token, None)
+            return None
+        return entry[1]
+
+    def set(self, token: str, account: dict, ttl: float):
+        """Add account info for token. Remove expired entries."""
+        now = time.monotonic()
+        for key in [
+                key for key, entry in self._accounts.items()
+                if entry[0] <= now]:
+            self._accounts.pop(key)
+        self._accounts[token] = (now + ttl, account)
+
+    def clear(self):
+        """Remove all entries."""
+        self._accounts.clear()
+
+
+_SESSION_MANAGER = SessionManager()
+_ACCOUNTS = AccountCache()
+
+
+def get_account_cache() -> AccountCache:
+    """Return account info cache."""
+    return _ACCOUNTS
+
+
+async def async_close_session():
+    """Close default session. Call on shutdown."""
+    await _SESSION_MANAGER.close()
+
+
+async def async_get_user_account(
+        redirect_url: str,
+        session: Optional['aiohttp.ClientSession'] = None) -> dict:
+    """Asyncio coroutine to get user account.
+
+    :param redirect_url: URL of redirect page after login
+    :param session: Session to use; Uses default pooled session if None
+    """
     code = _parse_redirect_url(redirect_url)
     if code is None:
         return None
-    token = await _get_token(code)
+    if session is None:
+        session = _SESSION_MANAGER.get_session()
+    token, ttl = await _get_token(code, session)
     if token is None:
         return None
-    account = await _fetch_account_info(token)
+    account = _ACCOUNTS.get(token)
+    if account is None:
+        account = await _fetch_account_info(token, session)
+        if account is not None:
+            _ACCOUNTS.set(token, account, ttl)
     return account
 
 
-async def _get_token(code):
+async def async_get_user_accounts(
+        redirect_urls: Iterable[str],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        session: Optional['aiohttp.ClientSession'] = None
+) -> AsyncIterator[tuple]:
+    """Get many user accounts. Yield tuples of URL and account as completed.
+
+    Account is None if it could not be retrieved.
+
+    :param redirect_urls: URLs of redirect pages after login
+    :param concurrency: Max number of accounts to get at once
+    :param session: Session to use; Uses default pooled session if None
+    """
+    if concurrency < 1:
+        raise ValueError("Concurrency must be greater than 0")
+    semaphore = asyncio.Semaphore(concurrency)
+    if session is None:
+        session = _SESSION_MANAGER.get_session()
+
+    async def _get(redirect_url: str) -> tuple:
+        async with semaphore:
+            try:
+                account = await async_get_user_account(redirect_url, session)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as error:
+                _LOGGER.error("Error getting account: %s", error)
+                account = None
+        return redirect_url, account
+
+    # Codes are single use so duplicates are removed.
+    tasks = [
+        asyncio.ensure_future(_get(redirect_url))
+        for redirect_url in dict.fromkeys(redirect_urls)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _get_token(code, session: 'aiohttp.ClientSession') -> tuple:
+    """Return tuple of access token and seconds until it expires."""
     _LOGGER.debug("Sending POST request")
     auth = aiohttp.BasicAuth(CLIENT_ID, password=CLIENT_SECRET)
     body = TOKEN_BODY.format(code).encode('ascii')
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-                url=TOKEN_URL, auth=auth,
-                headers=HEADERS, data=body, timeout=3) as resp:
-            if resp.status == 200:
-                content = await resp.json()
-                token = content.get('access_token')
-                return token
-            _LOGGER.error(
-                "Error getting token. Got response: %s", resp.status)
-            await resp.release()
-            return None
+    async with session.post(
+            url=TOKEN_URL, auth=auth,
+            headers=HEADERS, data=body, timeout=3) as resp:
+        if resp.status == 200:
+            content = await resp.json()
+            token = content.get('access_token')
+            ttl = content.get('expires_in') or DEFAULT_TOKEN_TTL
+            return token, ttl
+        _LOGGER.error(
+            "Error getting token. Got response: %s", resp.status)
+        await resp.release()
+        return None, None
 
 
-async def _fetch_account_info(token):
+async def _fetch_account_info(token, session: 'aiohttp.ClientSession'):
     auth = aiohttp.BasicAuth(CLIENT_ID, password=CLIENT_SECRET)
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-                url='{}/{}'.format(TOKEN_URL, token),
-                auth=auth, timeout=3) as resp:
-            if resp.status == 200:
-                account_info = await resp.json()
-                user_id = account_info.get('user_id')
-                user_b64 = _format_user_id(user_id, 'base64')
-                user_creds = _format_user_id(user_id, 'sha256')
-                account_info['user_rpid'] = user_b64
-                account_info['credentials'] = user_creds
-                return account_info
-            _LOGGER.error(
-                "Error getting account. Got response: %s", resp.status)
-            await resp.release()
-            return None
+    async with session.get(
+            url='{}/{}'.format(TOKEN_URL, token),
+            auth=auth, timeout=3) as resp:
+        if resp.status == 200:
+            account_info = await resp.json()
+            user_id = account_info.get('user_id')
+            user_b64 = _format_user_id(user_id, 'base64')
+            user_creds = _format_user_id(user_id, 'sha256')
+            account_info['user_rpid'] = user_b64
+            account_info['credentials'] = user_creds
+            return account_info
+        _LOGGER.error(
+            "Error getting account. Got response: %s", resp.status)
+        await resp.release()
+        return None
 
 
 def _parse_redirect_url(redirect_url):
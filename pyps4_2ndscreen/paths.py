@@ -0,0 +1,4 @@
+"""Default location of files kept by pyps4_2ndscreen."""
+from pathlib import Path
+
+DEFAULT_PATH = Path.home() / ".pyps4-2ndscreen"
@@ -3,15 +3,21 @@ import asyncio
 import logging
 import socket
 import time
+from functools import partial
 from typing import Optional, Union
 
+from .command_queue import CommandQueue
 from .connection import DEFAULT_LOGIN_DELAY, AsyncConnection, LegacyConnection
 from .credential import DEFAULT_DEVICE_NAME
-from .ddp import (STATUS_OK, STATUS_STANDBY, UDP_PORT, DDPProtocol,
-                  async_create_ddp_endpoint, get_ddp_launch_message,
-                  get_ddp_wake_message, get_socket, get_status, launch, wakeup)
-from .errors import LoginFailed, NotReady, UnknownButton
-from .media_art import ResultItem, async_search_ps_store
+from .ddp import (DEFAULT_STANDBY_DELAY, STATUS_OK, STATUS_STANDBY, UDP_PORT,
+                  DDPProtocol, async_create_ddp_endpoint,
+                  async_resolve_host_id, get_ddp_launch_bytes,
+                  get_ddp_wake_bytes, get_socket, get_status, launch,
+                  resolve_host_id, wakeup)
+from .errors import LoginFailed, NotReady, PSDataIncomplete, UnknownButton
+from .media_art import (ResultItem, async_search_ps_store,
+                        async_search_ps_store_race)
+from .media_cache import MetadataCache
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,6 +39,18 @@ BUTTONS = {
 
 PS_HOLD_TIME = 2000
 
+# Status probing used when waiting for PS4 to turn on.
+PROBE_INTERVAL = 0.1
+PROBE_MAX_INTERVAL = 1.0
+PROBE_BACKOFF = 1.5
+DEFAULT_WAKE_TIMEOUT = 60
+
+STAGE_WAKEUP = 'wakeup'
+STAGE_BOOT = 'boot'
+STAGE_CONNECT = 'connect'
+STAGE_LOGIN = 'login'
+STAGE_TOTAL = 'total'
+
 
 class Ps4Base():
     """The PS4 base object. Should not be initialized directly.
@@ -59,6 +77,8 @@ class Ps4Base():
         self.ps_name = None
         self.loggedin = False
         self.credential = credential
+        self.metadata_cache = None
+        self.stale_while_revalidate = False
 
     def __repr__(self):
         return (
@@ -71,6 +91,37 @@ class Ps4Base():
             )
         )
 
+    @classmethod
+    def from_host_id(
+            cls, host_id: str, credential: str, timeout: float = 3,
+            **kwargs) -> Optional['Ps4Base']:
+        """Return PS4 object for host-id. Return None if not found.
+
+        The last known IP address of the host-id is checked first.
+        A broadcast search is only sent if the PS4 is not found there.
+
+        :param host_id: The host-id of the PS4
+        :param credential: The credentials of a PSN account
+        :param timeout: Max seconds to wait for broadcast responses
+        """
+        host = resolve_host_id(host_id, timeout=timeout)
+        if host is None:
+            _LOGGER.info("PS4 with host-id %s not found", host_id)
+            return None
+        return cls(host, credential, **kwargs)
+
+    def set_metadata_cache(
+            self, metadata_cache: MetadataCache,
+            stale_while_revalidate: bool = False):
+        """Set cache for PS Store title data.
+
+        :param metadata_cache: :class: `pyps4_2ndscreen.media_cache.MetadataCache`
+        :param stale_while_revalidate: Return expired entries and refresh
+            them in the background
+        """
+        self.metadata_cache = metadata_cache
+        self.stale_while_revalidate = stale_while_revalidate
+
     def change_port(self, port):
         """Change DDP Port."""
         self._port = port
@@ -100,11 +151,33 @@ class Ps4Base():
             self,
             title: str,
             title_id: str,
-            region: str) -> ResultItem:
-        """Return title data from PS Store."""
-        _LOGGER.debug(
-            "Searching for title: Name: %s, SKU_ID: %s", title, title_id)
-        result_item = await async_search_ps_store(title_id, region)
+            region: str,
+            session=None,
+            race_regions: Optional[list] = None) -> ResultItem:
+        """Return title data from PS Store.
+
+        :param session: aiohttp session; Uses default pooled session if None
+        :param race_regions: Other regions to search concurrently with region
+        """
+        result_item = None
+        search = partial(
+            self._async_search_ps_store,
+            title_id, region, session, race_regions)
+        cache = self.metadata_cache
+        if cache is not None:
+            if self.stale_while_revalidate:
+                result_item, stale = await cache.async_get_stale(
+                    title_id, region)
+                if stale:
+                    cache.refresh(title_id, region, search)
+            else:
+                result_item = await cache.async_get(title_id, region)
+        if result_item is None:
+            _LOGGER.debug(
+                "Searching for title: Name: %s, SKU_ID: %s", title, title_id)
+            result_item = await search()
+            if result_item is not None and cache is not None:
+                await cache.async_set(title_id, region, result_item)
         if result_item is not None:
             _LOGGER.debug("Found Title: %s, URL: %s",
                           result_item.name, result_item.cover_art)
@@ -114,6 +187,15 @@ class Ps4Base():
 
         return None
 
+    async def _async_search_ps_store(
+            self, title_id: str, region: str, session=None,
+            race_regions: Optional[list] = None) -> ResultItem:
+        """Search PS Store in region or race regions."""
+        if race_regions:
+            return await async_search_ps_store_race(
+                title_id, [region] + list(race_regions), session=session)
+        return await async_search_ps_store(title_id, region, session=session)
+
     @property
     def port(self):
         """Return local port."""
@@ -360,12 +442,35 @@ class Ps4Async(Ps4Base):
         self.ddp_protocol = None
         self.tcp_transport = None
         self.tcp_protocol = None
-        self.task_queue = None
+        self.task_queue = CommandQueue()
         self.poll_count = 0
         self.unreachable = False
+        self.standby_start = 0
+        self.prefetch_region = None
+        self.prefetch_race_regions = None
+        self._prefetch_task = None
+        self._prefetch_title_id = None
 
         self.connection = AsyncConnection(self, self.credential)
 
+    @classmethod
+    async def async_from_host_id(
+            cls, host_id: str, credential: str, timeout: float = 3,
+            **kwargs) -> Optional['Ps4Async']:
+        """Return PS4 object for host-id. Return None if not found.
+
+        Async version of :meth:`from_host_id`.
+
+        :param host_id: The host-id of the PS4
+        :param credential: The credentials of a PSN account
+        :param timeout: Max seconds to wait for broadcast responses
+        """
+        host = await async_resolve_host_id(host_id, timeout=timeout)
+        if host is None:
+            _LOGGER.info("PS4 with host-id %s not found", host_id)
+            return None
+        return cls(host, credential, **kwargs)
+
     def open(self):
         """Not Implemented."""
         raise NotImplementedError
@@ -379,6 +484,52 @@ class Ps4Async(Ps4Base):
         """Set delay for login."""
         self._login_delay = value
 
+    def set_command_queue(self, command_queue: CommandQueue):
+        """Set queue for commands sent while not connected.
+
+        :param command_queue: :class: `pyps4_2ndscreen.command_queue.CommandQueue`
+        """
+        self.task_queue = command_queue
+
+    def set_prefetch(
+            self, region: Optional[str],
+            race_regions: Optional[list] = None):
+        """Fetch PS Store data in the background when running title changes.
+
+        :param region: Region name of PS Store; None to disable
+        :param race_regions: Other regions to search concurrently with region
+        """
+        self.prefetch_region = region
+        self.prefetch_race_regions = race_regions
+
+    def title_changed(self, title_id: str) -> Optional[asyncio.Future]:
+        """Start fetching PS Store data for new running title. Return task.
+
+        Called by DDP protocol before the status callback.
+
+        :param title_id: Title ID of running title
+        """
+        if self.prefetch_region is None:
+            return None
+        task = self._prefetch_task
+        if task is not None and not task.done():
+            if self._prefetch_title_id == title_id:
+                return task
+            task.cancel()
+        self._prefetch_title_id = title_id
+        self._prefetch_task = asyncio.ensure_future(
+            self._async_prefetch(title_id))
+        return self._prefetch_task
+
+    async def _async_prefetch(self, title_id: str):
+        """Fetch PS Store data for title."""
+        try:
+            await self.async_get_ps_store_data(
+                self.running_app_name, title_id, self.prefetch_region,
+                race_regions=self.prefetch_race_regions)
+        except PSDataIncomplete:
+            _LOGGER.debug("Prefetch data incomplete for: %s", title_id)
+
     def set_protocol(self, ddp_protocol: DDPProtocol):
         """Attach DDP protocol.
 
@@ -433,7 +584,7 @@ class Ps4Async(Ps4Base):
             _LOGGER.error("DDP Protocol does not exist/Not ready")
         else:
             self.ddp_protocol.send_msg(
-                self, get_ddp_launch_message(self.credential))
+                self, get_ddp_launch_bytes(self.credential))
 
     def wakeup(self, ignore_conflict=False):
         """Send Wakeup packet."""
@@ -445,7 +596,7 @@ class Ps4Async(Ps4Base):
                 self._power_on = True
                 self._power_off = False
                 self.ddp_protocol.send_msg(
-                    self, get_ddp_wake_message(self.credential))
+                    self, get_ddp_wake_bytes(self.credential))
             elif self.is_running and ignore_conflict:
                 _LOGGER.debug("Status is 'running'; Trying Command: Standby")
                 asyncio.ensure_future(self.standby())
@@ -536,13 +687,15 @@ class Ps4Async(Ps4Base):
             await self.standby()
 
     async def start_title(
-            self, title_id: str, running_id: Optional[str] = None):
+            self, title_id: str, running_id: Optional[str] = None,
+            ttl: Optional[float] = None):
         """Send start title packet.
 
         Closes current title if title_id is running_id
 
         :param title_id: Title to start; CUSA00000
         :param running_id: Title currently running
+        :param ttl: Seconds to keep command queued if PS4 is not on
         """
         _LOGGER.debug(
             "Command: Start Title: title_id=%s, running_id=%s",
@@ -553,27 +706,29 @@ class Ps4Async(Ps4Base):
 
         if self.tcp_protocol is None:
             _LOGGER.debug("Start Title failed: TCP Protocol does not exist")
-
-            # Queue task upon login.
-            task = ('start_title', title_id, running_id)
-            self.task_queue = task
-            _LOGGER.info(
-                "Queuing Command: Start Title: title_id=%s, running_id=%s",
-                title_id, running_id)
-            if self.is_standby:
-                self.wakeup()
-            elif self.is_running:
+            if self.is_running:
                 await self.async_connect()
+            if self.tcp_protocol is None:
+                # Queue task upon login.
+                self.task_queue.put(
+                    'start_title', title_id, running_id, ttl=ttl)
+                _LOGGER.info(
+                    "Queuing Command: Start Title: title_id=%s, running_id=%s",
+                    title_id, running_id)
+                if self.is_standby:
+                    self.wakeup()
 
         if self.tcp_protocol is not None:
             await self.tcp_protocol.start_title(title_id, running_id)
 
     async def remote_control(
-            self, button_name: str, hold_time: Optional[int] = 0):
+            self, button_name: str, hold_time: Optional[int] = 0,
+            ttl: Optional[float] = None):
         """Send remote control command packet. Is coroutine.
 
         :param button_name: Button to send to PS4.
         :param hold_time: Time to hold in millis. Only affects PS command.
+        :param ttl: Seconds to keep command queued if PS4 is not on
         """
         _LOGGER.debug("Command: Remote Control: button=%s", button_name)
         button_name = button_name.lower()
@@ -587,16 +742,17 @@ class Ps4Async(Ps4Base):
         if self.tcp_protocol is None:
             _LOGGER.debug("Remote Control failed: TCP Protocol does not exist")
 
-            # Queue task upon login.
-            task = ('remote_control', operation, hold_time)
-            self.task_queue = task
-            _LOGGER.info(
-                "Queuing Command: Remote Control: button=%s",
-                button_name)
-            if self.is_standby:
-                self.wakeup()
-            elif self.is_running:
+            if self.is_running:
                 await self.async_connect()
+            if self.tcp_protocol is None:
+                # Queue task upon login.
+                self.task_queue.put(
+                    'remote_control', operation, hold_time, ttl=ttl)
+                _LOGGER.info(
+                    "Queuing Command: Remote Control: button=%s",
+                    button_name)
+                if self.is_standby:
+                    self.wakeup()
 
         if self.tcp_protocol is not None:
             await self.tcp_protocol.remote_control(operation, hold_time)
@@ -648,10 +804,109 @@ class Ps4Async(Ps4Base):
                     self.tcp_protocol = tcp_protocol
                     self._connected = True
                     if self._power_on:  # If powering on
-                        if auto_login and self.task_queue is None:
+                        if auto_login and not self.task_queue:
                             await self.login()
                     self._power_on = False
 
+    async def wake_and_connect(
+            self,
+            timeout: Optional[float] = DEFAULT_WAKE_TIMEOUT,
+            login: Optional[bool] = True) -> dict:
+        """Wakeup PS4 and connect as soon as it is on. Is coroutine.
+
+        Status is probed rapidly with backoff while the PS4 boots.
+        Returns dict of seconds spent in each stage:
+        'wakeup', 'boot', 'connect', 'login' and 'total'.
+
+        :param timeout: Max seconds to wait for PS4 to turn on
+        :param login: If true will login after connecting
+        """
+        if self.ddp_protocol is None:
+            raise NotReady("DDP Protocol does not exist")
+        loop = asyncio.get_event_loop()
+        timings = {}
+        start = loop.time()
+        status_changed = asyncio.Event()
+        host_callbacks = self.ddp_protocol.callbacks.get(self.host) or {}
+        callback = host_callbacks.get(self)
+
+        def _status_callback():
+            # Unanswered polls call back without status.
+            if self.status is not None:
+                status_changed.set()
+            if callback is not None:
+                callback()
+
+        self.ddp_protocol.add_callback(self, _status_callback)
+        try:
+            power_on = await self._async_wait_running(
+                status_changed, start + timeout, timings)
+        finally:
+            if callback is not None:
+                self.ddp_protocol.add_callback(self, callback)
+            else:
+                self.ddp_protocol.remove_callback(self, _status_callback)
+
+        stage_start = loop.time()
+        if not self._connected:
+            await self.async_connect(auto_login=False)
+            if self.tcp_protocol is None:
+                raise NotReady("PS4 Refused Connection")
+        timings[STAGE_CONNECT] = loop.time() - stage_start
+
+        # Queued commands login when connection is made.
+        if login and not self.loggedin and not self.task_queue:
+            stage_start = loop.time()
+            await self.tcp_protocol.login(
+                power_on=power_on, delay=self.login_delay)
+            timings[STAGE_LOGIN] = loop.time() - stage_start
+        timings[STAGE_TOTAL] = loop.time() - start
+        _LOGGER.debug("PS4 @ %s ready; Timings: %s", self.host, timings)
+        return timings
+
+    async def _async_wait_running(
+            self,
+            status_changed: asyncio.Event,
+            deadline: float,
+            timings: dict) -> bool:
+        """Probe status until running. Return True if wakeup was sent."""
+        loop = asyncio.get_event_loop()
+        interval = PROBE_INTERVAL
+        power_on = False
+        wake_time = None
+        while not self.is_running:
+            now = loop.time()
+            if now >= deadline:
+                raise NotReady("Timed out waiting for PS4 to turn on")
+            if self.is_standby and not power_on:
+                stage_start = loop.time()
+                self.wakeup()
+                power_on = True
+                wake_time = loop.time()
+                timings[STAGE_WAKEUP] = wake_time - stage_start
+            status_changed.clear()
+            # Unanswered probes are expected while the PS4 boots.
+            self.poll_count = 0
+            self.ddp_protocol.send_msg(self)
+            wait = min(interval, deadline - now)
+            try:
+                await asyncio.wait_for(status_changed.wait(), wait)
+            except asyncio.TimeoutError:
+                interval = min(interval * PROBE_BACKOFF, PROBE_MAX_INTERVAL)
+            else:
+                # Wait out the interval unless the PS4 is on.
+                remaining = now + wait - loop.time()
+                if not self.is_running and remaining > 0:
+                    await asyncio.sleep(remaining)
+        if wake_time is not None:
+            timings[STAGE_BOOT] = loop.time() - wake_time
+        return power_on
+
+    @property
+    def polls_disabled(self) -> bool:
+        """Return True if status polls are disabled after standby."""
+        return time.time() - self.standby_start < DEFAULT_STANDBY_DELAY
+
     @property
     def login_delay(self) -> int:
         """Return login delay value."""
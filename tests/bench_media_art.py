@@ -0,0 +1,217 @@
+"""Benchmarks for media_art against a local stand-in PS Store.
+
+Run with: python -m tests.bench_media_art --titles 500 --latency 0.005
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from pyps4_2ndscreen import media_art
+from pyps4_2ndscreen.catalog import Catalog, export_catalog
+from pyps4_2ndscreen.image_cache import ImageCache
+from pyps4_2ndscreen.media_cache import MetadataCache
+from pyps4_2ndscreen.ps4 import Ps4Async
+
+from .fake_store import FakeStore
+
+REGION = "United States"
+
+
+def percentile(values: list, percent: float) -> float:
+    """Return percentile of values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[int(round(percent / 100 * (len(values) - 1)))]
+
+
+class Result:
+    """Timings of one benchmark scenario."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.elapsed = 0.0
+        self.requests = 0
+
+    def __repr__(self):
+        return (
+            "{:<28} {:>6} {:>9.3f} {:>9.3f} {:>10.1f} {:>8}".format(
+                self.name,
+                len(self.latencies),
+                self.p50 * 1000,
+                self.p99 * 1000,
+                self.throughput,
+                self.requests,
+            )
+        )
+
+    @property
+    def p50(self) -> float:
+        """Return median latency in seconds."""
+        return percentile(self.latencies, 50)
+
+    @property
+    def p99(self) -> float:
+        """Return 99th percentile latency in seconds."""
+        return percentile(self.latencies, 99)
+
+    @property
+    def throughput(self) -> float:
+        """Return operations per second."""
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+
+def _reset():
+    media_art.get_recent_results().clear()
+    media_art.get_negative_cache().clear()
+    media_art.get_circuit_breaker().reset()
+    media_art.reset_search_stats()
+    media_art.set_store_rate(100000, 100000)
+
+
+async def _timed(result: Result, coro):
+    start = time.perf_counter()
+    value = await coro
+    result.latencies.append(time.perf_counter() - start)
+    return value
+
+
+async def _run(store: FakeStore, name: str, coros) -> Result:
+    """Run coroutines concurrently and time each."""
+    result = Result(name)
+    requests = store.requests + store.image_requests
+    start = time.perf_counter()
+    await asyncio.gather(*[_timed(result, coro) for coro in coros])
+    result.elapsed = time.perf_counter() - start
+    result.requests = store.requests + store.image_requests - requests
+    return result
+
+
+async def _run_sequential(store: FakeStore, name: str, coros) -> Result:
+    """Run coroutines one by one and time each."""
+    result = Result(name)
+    requests = store.requests + store.image_requests
+    start = time.perf_counter()
+    for coro in coros:
+        await _timed(result, coro)
+    result.elapsed = time.perf_counter() - start
+    result.requests = store.requests + store.image_requests - requests
+    return result
+
+
+async def run_benchmarks(
+        titles: int = 200, latency: float = 0.0,
+        error_rate: float = 0.0, not_found_rate: float = 0.0) -> list:
+    """Run all scenarios. Return list of results.
+
+    :param titles: Number of distinct titles
+    :param latency: Seconds of latency added by fake store
+    :param error_rate: Fraction of store requests answered with 503
+    :param not_found_rate: Fraction of titles answered with 404
+    """
+    title_ids = ["CUSA{:05d}".format(index) for index in range(titles)]
+    not_found = title_ids[:int(titles * not_found_rate)]
+    results = []
+    store = FakeStore(latency=latency, error_rate=error_rate,
+                      not_found=not_found, seed=0)
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            patch.object(media_art, "BASE_URL", await store.start()):
+        path = Path(temp_dir)
+        try:
+            _reset()
+            results.append(await _run_sequential(store, "search sequential", (
+                media_art.async_search_ps_store(title_id, REGION)
+                for title_id in title_ids)))
+
+            _reset()
+            results.append(await _run(store, "search concurrent", (
+                media_art.async_search_ps_store(title_id, REGION)
+                for title_id in title_ids)))
+
+            results.append(await _run(store, "search recent hits", (
+                media_art.async_search_ps_store(title_id, REGION)
+                for title_id in title_ids)))
+
+            _reset()
+            results.append(await _run(store, "single flight burst", (
+                media_art.async_search_ps_store(title_ids[-1], REGION)
+                for _ in title_ids)))
+
+            _reset()
+            result = Result("batch many")
+            requests = store.requests
+            start = time.perf_counter()
+            async for _ in media_art.async_search_ps_store_many(
+                    title_ids, REGION, concurrency=20, rate=100000):
+                result.latencies.append(time.perf_counter() - start)
+            result.elapsed = time.perf_counter() - start
+            result.requests = store.requests - requests
+            results.append(result)
+
+            _reset()
+            cache = MetadataCache(str(path / "cache.db"))
+            ps4 = Ps4Async("127.0.0.1", "")
+            ps4.set_metadata_cache(cache)
+            results.append(await _run_sequential(store, "metadata cache cold", (
+                ps4.async_get_ps_store_data(None, title_id, REGION)
+                for title_id in title_ids)))
+            _reset()
+            results.append(await _run_sequential(store, "metadata cache warm", (
+                ps4.async_get_ps_store_data(None, title_id, REGION)
+                for title_id in title_ids)))
+
+            export_catalog(str(path / "titles.cat"), cache)
+            cache.close()
+            with Catalog(str(path / "titles.cat")) as catalog:
+                media_art.set_catalog(catalog)
+                _reset()
+                results.append(await _run_sequential(store, "catalog", (
+                    media_art.async_search_ps_store(title_id, REGION)
+                    for title_id in title_ids)))
+                media_art.set_catalog(None)
+
+            _reset()
+            image_cache = ImageCache(str(path / "images"), max_age=0)
+            urls = [
+                media_art.BASE_IMAGE_URL.format(
+                    media_art.BASE_URL.format("us", "en", title_id))
+                for title_id in title_ids
+            ]
+            results.append(await _run(store, "image cold", (
+                image_cache.async_get(url) for url in urls)))
+            results.append(await _run(store, "image revalidate", (
+                image_cache.async_get(url) for url in urls)))
+            image_cache.max_age = 3600
+            results.append(await _run(store, "image warm", (
+                image_cache.async_get(url) for url in urls)))
+            image_cache.close()
+        finally:
+            await media_art.async_close_session()
+            await store.stop()
+            _reset()
+            media_art.set_store_rate(media_art.DEFAULT_STORE_RATE)
+    return results
+
+
+def main():
+    """Run benchmarks and print report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    results = asyncio.get_event_loop().run_until_complete(run_benchmarks(
+        args.titles, args.latency, args.error_rate, args.not_found_rate))
+    print("{:<28} {:>6} {:>9} {:>9} {:>10} {:>8}".format(
+        "scenario", "ops", "p50 ms", "p99 ms", "ops/s", "requests"))
+    for result in results:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
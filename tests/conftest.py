@@ -0,0 +1,15 @@
+"""Fixtures for pyps4_2ndscreen tests."""
+from unittest.mock import patch
+
+import pytest
+
+from pyps4_2ndscreen import ddp
+
+
+@pytest.fixture(autouse=True)
+def clear_host_cache():
+    """Start each test with no known host addresses."""
+    with patch.dict(ddp._HOST_IPS, clear=True), patch.dict(
+        ddp._HOST_IDS, clear=True
+    ), patch.dict(ddp._PENDING_HOSTS, clear=True):
+        yield
@@ -0,0 +1,119 @@
+"""Local stand-in for the PS Store chihiro API."""
+import asyncio
+import hashlib
+import random
+from typing import Iterable, Optional
+
+from aiohttp import web
+
+BASE_PATH = "/store/api/chihiro/00_09_000/titlecontainer"
+IMAGE_SIZE = 64 * 1024
+
+
+def make_title(title_id: str) -> dict:
+    """Return title data for title."""
+    return {
+        "title_name": "Title {}".format(title_id),
+        "gameContentTypesList": [{"name": "Full Game", "key": "GAME"}],
+        "long_desc": "some text " * 50,
+    }
+
+
+def make_image(title_id: str, size: int = IMAGE_SIZE) -> bytes:
+    """Return image bytes for title."""
+    seed = hashlib.sha256(title_id.encode()).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+class FakeStore:
+    """Fake chihiro titlecontainer server.
+
+    Any title is served unless it is in not_found.
+
+    :param latency: Seconds to delay each response
+    :param error_rate: Fraction of requests answered with 503
+    :param not_found: Title IDs answered with 404
+    :param titles: Title data to serve by title ID
+    :param default: Title data to serve for other titles
+    :param seed: Seed for error sampling
+    """
+
+    def __init__(
+            self, latency: float = 0.0, error_rate: float = 0.0,
+            not_found: Iterable[str] = (), titles: Optional[dict] = None,
+            default: Optional[dict] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.not_found = set(not_found)
+        self.titles = titles or {}
+        self.default = default
+        self.requests = 0
+        self.image_requests = 0
+        self.errors = 0
+        self.peers = set()
+        self._random = random.Random(seed)
+        self._runner = None
+        self.port = None
+
+    @property
+    def base_url(self) -> str:
+        """Return URL template to use as media_art.BASE_URL."""
+        return "http://127.0.0.1:{}{}/{{}}/{{}}/999/{{}}_00".format(
+            self.port, BASE_PATH)
+
+    async def start(self) -> str:
+        """Start server. Return URL template."""
+        app = web.Application()
+        prefix = BASE_PATH + "/{country}/{lang}/999/{title}"
+        app.router.add_get(prefix, self._handle_title)
+        app.router.add_get(prefix + "/image", self._handle_image)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self.base_url
+
+    async def stop(self):
+        """Stop server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def _respond(self, request) -> Optional[str]:
+        """Apply latency and errors. Return title ID."""
+        self.peers.add(request.transport.get_extra_info("peername"))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise web.HTTPServiceUnavailable()
+        title_id = request.match_info["title"].rsplit("_", 1)[0]
+        if title_id in self.not_found:
+            raise web.HTTPNotFound()
+        return title_id
+
+    async def _handle_title(self, request):
+        self.requests += 1
+        title_id = await self._respond(request)
+        data = self.titles.get(title_id) or self.default
+        if data is None:
+            data = make_title(title_id)
+        return web.json_response(data)
+
+    async def _handle_image(self, request):
+        self.image_requests += 1
+        title_id = await self._respond(request)
+        image = make_image(title_id)
+        etag = '"{}"'.format(hashlib.sha256(image).hexdigest()[:16])
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(
+            body=image, content_type="image/png", headers={"ETag": etag})
@@ -0,0 +1,106 @@
+"""Tests for pyps4_2ndscreen.catalog."""
+from unittest.mock import patch
+
+import pytest
+from asynctest import CoroutineMock as mock_coro
+
+from pyps4_2ndscreen import catalog, media_art
+from pyps4_2ndscreen.media_cache import MetadataCache
+
+MOCK_REGION = "United States"
+
+
+def _mock_item(index, name="Title"):
+    data = {
+        "title_name": "{} {}".format(name, index),
+        "gameContentTypesList": [{"key": "APP" if index % 2 else "GAME"}],
+    }
+    title_id = "CUSA{:05d}".format(index)
+    return media_art.ResultItem(title_id, "https://url/{}".format(title_id), data)
+
+
+def test_write_read(tmp_path):
+    """Test catalog lookups."""
+    path = str(tmp_path / "titles.cat")
+    items = [_mock_item(index) for index in (5, 1, 3, 2)]
+    items.append(_mock_item(3, name="Other"))
+    items.append(media_art.ResultItem("X" * 17, None, {}))
+    items.append(media_art.ResultItem("CUSA00000", None, {"title_name": "Ω"}))
+    assert catalog.write_catalog(path, items) == 5
+
+    with catalog.Catalog(path) as cat:
+        assert len(cat) == 5
+        item = cat.get("CUSA00003")
+        assert item.sku_id == "CUSA00003"
+        assert item.name == "Other 3"
+        assert item.game_type == "APP"
+        assert item.cover_art == "https://url/CUSA00003"
+        assert cat.get("CUSA00002").game_type == "GAME"
+
+        item = cat.get("CUSA00000")
+        assert item.name == "Ω"
+        assert item.game_type is None
+        assert item.cover_art is None
+
+        assert cat.get("CUSA00004") is None
+        assert cat.get("X" * 17) is None
+        assert "CUSA00005" in cat
+        assert "CUSA99999" not in cat
+        assert [item.sku_id for item in cat] == [
+            "CUSA00000",
+            "CUSA00001",
+            "CUSA00002",
+            "CUSA00003",
+            "CUSA00005",
+        ]
+
+    catalog.write_catalog(path, [])
+    with catalog.Catalog(path) as cat:
+        assert not cat
+        assert cat.get("CUSA00001") is None
+
+
+def test_invalid(tmp_path):
+    """Test invalid file raises."""
+    path = tmp_path / "titles.cat"
+    path.write_bytes(b"not a catalog")
+    with pytest.raises(ValueError):
+        catalog.Catalog(str(path))
+
+
+def test_export_import(tmp_path):
+    """Test catalog export from and import to metadata cache."""
+    path = str(tmp_path / "titles.cat")
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    for index in range(10):
+        item = _mock_item(index)
+        cache.set(item.sku_id, MOCK_REGION, item)
+    assert catalog.export_catalog(path, cache) == 10
+    cache.close()
+
+    cache = MetadataCache(str(tmp_path / "cache_2.db"))
+    assert catalog.import_catalog(path, cache, "Japan") == 10
+    assert cache.get("CUSA00007", "Japan").name == "Title 7"
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_search_catalog(tmp_path):
+    """Test search uses catalog before PS Store."""
+    path = str(tmp_path / "titles.cat")
+    catalog.write_catalog(path, [_mock_item(1)])
+    cat = catalog.Catalog(path)
+    media_art.set_catalog(cat)
+    media_art.reset_search_stats()
+    try:
+        with patch(
+            "pyps4_2ndscreen.media_art.fetch", new=mock_coro(return_value=None)
+        ) as mock_fetch:
+            item = await media_art.async_search_ps_store("CUSA00001", MOCK_REGION)
+            assert item.name == "Title 1"
+            assert not mock_fetch.mock_calls
+            assert media_art.get_search_stats()["catalog_hits"] == 1
+    finally:
+        media_art.set_catalog(None)
+        cat.close()
+        await media_art.async_close_session()
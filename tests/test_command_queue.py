@@ -0,0 +1,114 @@
+"""Tests for pyps4_2ndscreen.command_queue."""
+import json
+from unittest.mock import patch
+
+from pyps4_2ndscreen import command_queue
+
+MOCK_TITLE_ID = "CUSA00000"
+
+
+def test_queue_order():
+    """Test commands are returned in order."""
+    queue = command_queue.CommandQueue()
+    assert not queue
+    queue.put("start_title", MOCK_TITLE_ID, None)
+    queue.put("remote_control", 16, 0)
+    assert len(queue) == 2
+
+    commands = queue.pop_all()
+    assert [command.name for command in commands] == [
+        "start_title",
+        "remote_control",
+    ]
+    assert commands[0].args == (MOCK_TITLE_ID, None)
+    assert not queue
+    assert not queue.pop_all()
+
+
+def test_queue_peek_remove(tmp_path):
+    """Test commands are kept until removed."""
+    path = str(tmp_path / "queue.json")
+    queue = command_queue.CommandQueue(path)
+    assert queue.peek() is None
+    queue.put("remote_control", 32, 0, ttl=-1)  # Expired
+    command = queue.put("start_title", MOCK_TITLE_ID, None)
+    queue.put("remote_control", 16, 0)
+
+    assert queue.peek() == command
+    assert queue.peek() == command
+    assert len(command_queue.CommandQueue(path)) == 2
+
+    queue.remove(command)
+    queue.remove(command)
+    assert [item.name for item in command_queue.CommandQueue(path)] == [
+        "remote_control"
+    ]
+
+
+def test_queue_expiry():
+    """Test expired commands are discarded."""
+    queue = command_queue.CommandQueue(ttl=10)
+    with patch("pyps4_2ndscreen.command_queue.time.time", return_value=100):
+        command = queue.put("start_title", MOCK_TITLE_ID)
+        no_expiry = queue.put("remote_control", 16, 0, ttl=None)
+        short = queue.put("remote_control", 32, 0, ttl=1)
+    assert command.expires == 110
+    assert no_expiry.expires == 110
+    assert short.expires == 101
+
+    with patch("pyps4_2ndscreen.command_queue.time.time", return_value=105):
+        assert queue.pop_all() == [command, no_expiry]
+
+    queue = command_queue.CommandQueue()
+    assert queue.put("standby").expires is None
+
+
+def test_queue_expired_only(tmp_path):
+    """Test queue of only expired commands is empty."""
+    path = str(tmp_path / "queue.json")
+    queue = command_queue.CommandQueue(path)
+    queue.put("start_title", MOCK_TITLE_ID)
+    queue.put("remote_control", 16, 0, ttl=-1)
+    queue.put("remote_control", 32, 0, ttl=-1)
+    assert len(queue) == 1
+    queue.clear()
+    queue.put("remote_control", 16, 0, ttl=-1)
+    assert not queue
+    assert queue.peek() is None
+    assert not command_queue.CommandQueue(path)._commands
+
+
+def test_queue_persistence(tmp_path):
+    """Test commands persist across instances."""
+    path = str(tmp_path / "queue.json")
+    queue = command_queue.CommandQueue(path)
+    queue.put("start_title", MOCK_TITLE_ID, None)
+    queue.put("remote_control", 16, 0, ttl=-1)  # Expired
+
+    with open(path) as _r_file:
+        assert len(json.load(_r_file)) == 2
+
+    queue = command_queue.CommandQueue(path)
+    commands = list(queue)
+    assert len(commands) == 1
+    assert commands[0].name == "start_title"
+    assert commands[0].args == (MOCK_TITLE_ID, None)
+
+    queue.pop_all()
+    assert not command_queue.CommandQueue(path)
+
+
+def test_queue_persistence_errors(tmp_path):
+    """Test invalid files are handled."""
+    path = tmp_path / "queue.json"
+    path.write_text("not json")
+    assert not command_queue.CommandQueue(str(path))
+
+    path.write_text(json.dumps([{"args": []}, {"name": "standby"}]))
+    queue = command_queue.CommandQueue(str(path))
+    assert [command.name for command in queue] == ["standby"]
+
+    # Missing directory does not raise.
+    queue = command_queue.CommandQueue(str(tmp_path / "missing" / "queue.json"))
+    queue.put("standby")
+    assert len(queue) == 1
@@ -0,0 +1,159 @@
+"""Tests for pyps4_2ndscreen.config_store."""
+import json
+import multiprocessing
+from unittest.mock import patch
+
+from pyps4_2ndscreen import config_store, helpers
+
+MOCK_HOST = "192.168.0.1"
+MOCK_CREDS = "abcd1234abcd1234abcd1234abcd1234abcd1234abcd1234abcd1234abcd1234"
+MOCK_TITLE_ID = "CUSA00129"
+MOCK_TITLE = "Netflix"
+
+
+def test_update_load(tmp_path):
+    """Test data is upserted and loaded by file type."""
+    store = config_store.ConfigStore(str(tmp_path / "config.db"))
+    assert store.load("ps4") == {}
+    assert not store.has_data("ps4")
+
+    store.update("ps4", {MOCK_HOST: MOCK_CREDS})
+    store.update("ps4", {"192.168.0.2": MOCK_CREDS})
+    store.update("games", {MOCK_TITLE_ID: MOCK_TITLE})
+    assert store.load("ps4") == {
+        MOCK_HOST: MOCK_CREDS, "192.168.0.2": MOCK_CREDS}
+    assert store.has_data("games")
+    assert store.get("games", MOCK_TITLE_ID) == MOCK_TITLE
+    assert store.get("games", "CUSA00000", "default") == "default"
+
+    store.delete("ps4", MOCK_HOST)
+    store.close()
+    store = config_store.ConfigStore(str(tmp_path / "config.db"))
+    assert store.load("ps4") == {"192.168.0.2": MOCK_CREDS}
+    store.close()
+
+
+def test_migrate(tmp_path):
+    """Test JSON files are imported once."""
+    ps4_file = tmp_path / "ps4.json"
+    ps4_file.write_text(json.dumps({MOCK_HOST: MOCK_CREDS}))
+    games_file = tmp_path / "games.json"
+    games_file.write_text("not json")
+    json_files = {
+        "ps4": str(ps4_file),
+        "games": str(games_file),
+        "credentials": str(tmp_path / "missing.json"),
+    }
+    path = str(tmp_path / "config.db")
+    store = config_store.ConfigStore(path, json_files)
+    assert store.load("ps4") == {MOCK_HOST: MOCK_CREDS}
+    assert store.load("games") == {}
+    store.delete("ps4", MOCK_HOST)
+    store.close()
+
+    # Deleted entries are not imported again.
+    store = config_store.ConfigStore(path, json_files)
+    assert store.load("ps4") == {}
+    store.close()
+
+
+def test_migrate_changed(tmp_path):
+    """Test JSON files changed after import are imported again."""
+    ps4_file = tmp_path / "ps4.json"
+    ps4_file.write_text(json.dumps({MOCK_HOST: MOCK_CREDS}))
+    json_files = {"ps4": str(ps4_file)}
+    path = str(tmp_path / "config.db")
+    store = config_store.ConfigStore(path, json_files)
+    store.update("ps4", {"192.168.0.2": MOCK_CREDS})
+    store.close()
+
+    with patch.dict(helpers.FILE_TYPES, json_files):
+        helpers.Helper().save_files({MOCK_HOST: "changed"}, "ps4")
+    store = config_store.ConfigStore(path, json_files)
+    assert store.load("ps4") == {
+        MOCK_HOST: "changed", "192.168.0.2": MOCK_CREDS}
+    store.close()
+
+    # Changes are unknown if imported by earlier version.
+    store = config_store.ConfigStore(path, json_files)
+    store._transaction([(
+        "DELETE FROM meta WHERE key=?",
+        (config_store.IMPORTED_KEY.format("ps4"),))])
+    store.close()
+    ps4_file.write_text(json.dumps({MOCK_HOST: "stale value"}))
+    store = config_store.ConfigStore(path, json_files)
+    assert store.get("ps4", MOCK_HOST) == "changed"
+    store.close()
+
+
+def _write_games(path, start):
+    store = config_store.ConfigStore(path)
+    for index in range(start, start + 50):
+        store.update("games", {"CUSA{:05d}".format(index): MOCK_TITLE})
+    store.close()
+
+
+def test_multi_process(tmp_path):
+    """Test concurrent writers in separate processes."""
+    path = str(tmp_path / "config.db")
+    processes = [
+        multiprocessing.Process(target=_write_games, args=(path, start))
+        for start in (0, 50, 100)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    store = config_store.ConfigStore(path)
+    assert len(store.load("games")) == 150
+    store.close()
+
+
+def test_helper_store(tmp_path):
+    """Test helper uses config store."""
+    store = config_store.ConfigStore(str(tmp_path / "config.db"))
+    helper = helpers.Helper(store)
+    assert not helper.check_data("ps4")
+    assert helper.check_files("ps4") == store.path
+    assert helper.check_files("random type") is None
+    assert helper.save_files({MOCK_HOST: MOCK_CREDS}, "ps4") == store.path
+    assert helper.save_files({"192.168.0.2": MOCK_CREDS}, "ps4") == store.path
+    assert helper.save_files({MOCK_HOST: MOCK_CREDS}, "random type") is None
+    assert helper.check_data("ps4")
+    # Saving replaces the old address of a relinked console.
+    assert helper.load_files("ps4") == {"192.168.0.2": MOCK_CREDS}
+    store.close()
+
+
+def test_replace(tmp_path):
+    """Test replace removes keys not in data."""
+    store = config_store.ConfigStore(str(tmp_path / "config.db"))
+    store.update("ps4", {MOCK_HOST: MOCK_CREDS})
+    store.update("games", {MOCK_TITLE_ID: MOCK_TITLE})
+    store.replace("ps4", {"192.168.0.2": MOCK_CREDS})
+    assert store.load("ps4") == {"192.168.0.2": MOCK_CREDS}
+    assert store.load("games") == {MOCK_TITLE_ID: MOCK_TITLE}
+    store.replace("ps4", {})
+    assert not store.has_data("ps4")
+    store.close()
+
+
+def test_load_cache(tmp_path):
+    """Test loaded data is cached until changed by any connection."""
+    path = str(tmp_path / "config.db")
+    store = config_store.ConfigStore(path)
+    other = config_store.ConfigStore(path)
+    store.update("games", {MOCK_TITLE_ID: MOCK_TITLE})
+    games = store.load("games")
+    games["CUSA00000"] = "Modified"
+    assert store.load("games") == {MOCK_TITLE_ID: MOCK_TITLE}
+
+    store.update("games", {"CUSA00001": MOCK_TITLE})
+    assert len(store.load("games")) == 2
+    other.update("games", {"CUSA00002": MOCK_TITLE})
+    assert len(store.load("games")) == 3
+    other.delete("games", MOCK_TITLE_ID)
+    assert MOCK_TITLE_ID not in store.load("games")
+    store.close()
+    other.close()
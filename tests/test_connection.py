@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 from asynctest import CoroutineMock as mock_coro
 from pyps4_2ndscreen import connection as c
+from pyps4_2ndscreen.command_queue import CommandQueue
 
 pytestmark = pytest.mark.asyncio
 
@@ -863,12 +864,102 @@ async def test_connection_made_task_queue():
     """Test task queue."""
     mock_protocol, mock_ps4 = setup_mock_protocol()
     mock_protocol.start_title = mock_coro()
-    mock_ps4.task_queue = ("start_title", MOCK_TITLE_ID)
+    mock_ps4.task_queue = CommandQueue()
+    mock_ps4.task_queue.put("start_title", MOCK_TITLE_ID)
     mock_ps4.loggedin = True
     mock_protocol.connection_made(MagicMock())
     await asyncio.sleep(0)
     assert mock_protocol.task_available.is_set()
     assert len(mock_protocol.start_title.mock_calls) == 1
+    assert not mock_ps4.task_queue
+
+
+async def test_connection_made_task_queue_order():
+    """Test queued tasks run in order after login."""
+    mock_protocol, mock_ps4 = setup_mock_protocol()
+    calls = []
+
+    async def _login(*args, **kwargs):
+        calls.append("login")
+        mock_ps4.loggedin = True
+
+    async def _start_title(*args):
+        calls.append(("start_title",) + args)
+
+    async def _remote_control(*args):
+        calls.append(("remote_control",) + args)
+
+    mock_protocol.login = _login
+    mock_protocol.start_title = _start_title
+    mock_protocol.remote_control = _remote_control
+    mock_ps4.login_delay = 0
+    mock_ps4.task_queue = CommandQueue()
+    mock_ps4.task_queue.put("start_title", MOCK_TITLE_ID, None)
+    mock_ps4.task_queue.put("remote_control", 16, 0)
+    mock_ps4.task_queue.put("remote_control", 32, 0, ttl=-1)  # Expired
+    mock_ps4.task_queue.put("unknown")
+    mock_ps4.task_queue.put("remote_control", 64, 0)
+    mock_protocol.connection_made(MagicMock())
+    await asyncio.sleep(0.1)
+    assert calls == [
+        "login",
+        ("start_title", MOCK_TITLE_ID, None),
+        ("remote_control", 16, 0),
+        ("remote_control", 64, 0),
+    ]
+    assert not mock_ps4.task_queue
+
+    # Test commands are kept if login fails.
+    calls.clear()
+
+    async def _login_failed(*args, **kwargs):
+        calls.append("login")
+
+    mock_ps4.loggedin = False
+    mock_protocol.login = _login_failed
+    mock_ps4.task_queue.put("start_title", MOCK_TITLE_ID, None)
+    mock_ps4.task_queue.put("remote_control", 16, 0)
+    mock_protocol.connection_made(MagicMock())
+    await asyncio.sleep(0.1)
+    assert calls == ["login"]
+    assert len(mock_ps4.task_queue) == 2
+
+    # Test commands not sent are kept when logged out during run.
+    calls.clear()
+
+    async def _start_title_logout(*args):
+        calls.append(("start_title",) + args)
+        mock_ps4.loggedin = False
+
+    mock_protocol.login = _login
+    mock_protocol.start_title = _start_title_logout
+    mock_protocol.connection_made(MagicMock())
+    await asyncio.sleep(0.1)
+    assert calls == ["login", ("start_title", MOCK_TITLE_ID, None)]
+    assert [command.name for command in mock_ps4.task_queue] == [
+        "remote_control"
+    ]
+
+
+async def test_connection_made_task_queue_expired():
+    """Test login if queued commands have expired."""
+    mock_protocol, mock_ps4 = setup_mock_protocol()
+    mock_protocol.login = mock_coro()
+    mock_protocol.start_title = mock_coro()
+    mock_ps4.loggedin = False
+    mock_ps4.login_delay = 0
+    mock_ps4.task_queue = CommandQueue()
+    mock_ps4.task_queue.put("start_title", MOCK_TITLE_ID, None, ttl=-1)
+    assert not mock_ps4.task_queue
+    mock_protocol.connection_made(MagicMock())
+    await asyncio.sleep(0)
+    assert not mock_protocol.login.mock_calls
+
+    # Test login if commands expire before they are run.
+    mock_ps4.task_queue.put("start_title", MOCK_TITLE_ID, None, ttl=-1)
+    await mock_protocol._run_queued_tasks()
+    assert len(mock_protocol.login.mock_calls) == 1
+    assert not mock_protocol.start_title.mock_calls
 
 
 def test_connection_lost():
@@ -1,4 +1,5 @@
 """Tests for pyps4_2ndscreen.credential."""
+import asyncio
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -121,3 +122,90 @@ def test_creds_errors():
         creds = init_creds()
         creds.listen()
         assert creds.sock is None
+
+
+async def _client(address, message):
+    """Return responses to message from credential service."""
+    loop = asyncio.get_event_loop()
+    responses = asyncio.Queue()
+
+    class _Client(asyncio.DatagramProtocol):
+        def datagram_received(self, data, addr):
+            responses.put_nowait(data)
+
+    transport, _ = await loop.create_datagram_endpoint(
+        _Client, remote_addr=address
+    )
+    transport.sendto(message.encode())
+    return transport, responses
+
+
+async def test_async_creds():
+    """Test async service answers many clients for many consoles."""
+    consoles = [
+        credential.VirtualConsole("Console {}".format(index)) for index in range(3)
+    ]
+    for console in consoles:
+        console.host = "127.0.0.1"
+    service = credential.AsyncCredentials(consoles, port=0)
+    assert await service.start()
+    address = service.addresses[0]
+
+    clients = [
+        await _client(address, get_ddp_search_message()) for _ in range(5)
+    ]
+    for transport, responses in clients:
+        names = set()
+        for _ in consoles:
+            data = await asyncio.wait_for(responses.get(), 1)
+            names.add(data.decode().split("host-name:")[1].splitlines()[0])
+        assert names == {console.device_name for console in consoles}
+
+    creds = ["{:064x}".format(index) for index in range(5)]
+    for (transport, _), creds_value in zip(clients, creds):
+        transport.sendto(get_ddp_wake_message(creds_value).encode())
+    # Resent wakeup is only reported once.
+    clients[0][0].sendto(get_ddp_wake_message(creds[0]).encode())
+    results = [await service.get(1) for _ in creds]
+    assert sorted(result.credential for result in results) == creds
+    assert all(result.host_id is None for result in results)
+    with pytest.raises(credential.CredentialTimeout):
+        await service.get(0.1)
+
+    for transport, _ in clients:
+        transport.close()
+    service.close()
+    assert not service.addresses
+
+
+async def test_async_creds_console_host():
+    """Test console is known when it has its own endpoint."""
+    console = credential.VirtualConsole(host_id="ABCDEF123456", host="127.0.0.1")
+    async with credential.AsyncCredentials([console], port=0) as service:
+        transport, _ = await _client(
+            service.addresses[0], get_ddp_wake_message(MOCK_CREDS)
+        )
+        result = await service.__anext__()
+        assert result.credential == MOCK_CREDS
+        assert result.host_id == "ABCDEF123456"
+        transport.close()
+
+
+async def test_async_creds_errors():
+    """Test async service error handling."""
+    service = credential.AsyncCredentials()
+    with pytest.raises(credential.CredentialTimeout):
+        await service.get(0.1)
+    with patch(
+        "pyps4_2ndscreen.credential.socket.socket.bind",
+        side_effect=credential.socket.error,
+    ):
+        assert not await service.start()
+    assert not service.protocols
+
+    protocol = credential.CredentialProtocol(service.consoles, asyncio.Queue())
+    protocol._transport = MagicMock()
+    protocol.datagram_received(b"\xff", MOCK_ADDRESS)
+    protocol.datagram_received(b"WAKEUP * HTTP/1.1\n", MOCK_ADDRESS)
+    assert protocol.queue.empty()
+    assert not protocol._transport.sendto.mock_calls
@@ -3,15 +3,18 @@ import asyncio
 import itertools
 import logging
 import socket
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 from asynctest import CoroutineMock as mock_coro
 
 from pyps4_2ndscreen import ddp
+from pyps4_2ndscreen.config_store import ConfigStore
 from pyps4_2ndscreen.credential import get_ddp_message
 from pyps4_2ndscreen.ps4 import STATUS_STANDBY
 from pyps4_2ndscreen.ps4 import Ps4Async as ps4
+from pyps4_2ndscreen.ps4 import Ps4Legacy
 
 pytestmark = pytest.mark.asyncio
 
@@ -156,6 +159,39 @@ def test_ddp_messages():
         assert item in MOCK_DDP_MESSAGE.format(ddp.DDP_TYPE_WAKEUP, cred_data)
 
 
+def test_ddp_message_bytes():
+    """Test that encoded DDP messages are cached and match messages."""
+    assert ddp.get_ddp_search_bytes() == ddp.get_ddp_search_message().encode()
+    assert ddp.get_ddp_search_bytes() is ddp.get_ddp_search_bytes()
+
+    launch_msg = ddp.get_ddp_launch_bytes(MOCK_CREDS)
+    assert launch_msg == ddp.get_ddp_launch_message(MOCK_CREDS).encode()
+    assert launch_msg is ddp.get_ddp_launch_bytes(MOCK_CREDS)
+
+    wake_msg = ddp.get_ddp_wake_bytes(MOCK_CREDS)
+    assert wake_msg == ddp.get_ddp_wake_message(MOCK_CREDS).encode()
+    assert wake_msg is ddp.get_ddp_wake_bytes(MOCK_CREDS)
+    assert wake_msg != ddp.get_ddp_wake_bytes(MOCK_DDP_PROTO_CREDS)
+
+
+def test_protocol_send_bytes():
+    """Test that protocol sends bytes without encoding."""
+    mock_ddp = ddp.DDPProtocol()
+    mock_ddp._transport = MagicMock()
+    mock_ps4 = ps4(MOCK_HOST, MOCK_CREDS)
+
+    mock_ddp.send_msg(mock_ps4)
+    mock_ddp._transport.sendto.assert_called_with(
+        ddp.get_ddp_search_bytes(), (MOCK_HOST, ddp.DDP_PORT)
+    )
+
+    # Str messages are still accepted.
+    mock_ddp.send_msg(mock_ps4, ddp.get_ddp_wake_message(MOCK_CREDS))
+    mock_ddp._transport.sendto.assert_called_with(
+        ddp.get_ddp_wake_bytes(MOCK_CREDS), (MOCK_HOST, ddp.DDP_PORT)
+    )
+
+
 def test_incorrect_ddp_msg_type():
     """Test incorrect ddp msg type."""
     with pytest.raises(TypeError):
@@ -240,7 +276,7 @@ def test_search():
         assert MOCK_HOST in mock_result.values()
         args, _ = mock_send.call_args
         assert ddp.BROADCAST_IP == args[0]
-        assert ddp.get_ddp_search_message() == args[1]
+        assert ddp.get_ddp_search_bytes() == args[1]
 
 
 def test_search_recv_retry():
@@ -368,7 +404,7 @@ def test_ddp_disable_polls():
     mock_ddp.send_msg(mock_ps4)
     assert len(mock_ddp._transport.sendto.mock_calls) == 1
     assert mock_ps4.status is not None
-    assert not mock_ddp.polls_disabled
+    assert not mock_ps4.polls_disabled
 
     # Diabled polls
     mock_ddp._handle(
@@ -376,13 +412,17 @@ def test_ddp_disable_polls():
     )
     mock_ddp.send_msg(mock_ps4)
     assert len(mock_ddp._transport.sendto.mock_calls) == 1
-    assert mock_ddp.polls_disabled
+    assert mock_ps4.polls_disabled
+
+    # Wakeup is still sent.
+    mock_ddp.send_msg(mock_ps4, ddp.get_ddp_wake_bytes(MOCK_CREDS))
+    assert len(mock_ddp._transport.sendto.mock_calls) == 2
 
     # Disabled timer expires
-    mock_ddp._standby_start = 0
+    mock_ps4.standby_start = 0
     mock_ddp.send_msg(mock_ps4)
-    assert len(mock_ddp._transport.sendto.mock_calls) == 2
-    assert not mock_ddp.polls_disabled
+    assert len(mock_ddp._transport.sendto.mock_calls) == 3
+    assert not mock_ps4.polls_disabled
 
 
 def test_get_socket_error():
@@ -600,3 +640,158 @@ async def test_status():
 
     mock_devices[0].close()
     mock_devices[1].close()
+
+
+def test_search_expected():
+    """Test search returns once expected hosts respond."""
+    mock_sock = MagicMock()
+    mock_sock.recvfrom.return_value = (
+        MOCK_DDP_RESPONSE.encode(),
+        (MOCK_HOST, MOCK_RANDOM_PORT),
+    )
+    with patch(
+        "pyps4_2ndscreen.ddp.select.select",
+        return_value=([mock_sock], [MagicMock()], [MagicMock()]),
+    ), patch("pyps4_2ndscreen.ddp._send_msg"):
+        start = time.time()
+        result = ddp.search(host=None, sock=mock_sock, expected=[MOCK_HOST])
+        assert len(result) == 1
+        assert time.time() - start < 1
+        assert len(mock_sock.recvfrom.mock_calls) == 1
+
+
+def test_host_cache_moved():
+    """Test PS4 is rediscovered and moved when its address changes."""
+    mock_ddp = ddp.DDPProtocol()
+    mock_ddp._transport = MagicMock()
+    mock_ddp.set_max_polls(1)
+    mock_cb = MagicMock()
+    mock_ps4 = ps4(MOCK_HOST, MOCK_CREDS)
+    mock_ps4.set_protocol(mock_ddp)
+    mock_ps4.add_callback(mock_cb)
+    mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), (MOCK_HOST, MOCK_RANDOM_PORT))
+    assert ddp.get_host_ip(MOCK_HOST_ID) == MOCK_HOST
+    assert ddp.get_host_id(MOCK_HOST) == MOCK_HOST_ID
+
+    mock_moved = MagicMock()
+    mock_ddp.add_move_callback(mock_moved)
+
+    # Broadcast is sent once PS4 is unreachable.
+    mock_ddp.send_msg(mock_ps4)
+    mock_ddp.send_msg(mock_ps4)
+    assert mock_ps4.unreachable
+    mock_ddp._transport.sendto.assert_called_with(
+        ddp.get_ddp_search_bytes(), (ddp.BROADCAST_IP, ddp.DDP_PORT)
+    )
+    mock_ddp.send_msg(mock_ps4)
+    mock_ddp.send_msg(mock_ps4)
+    broadcasts = [
+        call
+        for call in mock_ddp._transport.sendto.call_args_list
+        if call[0][1][0] == ddp.BROADCAST_IP
+    ]
+    assert len(broadcasts) == 1
+
+    new_host = "192.168.0.3"
+    mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), (new_host, MOCK_RANDOM_PORT))
+    mock_moved.assert_called_once_with(mock_ps4, MOCK_HOST)
+    assert mock_ps4.host == new_host
+    assert MOCK_HOST not in mock_ddp.callbacks
+    assert mock_ddp.callbacks[new_host][mock_ps4] == mock_cb
+    assert not mock_ps4.unreachable
+    assert ddp.get_host_cache() == {MOCK_HOST_ID: new_host}
+    assert ddp.get_host_id(new_host) == MOCK_HOST_ID
+    assert ddp.get_host_id(MOCK_HOST) is None
+
+
+def test_moved_search_limited():
+    """Test unreachable PS4s share rate limited broadcasts."""
+    mock_ddp = ddp.DDPProtocol(max_polls=0)
+    mock_ddp._transport = MagicMock()
+    for index in range(5):
+        host = "192.168.1.{}".format(index)
+        ddp.update_host("HOST{}".format(index), host)
+        mock_ps4 = ps4(host, MOCK_CREDS)
+        mock_ps4.set_protocol(mock_ddp)
+        mock_ddp.send_msg(mock_ps4)
+        assert mock_ps4.unreachable
+    hosts = [call[0][1][0] for call in mock_ddp._transport.sendto.call_args_list]
+    assert hosts.count(ddp.BROADCAST_IP) == 1
+
+
+def test_resolve_host_id():
+    """Test last known address is tried before broadcast."""
+    device = {"host-id": MOCK_HOST_ID, "host-ip": MOCK_HOST}
+    with patch("pyps4_2ndscreen.ddp.search", return_value=[device]) as mock_search:
+        assert ddp.resolve_host_id(MOCK_HOST_ID) == MOCK_HOST
+        mock_search.assert_called_once_with(
+            ddp.BROADCAST_IP, port=ddp.UDP_PORT, timeout=3, expected=[MOCK_HOST_ID]
+        )
+
+    ddp.update_host(MOCK_HOST_ID, MOCK_HOST)
+    with patch("pyps4_2ndscreen.ddp.search", return_value=[device]) as mock_search:
+        assert ddp.resolve_host_id(MOCK_HOST_ID) == MOCK_HOST
+        mock_search.assert_called_once_with(
+            MOCK_HOST, port=ddp.UDP_PORT, timeout=ddp.UNICAST_TIMEOUT
+        )
+
+    # Test miss at last known address falls back to broadcast.
+    with patch("pyps4_2ndscreen.ddp.search", side_effect=[[], []]) as mock_search:
+        assert ddp.resolve_host_id(MOCK_HOST_ID) is None
+        assert len(mock_search.mock_calls) == 2
+
+
+async def test_from_host_id():
+    """Test PS4 objects created by host-id."""
+    with patch("pyps4_2ndscreen.ps4.resolve_host_id", return_value=MOCK_HOST):
+        mock_ps4 = Ps4Legacy.from_host_id(MOCK_HOST_ID, MOCK_CREDS)
+        assert mock_ps4.host == MOCK_HOST
+    with patch("pyps4_2ndscreen.ps4.resolve_host_id", return_value=None):
+        assert Ps4Legacy.from_host_id(MOCK_HOST_ID, MOCK_CREDS) is None
+    with patch("pyps4_2ndscreen.ddp.resolve_host_id", return_value=MOCK_HOST):
+        mock_ps4 = await ps4.async_from_host_id(MOCK_HOST_ID, MOCK_CREDS)
+        assert isinstance(mock_ps4, ps4)
+        assert mock_ps4.host == MOCK_HOST
+
+
+def test_host_store(tmp_path):
+    """Test known addresses are persisted in config store."""
+    store = ConfigStore(str(tmp_path / "config.db"))
+    store.update(ddp.HOSTS_FILE_TYPE, {"OTHER": MOCK_HOST})
+    ddp.set_host_store(store)
+    try:
+        assert ddp.get_host_ip("OTHER") == MOCK_HOST
+        ddp.update_host(MOCK_HOST_ID, MOCK_HOST)
+        assert store.get(ddp.HOSTS_FILE_TYPE, MOCK_HOST_ID) == MOCK_HOST
+    finally:
+        ddp.set_host_store(None)
+        store.close()
+
+
+async def test_host_store_deferred(tmp_path):
+    """Test addresses from DDP responses are saved in the background."""
+    store = ConfigStore(str(tmp_path / "config.db"))
+    ddp.set_host_store(store)
+    mock_ddp = ddp.DDPProtocol()
+    mock_ddp._transport = MagicMock()
+    try:
+        with patch("pyps4_2ndscreen.ddp.HOST_SAVE_DELAY", 0):
+            mock_ddp._handle(
+                MOCK_DDP_RESPONSE.encode(), (MOCK_HOST, MOCK_RANDOM_PORT)
+            )
+            assert store.get(ddp.HOSTS_FILE_TYPE, MOCK_HOST_ID) is None
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if store.get(ddp.HOSTS_FILE_TYPE, MOCK_HOST_ID) is not None:
+                    break
+        assert store.get(ddp.HOSTS_FILE_TYPE, MOCK_HOST_ID) == MOCK_HOST
+
+        # Pending addresses are saved on close.
+        mock_ddp._handle(
+            MOCK_DDP_RESPONSE.encode(), (MOCK_HOST2, MOCK_RANDOM_PORT)
+        )
+        mock_ddp.close()
+        assert store.get(ddp.HOSTS_FILE_TYPE, MOCK_HOST_ID) == MOCK_HOST2
+    finally:
+        ddp.set_host_store(None)
+        store.close()
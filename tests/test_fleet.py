@@ -0,0 +1,328 @@
+"""Tests for pyps4_2ndscreen.fleet."""
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from asynctest import CoroutineMock as mock_coro
+
+from pyps4_2ndscreen import fleet
+from pyps4_2ndscreen.ddp import (
+    DDPProtocol,
+    get_ddp_search_bytes,
+    get_ddp_wake_bytes,
+)
+
+from .test_ddp import (
+    MOCK_CREDS,
+    MOCK_DDP_DICT,
+    MOCK_DDP_RESPONSE,
+    MOCK_DDP_RESPONSE_STANDBY,
+    MOCK_HOST,
+    MOCK_HOST2,
+    MOCK_HOST_ID,
+    MOCK_RANDOM_PORT,
+    MOCK_STANDBY_STATUS,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def _mock_protocol():
+    mock_ddp = DDPProtocol()
+    mock_ddp._transport = MagicMock()
+    return mock_ddp
+
+
+async def _start_fleet(mock_fleet, timeout=0.1):
+    mock_ddp = _mock_protocol()
+    with patch(
+        "pyps4_2ndscreen.fleet.async_create_ddp_endpoint",
+        new=mock_coro(return_value=(MagicMock(), mock_ddp)),
+    ):
+        found = await mock_fleet.start(timeout=timeout)
+    return mock_ddp, found
+
+
+def test_add_remove():
+    """Test adding and removing devices."""
+    mock_fleet = fleet.Fleet()
+    mock_ps4 = mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    assert len(mock_fleet) == 1
+    assert MOCK_HOST in mock_fleet
+    assert mock_fleet.get(MOCK_HOST) is mock_ps4
+    assert list(mock_fleet) == [mock_ps4]
+
+    with pytest.raises(ValueError):
+        mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+
+    assert mock_fleet.remove(MOCK_HOST) is mock_ps4
+    assert not mock_fleet
+    assert mock_fleet.remove(MOCK_HOST) is None
+
+    with pytest.raises(ValueError):
+        fleet.Fleet(concurrency=0)
+
+
+async def test_bootstrap():
+    """Test one broadcast bootstraps all devices."""
+    mock_fleet = fleet.Fleet()
+    mock_ps4 = mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    mock_ps4_2 = mock_fleet.add(MOCK_HOST2, MOCK_CREDS)
+    mock_cb = MagicMock()
+    mock_fleet.add_callback(mock_cb)
+
+    task = asyncio.ensure_future(_start_fleet(mock_fleet, timeout=3))
+    await asyncio.sleep(0.1)
+    mock_ddp = mock_fleet.ddp_protocol
+    mock_ddp._transport.sendto.assert_called_once_with(
+        get_ddp_search_bytes(), ("255.255.255.255", mock_ddp.remote_port)
+    )
+    assert sorted(mock_fleet.pending) == sorted([MOCK_HOST, MOCK_HOST2])
+
+    mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), (MOCK_HOST, MOCK_RANDOM_PORT))
+    assert not task.done()
+    mock_ddp._handle(
+        MOCK_DDP_RESPONSE_STANDBY.encode(), (MOCK_HOST2, MOCK_RANDOM_PORT)
+    )
+    _, found = await asyncio.wait_for(task, 1)
+    assert found == 2
+    assert not mock_fleet.pending
+    assert mock_ps4.is_running
+    assert mock_ps4_2.is_standby
+    assert len(mock_cb.mock_calls) == 2
+    mock_cb.assert_called_with(mock_ps4_2)
+
+
+async def test_bootstrap_timeout():
+    """Test bootstrap returns on timeout with devices not responding."""
+    mock_fleet = fleet.Fleet()
+    mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    mock_fleet.add(MOCK_HOST2, MOCK_CREDS)
+    mock_ddp, found = await _start_fleet(mock_fleet)
+    assert found == 0
+    assert len(mock_fleet.pending) == 2
+
+    # Devices added after start are attached to protocol.
+    mock_ps4 = mock_fleet.add("192.168.0.4", MOCK_CREDS)
+    assert mock_ps4.ddp_protocol is mock_ddp
+
+
+async def test_host_id_index():
+    """Test devices are indexed by host-id."""
+    mock_fleet = fleet.Fleet()
+    mock_ps4 = mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    mock_ddp, _ = await _start_fleet(mock_fleet)
+    assert mock_fleet.get_by_host_id(MOCK_HOST_ID) is None
+
+    mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), (MOCK_HOST, MOCK_RANDOM_PORT))
+    assert mock_fleet.get_by_host_id(MOCK_HOST_ID) is mock_ps4
+
+    mock_fleet.remove(MOCK_HOST)
+    assert mock_fleet.get_by_host_id(MOCK_HOST_ID) is None
+    assert MOCK_HOST not in mock_ddp.callbacks
+
+
+async def test_host_moved():
+    """Test devices are re-indexed when they move."""
+    mock_fleet = fleet.Fleet()
+    mock_ps4 = mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    mock_ddp, _ = await _start_fleet(mock_fleet)
+    mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), (MOCK_HOST, MOCK_RANDOM_PORT))
+
+    new_host = "192.168.0.9"
+    mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), (new_host, MOCK_RANDOM_PORT))
+    assert mock_ps4.host == new_host
+    assert MOCK_HOST not in mock_fleet
+    assert mock_fleet.get(new_host) is mock_ps4
+    assert mock_fleet.get_by_host_id(MOCK_HOST_ID) is mock_ps4
+    assert mock_fleet.remove(new_host) is mock_ps4
+    assert not mock_fleet
+
+
+async def test_bulk_operations():
+    """Test bulk wakeup, standby and snapshot."""
+    mock_fleet = fleet.Fleet(concurrency=1)
+    mock_ps4 = mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    mock_ps4_2 = mock_fleet.add(MOCK_HOST2, MOCK_CREDS)
+    mock_ps4.status = MOCK_DDP_DICT
+    mock_ps4_2.status = MOCK_STANDBY_STATUS
+    await _start_fleet(mock_fleet)
+
+    mock_ps4.wakeup = MagicMock()
+    mock_ps4_2.wakeup = MagicMock()
+    assert mock_fleet.wakeup_all() == [mock_ps4_2]
+    assert not mock_ps4.wakeup.mock_calls
+    assert len(mock_ps4_2.wakeup.mock_calls) == 1
+    assert mock_fleet.wakeup_all(lambda ps4: ps4.host == MOCK_HOST) == []
+
+    mock_ps4.standby = mock_coro()
+    mock_ps4_2.standby = mock_coro()
+    assert await mock_fleet.standby_where() == [mock_ps4]
+    mock_ps4.standby.assert_awaited_once()
+    assert not mock_ps4_2.standby.mock_calls
+
+    snapshot = mock_fleet.status_snapshot()
+    assert snapshot == {MOCK_HOST: MOCK_DDP_DICT, MOCK_HOST2: MOCK_STANDBY_STATUS}
+    assert snapshot[MOCK_HOST] is not mock_ps4.status
+
+
+async def test_standby_polls_per_device():
+    """Test one device entering standby does not stop others."""
+    mock_fleet = fleet.Fleet()
+    mock_ps4 = mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    mock_ps4_2 = mock_fleet.add(MOCK_HOST2, MOCK_CREDS)
+    mock_ps4_3 = mock_fleet.add("192.168.0.4", MOCK_CREDS)
+    mock_ddp, _ = await _start_fleet(mock_fleet)
+    for host, response in (
+        (MOCK_HOST, MOCK_DDP_RESPONSE),
+        (MOCK_HOST, MOCK_DDP_RESPONSE_STANDBY),
+        (MOCK_HOST2, MOCK_DDP_RESPONSE_STANDBY),
+        ("192.168.0.4", MOCK_DDP_RESPONSE),
+    ):
+        mock_ddp._handle(response.encode(), (host, MOCK_RANDOM_PORT))
+    assert mock_ps4.polls_disabled
+    assert not mock_ps4_2.polls_disabled
+    assert not mock_ps4_3.polls_disabled
+
+    mock_sendto = mock_ddp._transport.sendto
+    mock_sendto.reset_mock()
+    mock_fleet.poll()
+    assert sorted(call[0][1][0] for call in mock_sendto.call_args_list) == [
+        MOCK_HOST2,
+        "192.168.0.4",
+    ]
+
+    mock_sendto.reset_mock()
+    assert mock_fleet.wakeup_all() == [mock_ps4, mock_ps4_2]
+    assert [call[0] for call in mock_sendto.call_args_list] == [
+        (get_ddp_wake_bytes(MOCK_CREDS), (MOCK_HOST, mock_ddp.remote_port)),
+        (get_ddp_wake_bytes(MOCK_CREDS), (MOCK_HOST2, mock_ddp.remote_port)),
+    ]
+
+
+async def test_run_limited():
+    """Test concurrency limit and exceptions returned."""
+    mock_fleet = fleet.Fleet(concurrency=2)
+    devices = [mock_fleet.add("10.0.0.{}".format(i), MOCK_CREDS) for i in range(6)]
+    running = []
+    max_running = []
+
+    async def _func(ps4):
+        running.append(ps4)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(ps4)
+        if ps4 is devices[0]:
+            raise OSError
+        return ps4.host
+
+    results = await mock_fleet.run_limited(_func, devices)
+    assert max(max_running) == 2
+    assert isinstance(results[0], OSError)
+    assert results[1:] == [ps4.host for ps4 in devices[1:]]
+
+
+async def test_poll_close():
+    """Test poll and close."""
+    mock_fleet = fleet.Fleet()
+    mock_fleet.add(MOCK_HOST, MOCK_CREDS)
+    mock_fleet.add(MOCK_HOST2, MOCK_CREDS)
+    mock_ddp, _ = await _start_fleet(mock_fleet)
+    mock_ddp._transport.sendto.reset_mock()
+    mock_fleet.poll()
+    assert len(mock_ddp._transport.sendto.mock_calls) == 2
+
+    mock_transport = mock_ddp._transport
+    await mock_fleet.close()
+    assert len(mock_transport.close.mock_calls) == 1
+    assert mock_fleet.ddp_protocol is None
+
+
+def _mock_fan_out_ps4(host, delay=0.0, connect=True, login=True):
+    mock_ps4 = fleet.Ps4Async(host, MOCK_CREDS)
+
+    async def _connect(auto_login=True):
+        await asyncio.sleep(delay)
+        mock_ps4._connected = connect
+
+    async def _login():
+        mock_ps4.loggedin = login
+
+    mock_ps4.async_connect = _connect
+    mock_ps4.login = _login
+    mock_ps4.standby = mock_coro()
+    mock_ps4.start_title = mock_coro()
+    return mock_ps4
+
+
+async def _collect(results):
+    return [result async for result in results]
+
+
+async def test_fan_out():
+    """Test fan out yields results as completed with timings."""
+    slow_ps4 = _mock_fan_out_ps4(MOCK_HOST, delay=0.1)
+    fast_ps4 = _mock_fan_out_ps4(MOCK_HOST2)
+
+    results = await _collect(
+        fleet.fan_out([slow_ps4, fast_ps4], "start_title", "CUSA00001")
+    )
+    assert [result.ps4 for result in results] == [fast_ps4, slow_ps4]
+    for result in results:
+        assert result.success
+        assert result.error is None
+        assert result.stage == fleet.STAGE_COMMAND
+        assert set(result.timings) == {
+            fleet.STAGE_CONNECT,
+            fleet.STAGE_LOGIN,
+            fleet.STAGE_COMMAND,
+        }
+        result.ps4.start_title.assert_awaited_once_with("CUSA00001")
+    assert results[1].timings[fleet.STAGE_CONNECT] >= 0.1
+    assert results[1].elapsed >= 0.1
+
+    with pytest.raises(ValueError):
+        await _collect(fleet.fan_out([fast_ps4], "invalid"))
+
+
+async def test_fan_out_errors():
+    """Test per device failures and deadlines."""
+    refused_ps4 = _mock_fan_out_ps4(MOCK_HOST, connect=False)
+    login_ps4 = _mock_fan_out_ps4(MOCK_HOST2, login=False)
+    slow_ps4 = _mock_fan_out_ps4("192.168.0.4", delay=1)
+    ok_ps4 = _mock_fan_out_ps4("192.168.0.5")
+
+    results = await _collect(
+        fleet.fan_out(
+            [refused_ps4, login_ps4, slow_ps4, ok_ps4], "standby", deadline=0.2
+        )
+    )
+    results = {result.ps4: result for result in results}
+    assert isinstance(results[refused_ps4].error, fleet.PSConnectionError)
+    assert results[refused_ps4].stage == fleet.STAGE_CONNECT
+    assert isinstance(results[login_ps4].error, fleet.LoginFailed)
+    assert results[login_ps4].stage == fleet.STAGE_LOGIN
+    assert isinstance(results[slow_ps4].error, asyncio.TimeoutError)
+    assert results[slow_ps4].stage == fleet.STAGE_CONNECT
+    assert results[ok_ps4].success
+    for mock_ps4 in (refused_ps4, login_ps4, slow_ps4):
+        assert not results[mock_ps4].success
+        assert not mock_ps4.standby.mock_calls
+
+
+async def test_fleet_fan_out():
+    """Test fleet fan out uses concurrency limit and predicate."""
+    mock_fleet = fleet.Fleet(concurrency=1)
+    devices = []
+    for index in range(3):
+        mock_ps4 = _mock_fan_out_ps4("10.0.0.{}".format(index), delay=0.05)
+        mock_fleet._devices[mock_ps4.host] = mock_ps4
+        devices.append(mock_ps4)
+
+    start = asyncio.get_event_loop().time()
+    results = await _collect(
+        mock_fleet.fan_out("standby", predicate=lambda ps4: ps4 is not devices[0])
+    )
+    assert asyncio.get_event_loop().time() - start >= 0.1
+    assert sorted(result.host for result in results) == ["10.0.0.1", "10.0.0.2"]
+    assert not devices[0].standby.mock_calls
@@ -2,6 +2,7 @@
 from unittest.mock import MagicMock, mock_open, patch
 
 from pyps4_2ndscreen import helpers
+from pyps4_2ndscreen.config_store import ConfigStore
 
 MOCK_HOST = "192.168.0.1"
 MOCK_CREDS = "abcd1234abcd1234abcd1234abcd1234abcd1234abcd1234abcd1234abcd1234"
@@ -25,6 +26,31 @@ def test_has_devices():
         assert len(mock_search.mock_calls) == 1
 
 
+def test_has_devices_expected(tmp_path):
+    """Test has_devices waits for linked devices only."""
+    store = ConfigStore(str(tmp_path / "config.db"))
+    store.update("ps4", {MOCK_HOST: MOCK_CREDS})
+    helper = helpers.Helper(store)
+    with patch(
+        "pyps4_2ndscreen.helpers.search", return_value=[{"host-ip": MOCK_HOST}]
+    ) as mock_search:
+        assert helper.has_devices()
+        mock_search.assert_called_once_with(
+            None, helpers.DEFAULT_UDP_PORT, expected=[MOCK_HOST]
+        )
+        assert helper.search_time is not None
+
+        helper.has_devices(expected=[])
+        mock_search.assert_called_with(
+            None, helpers.DEFAULT_UDP_PORT, expected=[]
+        )
+        helper.has_devices(MOCK_HOST)
+        mock_search.assert_called_with(
+            MOCK_HOST, helpers.DEFAULT_UDP_PORT, expected=None
+        )
+    store.close()
+
+
 def test_link():
     """Test Link Helper."""
     helper = helpers.Helper()
@@ -167,6 +193,30 @@ def test_load_files():
         assert helper.load_files("ps4") == MOCK_DICT
 
 
+def test_load_files_cache(tmp_path):
+    """Test loaded data is cached until file changes."""
+    file_name = str(tmp_path / "ps4.json")
+    helper = helpers.Helper()
+    helper.check_files = MagicMock(return_value=file_name)
+    with patch.dict(helpers.FILE_TYPES, {"ps4": file_name}), patch(
+        "pyps4_2ndscreen.helpers.json.load", wraps=helpers.json.load
+    ) as mock_load:
+        assert helper.save_files(MOCK_DICT, file_type="ps4") == file_name
+        data = helper.load_files("ps4")
+        assert data == MOCK_DICT
+        data["new"] = "value"
+        assert helper.check_data("ps4")
+        assert helper.load_files("ps4") == MOCK_DICT
+        assert not mock_load.mock_calls
+
+        # Test file changed by another process.
+        with open(file_name, "w") as _w_file:
+            _w_file.write('{"other": "value"}')
+        assert helper.load_files("ps4") == {"other": "value"}
+        assert helper.load_files("ps4") == {"other": "value"}
+        assert len(mock_load.mock_calls) == 1
+
+
 def test_save_files():
     """Test save files."""
     helper = helpers.Helper()
@@ -174,9 +224,11 @@ def test_save_files():
         "pyps4_2ndscreen.helpers.open", mock_open(read_data=MOCK_DATA)
     ) as mock_open_file, patch("pyps4_2ndscreen.helpers.os.mkdir"), patch(
         "pyps4_2ndscreen.helpers.os.path.isfile", return_value=True
-    ):
+    ), patch("pyps4_2ndscreen.helpers.os.replace") as mock_replace:
         assert helper.save_files(MOCK_DICT, file_type="ps4") == helpers.FILE_TYPES['ps4']
-        mock_open_file.assert_called_once_with(helpers.FILE_TYPES['ps4'], "w+")
+        temp_name = "{}.tmp".format(helpers.FILE_TYPES['ps4'])
+        mock_open_file.assert_called_once_with(temp_name, "w+")
+        mock_replace.assert_called_once_with(temp_name, helpers.FILE_TYPES['ps4'])
         assert helper.save_files([]) is None
         assert helper.save_files({}) is None
         assert helper.save_files(MOCK_DICT, file_type="random type") is None
@@ -0,0 +1,168 @@
+"""Tests for pyps4_2ndscreen.image_cache."""
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from asynctest import CoroutineMock as mock_coro
+
+from pyps4_2ndscreen import image_cache, media_art
+
+pytestmark = pytest.mark.asyncio
+
+MOCK_IMAGE = b"\x89PNG" + bytes(range(256)) * 4
+MOCK_ETAG = '"abc"'
+MOCK_LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+@pytest.fixture(name="server")
+async def server_fixture():
+    """Start local image server. Yield state and base url."""
+    state = {"image": MOCK_IMAGE, "etag": MOCK_ETAG, "requests": [], "down": False}
+
+    async def _handle(request):
+        state["requests"].append(dict(request.headers))
+        if state["down"]:
+            raise web.HTTPServiceUnavailable()
+        if request.path.endswith("missing"):
+            raise web.HTTPNotFound()
+        if request.headers.get("If-None-Match") == state["etag"]:
+            return web.Response(status=304)
+        return web.Response(
+            body=state["image"],
+            headers={"ETag": state["etag"], "Last-Modified": MOCK_LAST_MODIFIED},
+        )
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", _handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = "http://127.0.0.1:{}".format(runner.addresses[0][1])
+    yield state, base_url
+    await media_art.async_close_session()
+    await runner.cleanup()
+
+
+async def test_download_once(server, tmp_path):
+    """Test image is downloaded once and served from disk."""
+    state, base_url = server
+    cache = image_cache.ImageCache(str(tmp_path))
+    url = base_url + "/CUSA00129/image"
+    path = await cache.async_get(url)
+    assert open(path, "rb").read() == MOCK_IMAGE
+    assert await cache.async_get(url) == path
+    assert len(state["requests"]) == 1
+
+    # Same content is stored once.
+    path_2 = await cache.async_get(base_url + "/CUSA00130/image")
+    assert path_2 == path
+    assert len(cache) == 2
+    assert cache.total_size == len(MOCK_IMAGE)
+
+    mapped = cache.open(url)
+    assert mapped[:4] == b"\x89PNG"
+    assert mapped[:] == MOCK_IMAGE
+    mapped.close()
+    assert cache.open(base_url + "/other") is None
+    assert await cache.async_get(base_url + "/missing") is None
+    cache.close()
+
+    # Survives restarts.
+    cache = image_cache.ImageCache(str(tmp_path))
+    assert cache.get_path(url) == path
+    cache.close()
+
+
+async def test_revalidate(server, tmp_path):
+    """Test stale images are revalidated with conditional requests."""
+    state, base_url = server
+    cache = image_cache.ImageCache(str(tmp_path), max_age=0)
+    url = base_url + "/CUSA00129/image"
+    path = await cache.async_get(url)
+
+    assert await cache.async_get(url) == path
+    assert state["requests"][-1]["If-None-Match"] == MOCK_ETAG
+    assert state["requests"][-1]["If-Modified-Since"] == MOCK_LAST_MODIFIED
+
+    # Changed image replaces old file.
+    state["image"] = b"new image"
+    state["etag"] = '"def"'
+    new_path = await cache.async_get(url)
+    assert new_path != path
+    assert open(new_path, "rb").read() == b"new image"
+    assert not os.path.exists(path)
+
+    # Stale image is served while store is down.
+    state["down"] = True
+    assert await cache.async_get(url) == new_path
+    cache.close()
+
+
+async def test_lru_eviction(tmp_path):
+    """Test least recently used images are evicted over size cap."""
+    cache = image_cache.ImageCache(str(tmp_path), max_bytes=20)
+    with patch("pyps4_2ndscreen.image_cache.time.time", return_value=1):
+        path_a = cache.store("a", b"a" * 10)
+    with patch("pyps4_2ndscreen.image_cache.time.time", return_value=2):
+        cache.store("b", b"b" * 10)
+    with patch("pyps4_2ndscreen.image_cache.time.time", return_value=3):
+        assert cache.get_path("a") == path_a
+    with patch("pyps4_2ndscreen.image_cache.time.time", return_value=4):
+        cache.store("c", b"c" * 10)
+    assert cache.get_path("b") is None
+    assert cache.get_path("a") == path_a
+    assert cache.total_size == 20
+
+    # Image larger than cap is kept until next image is stored.
+    big = cache.store("d", b"d" * 30)
+    assert cache.get_path("d") == big
+    assert len(cache) == 1
+
+    cache.clear()
+    assert not cache
+    assert not list(tmp_path.glob("*/*"))
+    cache.close()
+
+
+async def test_title(server, tmp_path):
+    """Test cover art path is returned for title."""
+    _, base_url = server
+    cache = image_cache.ImageCache(str(tmp_path))
+    mock_item = media_art.ResultItem(
+        "CUSA00129", base_url + "/CUSA00129/image", {}
+    )
+    with patch(
+        "pyps4_2ndscreen.image_cache.async_search_ps_store",
+        new=mock_coro(return_value=mock_item),
+    ):
+        path = await cache.async_get_title("CUSA00129", "United States")
+    assert open(path, "rb").read() == MOCK_IMAGE
+
+    with patch(
+        "pyps4_2ndscreen.image_cache.async_search_ps_store",
+        new=mock_coro(side_effect=media_art.PSDataIncomplete),
+    ):
+        assert await cache.async_get_title("CUSA00129", "United States") is None
+    cache.close()
+
+
+async def test_store_executor(server, tmp_path):
+    """Test image is stored in an executor."""
+    _, base_url = server
+    cache = image_cache.ImageCache(str(tmp_path))
+    threads = []
+    store = cache.store
+
+    def _store(*args):
+        threads.append(threading.get_ident())
+        return store(*args)
+
+    cache.store = _store
+    path = await cache.async_get(base_url + "/CUSA00129/image")
+    assert open(path, "rb").read() == MOCK_IMAGE
+    assert len(threads) == 1
+    assert threads[0] != threading.get_ident()
+    cache.close()
@@ -0,0 +1,74 @@
+"""Tests for import time of pyps4_2ndscreen."""
+import logging
+import subprocess
+import sys
+
+import pytest
+
+_LOGGER = logging.getLogger(__name__)
+
+HEAVY_MODULES = (
+    "aiohttp",
+    "construct",
+    "Cryptodome.Cipher.AES",
+    "Cryptodome.Cipher.PKCS1_OAEP",
+    "Cryptodome.PublicKey.RSA",
+    "curses",
+)
+
+# Other tests replace sys.executable.
+PYTHON = sys.executable
+
+
+def _import_times(module: str) -> dict:
+    """Return dict of module name to cumulative import time in us."""
+    result = subprocess.run(
+        [PYTHON, "-X", "importtime", "-c", "import {}".format(module)],
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="-X importtime requires Python 3.7"
+)
+@pytest.mark.parametrize(
+    "module",
+    ["pyps4_2ndscreen.__main__", "pyps4_2ndscreen.ps4", "pyps4_2ndscreen.ddp"],
+)
+def test_import_time(module):
+    """Test heavy dependencies are not imported until used."""
+    times = _import_times(module)
+    _LOGGER.info("Import time of %s: %s us", module, times[module])
+    loaded = [
+        name
+        for name in times
+        for heavy in HEAVY_MODULES
+        if name == heavy or name.startswith(heavy + ".")
+    ]
+    assert not loaded
+
+
+def test_lazy_import():
+    """Test lazy modules load on first use."""
+    code = (
+        "import sys\n"
+        "from pyps4_2ndscreen import media_art, connection\n"
+        "assert 'aiohttp.client' not in sys.modules\n"
+        "assert media_art.aiohttp.ClientSession\n"
+        "assert 'aiohttp.client' in sys.modules\n"
+        "assert connection.construct.Struct\n"
+        "assert connection.AES.MODE_CBC\n"
+        "from pyps4_2ndscreen import Helper\n"
+        "assert Helper.__name__ == 'Helper'\n"
+    )
+    subprocess.run([PYTHON, "-c", code], check=True)
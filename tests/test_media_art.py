@@ -1,6 +1,7 @@
 """Tests for pyps4_2ndscreen.media_art."""
 import asyncio
 import logging
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -8,6 +9,10 @@ from asynctest import CoroutineMock as mock_coro
 from asynctest import Mock
 
 from pyps4_2ndscreen import media_art as media
+from pyps4_2ndscreen.media_cache import MetadataCache
+
+from .bench_media_art import run_benchmarks
+from .fake_store import FakeStore
 
 pytestmark = pytest.mark.asyncio
 
@@ -22,6 +27,10 @@ MOCK_URL = "https://store.playstation.com/store/api/chihiro/00_09_000/titleconta
 MOCK_TITLE = "Netflix"
 MOCK_TITLE_ID = "CUSA00129"
 MOCK_FULL_ID = "UT0007-CUSA00129_00-NETFLIXPOLLUX001-U099"
+MOCK_SERVER_DATA = {
+    "title_name": MOCK_TITLE,
+    "gameContentTypesList": [{"name": "App", "key": "APP"}],
+}
 MOCK_DATA = {
     "age_limit": 0,
     "attributes": {"facets": {}, "next": []},
@@ -243,6 +252,25 @@ MOCK_DATA = {
 }
 
 
+@pytest.fixture(autouse=True)
+async def clear_search_state():
+    """Clear search state and close session between tests."""
+    media.get_recent_results().clear()
+    media.get_negative_cache().clear()
+    media.reset_search_stats()
+    media._REGION_HINTS.clear()
+    media.get_circuit_breaker().reset()
+    media.set_store_rate(1000, 1000)
+    yield
+    media.get_recent_results().clear()
+    media.get_negative_cache().clear()
+    media.reset_search_stats()
+    media._REGION_HINTS.clear()
+    media.get_circuit_breaker().reset()
+    media.set_store_rate(media.DEFAULT_STORE_RATE)
+    await media.async_close_session()
+
+
 def test_get_region():
     """Test region retrieval."""
     valid_region = media.get_region(next(iter(media.COUNTRIES)))
@@ -311,6 +339,8 @@ async def test_fetch_http_errors():
     mock_response.json.return_value.set_result({'reason': 'does not exist'})
     result = await media.fetch(MagicMock(), MagicMock(), session)
     assert result is None
+    assert not mock_response.json.mock_calls
+    assert len(mock_response.release.mock_calls) == 1
 
 
 async def test_fetch_errors():
@@ -344,3 +374,534 @@ async def test_result_item_missing_data():
     ) as mock_fetch, pytest.raises(media.PSDataIncomplete):
         await media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME)
         assert len(mock_fetch.mock_calls) == 2
+
+
+def _fake_store():
+    """Return local stand-in for PS Store."""
+    return FakeStore(not_found={"CUSA90000"}, default=MOCK_SERVER_DATA)
+
+
+async def test_session_manager():
+    """Test session is created lazily, reused and closed."""
+    manager = media.SessionManager()
+    assert manager.closed
+    session = manager.get_session()
+    assert manager.get_session() is session
+    assert not manager.closed
+    await manager.close()
+    assert session.closed
+    assert manager.closed
+
+    # Injected session is not closed by manager.
+    session = manager.get_session()
+    manager = media.SessionManager(session)
+    assert manager.get_session() is session
+    await manager.close()
+    assert not session.closed
+    await session.close()
+
+
+async def test_search_ps_store_pooled():
+    """Test lookups reuse pooled connections to local server."""
+    store = _fake_store()
+    base_url = await store.start()
+    manager = media.SessionManager()
+    lookups = 50
+    try:
+        with patch("pyps4_2ndscreen.media_art.BASE_URL", new=base_url), patch(
+            "pyps4_2ndscreen.media_art._SESSION_MANAGER", new=manager
+        ):
+            start = time.perf_counter()
+            for index in range(lookups):
+                result = await media.async_search_ps_store(
+                    "CUSA{:05d}".format(index), MOCK_REGION_NAME
+                )
+                assert result.name == MOCK_TITLE
+            elapsed = time.perf_counter() - start
+    finally:
+        await manager.close()
+        await store.stop()
+    _LOGGER.info("Pooled lookups/sec: %.1f", lookups / elapsed)
+    assert len(store.peers) == 1
+
+
+def _mock_slow_fetch(data=MOCK_SERVER_DATA, delay=0.05, error=None):
+    mock_response = Mock()
+    mock_response.json = mock_coro(return_value=data)
+
+    async def _fetch(url, params, session):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return mock_response
+
+    return MagicMock(side_effect=_fetch)
+
+
+async def test_search_single_flight():
+    """Test concurrent searches for one title share one request."""
+    mock_fetch = _mock_slow_fetch()
+    with patch("pyps4_2ndscreen.media_art.fetch", new=mock_fetch):
+        results = await asyncio.gather(
+            *[
+                media.async_search_ps_store(MOCK_TITLE_ID, region)
+                for region in (MOCK_REGION_NAME, "R1") * 5
+            ],
+            media.async_search_ps_store("CUSA00001", MOCK_REGION_NAME),
+        )
+        assert len(mock_fetch.mock_calls) == 2
+        assert all(result is results[0] for result in results[:10])
+        assert results[10] is not results[0]
+        assert not media._IN_FLIGHT
+
+        # Served from recent results.
+        result = await media.async_search_ps_store(MOCK_TITLE_ID, "R1")
+        assert result is results[0]
+        assert len(mock_fetch.mock_calls) == 2
+
+
+async def test_search_single_flight_errors():
+    """Test exceptions are shared and cancelling a caller is isolated."""
+    mock_fetch = _mock_slow_fetch(error=media.PSDataIncomplete)
+    with patch("pyps4_2ndscreen.media_art.fetch", new=mock_fetch):
+        results = await asyncio.gather(
+            media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME),
+            media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME),
+            return_exceptions=True,
+        )
+    assert len(mock_fetch.mock_calls) == 1
+    assert all(isinstance(result, media.PSDataIncomplete) for result in results)
+    assert not media.get_recent_results()
+
+    mock_fetch = _mock_slow_fetch()
+    with patch("pyps4_2ndscreen.media_art.fetch", new=mock_fetch):
+        first = asyncio.ensure_future(
+            media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME)
+        )
+        second = asyncio.ensure_future(
+            media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME)
+        )
+        await asyncio.sleep(0)
+        first.cancel()
+        result = await second
+    assert first.cancelled()
+    assert result.name == MOCK_TITLE
+    assert len(mock_fetch.mock_calls) == 1
+
+
+def test_recent_results():
+    """Test recent results expire and evict least recently used."""
+    recent = media.RecentResults(maxsize=2, ttl=10)
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=0):
+        recent.set("a", 1)
+        recent.set("b", 2)
+        assert recent.get("a") == 1
+        recent.set("c", 3)
+    assert len(recent) == 2
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=5):
+        assert recent.get("b") is None
+        assert recent.get("a") == 1
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=10):
+        assert recent.get("c") is None
+
+
+async def test_negative_cache_reasons():
+    """Test failed lookups are not retried until TTL expires."""
+    with patch(
+        "pyps4_2ndscreen.media_art.fetch", new=mock_coro(return_value=None)
+    ) as mock_fetch:
+        for _ in range(3):
+            assert (
+                await media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME)
+                is None
+            )
+        assert len(mock_fetch.mock_calls) == 1
+
+    mock_response = Mock()
+    mock_response.json = mock_coro(return_value={"title_name": MOCK_TITLE})
+    with patch(
+        "pyps4_2ndscreen.media_art.fetch",
+        new=mock_coro(return_value=mock_response),
+    ) as mock_fetch:
+        for _ in range(2):
+            with pytest.raises(media.PSDataIncomplete):
+                await media.async_search_ps_store("CUSA00001", MOCK_REGION_NAME)
+        assert len(mock_fetch.mock_calls) == 1
+
+    with patch(
+        "pyps4_2ndscreen.media_art.fetch",
+        new=mock_coro(side_effect=asyncio.TimeoutError),
+    ):
+        assert await media.async_search_ps_store("CUSA00002", "Japan") is None
+    with patch(
+        "pyps4_2ndscreen.media_art.fetch",
+        new=mock_coro(side_effect=media.aiohttp.ClientConnectionError),
+    ):
+        assert await media.async_search_ps_store("CUSA00003", "Japan") is None
+
+    negative = media.get_negative_cache()
+    assert negative.get((MOCK_TITLE_ID, "en/us")) == media.MISS_NOT_FOUND
+    assert negative.get(("CUSA00001", "en/us")) == media.MISS_INCOMPLETE
+    assert negative.get(("CUSA00002", "ja/jp")) == media.MISS_TIMEOUT
+    assert negative.get(("CUSA00003", "ja/jp")) == media.MISS_ERROR
+
+    stats = media.get_search_stats()
+    assert stats["lookups"] == 7
+    assert stats["requests"] == 4
+    assert stats["negative_hits"] == 3
+    assert stats["miss_not_found"] == 1
+    assert stats["miss_incomplete"] == 1
+    assert stats["miss_timeout"] == 1
+    assert stats["miss_error"] == 1
+    assert stats["miss_rate"] == 1.0
+
+
+async def test_negative_cache_retry():
+    """Test failed lookup is retried after TTL and cleared on success."""
+    key = (MOCK_TITLE_ID, "en/us")
+    negative = media.get_negative_cache()
+    with patch(
+        "pyps4_2ndscreen.media_art.fetch", new=mock_coro(return_value=None)
+    ):
+        await media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME)
+    negative._items[key] = (media.MISS_NOT_FOUND, 1, 0)
+
+    mock_fetch = _mock_slow_fetch(delay=0)
+    with patch("pyps4_2ndscreen.media_art.fetch", new=mock_fetch):
+        result = await media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME)
+    assert result.name == MOCK_TITLE
+    assert negative.failures(key) == 0
+    assert media.get_search_stats()["miss_rate"] == 0.5
+
+
+def test_negative_cache_backoff():
+    """Test TTL grows with repeated failures up to max."""
+    negative = media.NegativeCache(ttl=10, max_ttl=25, backoff=2, maxsize=2)
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=0):
+        assert negative.add("a", media.MISS_NOT_FOUND) == 10
+        assert negative.add("a", media.MISS_NOT_FOUND) == 20
+        assert negative.add("a", media.MISS_TIMEOUT) == 25
+        assert negative.failures("a") == 3
+        assert negative.get("a") == media.MISS_TIMEOUT
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=25):
+        assert negative.get("a") is None
+        assert negative.failures("a") == 3
+        negative.add("b", media.MISS_NOT_FOUND)
+        negative.add("c", media.MISS_NOT_FOUND)
+    assert len(negative) == 2
+    assert negative.failures("a") == 0
+    negative.remove("b")
+    assert negative.get("b") is None
+
+
+async def _collect(results):
+    return [result async for result in results]
+
+
+async def test_search_many(tmp_path):
+    """Test batch search yields results and feeds metadata cache."""
+    store = _fake_store()
+    base_url = await store.start()
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    titles = ["CUSA{:05d}".format(index) for index in range(20)]
+    try:
+        with patch("pyps4_2ndscreen.media_art.BASE_URL", new=base_url):
+            results = await _collect(
+                media.async_search_ps_store_many(
+                    titles + ["CUSA90000", titles[0]],
+                    MOCK_REGION_NAME,
+                    concurrency=5,
+                    rate=1000,
+                    metadata_cache=cache,
+                )
+            )
+            assert sorted(result.sku_id for result in results) == titles
+            assert len(cache) == 20
+            assert media.get_search_stats()["requests"] == 21
+
+            media.get_recent_results().clear()
+            results = await _collect(
+                media.async_search_ps_store_many(
+                    titles, MOCK_REGION_NAME, metadata_cache=cache
+                )
+            )
+            assert len(results) == 20
+            assert media.get_search_stats()["requests"] == 21
+    finally:
+        cache.close()
+        await store.stop()
+    assert len(store.peers) <= 5
+
+
+async def test_search_many_limits():
+    """Test batch search concurrency and rate limits."""
+    running = []
+    max_running = []
+
+    async def _fetch(url, params, session):
+        running.append(url)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(url)
+        mock_response = Mock()
+        mock_response.json = mock_coro(return_value=MOCK_SERVER_DATA)
+        return mock_response
+
+    titles = ["CUSA{:05d}".format(index) for index in range(6)]
+    with patch("pyps4_2ndscreen.media_art.fetch", new=_fetch):
+        results = await _collect(
+            media.async_search_ps_store_many(
+                titles, MOCK_REGION_NAME, concurrency=2, rate=1000
+            )
+        )
+        assert len(results) == 6
+        assert max(max_running) == 2
+
+        media.get_recent_results().clear()
+        start = time.monotonic()
+        results = await _collect(
+            media.async_search_ps_store_many(
+                titles, MOCK_REGION_NAME, concurrency=6, rate=20
+            )
+        )
+        assert len(results) == 6
+        assert time.monotonic() - start >= 0.2
+
+        # Cached results are not rate limited.
+        start = time.monotonic()
+        results = await _collect(
+            media.async_search_ps_store_many(titles, MOCK_REGION_NAME, rate=1)
+        )
+        assert len(results) == 6
+        assert time.monotonic() - start < 0.5
+
+    with pytest.raises(ValueError):
+        await _collect(
+            media.async_search_ps_store_many(titles, MOCK_REGION_NAME, concurrency=0)
+        )
+
+
+async def test_rate_limiter():
+    """Test token bucket."""
+    with pytest.raises(ValueError):
+        media.RateLimiter(0)
+    limiter = media.RateLimiter(10, burst=2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    start = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - start >= 0.05
+
+
+async def test_search_race():
+    """Test regions are raced and losing requests are cancelled."""
+    requested = []
+    cancelled = []
+
+    async def _fetch(url, params, session):
+        requested.append(url)
+        try:
+            if "/gb/" in url:
+                await asyncio.sleep(1)
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        if "/us/" in url:
+            return None
+        mock_response = Mock()
+        mock_response.json = mock_coro(return_value=MOCK_SERVER_DATA)
+        return mock_response
+
+    regions = ["United States", "R1", "United Kingdom", "Japan"]
+    with patch("pyps4_2ndscreen.media_art.fetch", new=_fetch):
+        result = await asyncio.wait_for(
+            media.async_search_ps_store_race(MOCK_TITLE_ID, regions), 0.5
+        )
+        assert MOCK_TITLE_ID in result.cover_art
+        assert "/jp/" in result.cover_art
+        await asyncio.sleep(0)
+        assert len(requested) == 3
+        assert len(cancelled) == 1
+        assert "/gb/" in cancelled[0]
+        assert not media._IN_FLIGHT
+        assert media.get_region_hint(MOCK_TITLE_ID) == "Japan"
+        assert media.get_region_hint("CUSA00130") is None
+
+        # Only first region and hinted region are searched.
+        requested.clear()
+        media.get_recent_results().clear()
+        media.get_negative_cache().clear()
+        result = await media.async_search_ps_store_race(MOCK_TITLE_ID, regions)
+        assert "/jp/" in result.cover_art
+        assert len(requested) == 2
+        assert "/us/" in requested[0]
+        assert "/jp/" in requested[1]
+
+        # Other regions are raced if hinted region misses.
+        requested.clear()
+        media.get_recent_results().clear()
+        media.get_negative_cache().clear()
+        media._REGION_HINTS[MOCK_TITLE_ID] = "R1"
+        result = await asyncio.wait_for(
+            media.async_search_ps_store_race(MOCK_TITLE_ID, regions), 0.5
+        )
+        assert "/jp/" in result.cover_art
+        assert sum("/us/" in url for url in requested) == 1
+        assert media.get_region_hint(MOCK_TITLE_ID) == "Japan"
+
+        # Hint is not used if not in regions given.
+        requested.clear()
+        media.get_recent_results().clear()
+        media.get_negative_cache().clear()
+        result = await media.async_search_ps_store_race(
+            MOCK_TITLE_ID, ["Korea", "Australia"]
+        )
+        assert len(requested) == 2
+        assert not any("/jp/" in url for url in requested)
+        assert media.get_region_hint(MOCK_TITLE_ID) in ("Korea", "Australia")
+
+    # First region is preferred over hinted region.
+    mock_response = Mock()
+    mock_response.json = mock_coro(return_value=MOCK_SERVER_DATA)
+    media.get_recent_results().clear()
+    media._REGION_HINTS[MOCK_TITLE_ID] = "Japan"
+    with patch(
+        "pyps4_2ndscreen.media_art.fetch", new=mock_coro(return_value=mock_response)
+    ) as mock_fetch:
+        result = await media.async_search_ps_store_race(MOCK_TITLE_ID, regions)
+        assert "/us/" in result.cover_art
+        assert mock_fetch.call_count == 2
+        assert media.get_region_hint(MOCK_TITLE_ID) == "United States"
+
+        with patch(
+            "pyps4_2ndscreen.media_art.fetch", new=mock_coro(return_value=None)
+        ):
+            assert (
+                await media.async_search_ps_store_race("CUSA00001", regions[:2])
+                is None
+            )
+
+
+def test_result_item_slim():
+    """Test result item keeps only needed fields unless retained."""
+    data = dict(MOCK_SERVER_DATA, long_desc="some text")
+    item = media.ResultItem(MOCK_TITLE_ID, MOCK_URL, data)
+    assert not hasattr(item, "__dict__")
+    assert item.name == MOCK_TITLE
+    assert item.game_type == media.TYPE_APP
+    assert "long_desc" not in item.data
+    assert media.ResultItem(MOCK_TITLE_ID, MOCK_URL, item.data).game_type == (
+        media.TYPE_APP
+    )
+
+    item = media.ResultItem(MOCK_TITLE_ID, MOCK_URL, data, retain_data=True)
+    assert item.data is data
+    assert media.ResultItem(MOCK_TITLE_ID, MOCK_URL, {}).game_type is None
+
+
+async def test_search_retain_data():
+    """Test full title data is kept if set."""
+    data = dict(MOCK_SERVER_DATA, long_desc="some text")
+    mock_response = Mock()
+    mock_response.json = mock_coro(return_value=data)
+    with patch(
+        "pyps4_2ndscreen.media_art.fetch", new=mock_coro(return_value=mock_response)
+    ), patch("pyps4_2ndscreen.media_art.RETAIN_DATA", new=True):
+        result = await media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME)
+    assert result.data is data
+
+
+def _mock_session(status=media.HTTP_STATUS_OK, error=None):
+    session = Mock()
+    mock_response = Mock()
+    mock_response.status = status
+    session.get = mock_coro(return_value=mock_response, side_effect=error)
+    return session
+
+
+async def test_fetch_rate_limit():
+    """Test store requests are rate limited."""
+    media.set_store_rate(20, burst=1)
+    session = _mock_session()
+    start = time.monotonic()
+    for _ in range(3):
+        assert await media.fetch(MOCK_URL, {}, session) is not None
+    assert time.monotonic() - start >= 0.09
+    assert media.get_search_stats()["rate_limited"] == 2
+
+
+async def test_circuit_breaker_fetch():
+    """Test breaker opens on failures and rejects requests."""
+    breaker = media.get_circuit_breaker()
+    session = _mock_session(error=asyncio.TimeoutError)
+    for _ in range(media.DEFAULT_FAILURE_THRESHOLD):
+        assert breaker.state == media.BREAKER_CLOSED
+        with pytest.raises(asyncio.TimeoutError):
+            await media.fetch(MOCK_URL, {}, session)
+    assert breaker.state == media.BREAKER_OPEN
+
+    with pytest.raises(media.PSStoreUnavailable):
+        await media.fetch(MOCK_URL, {}, session)
+    assert len(session.get.mock_calls) == media.DEFAULT_FAILURE_THRESHOLD
+
+    # Search fails fast without marking title as failed.
+    assert await media.async_search_ps_store(MOCK_TITLE_ID, MOCK_REGION_NAME) is None
+    assert not media.get_negative_cache()
+    assert media.get_search_stats()["miss_unavailable"] == 1
+    assert breaker.as_dict() == {
+        "state": media.BREAKER_OPEN,
+        "failures": media.DEFAULT_FAILURE_THRESHOLD,
+        "rejected": 2,
+        "opened": 1,
+    }
+
+    # Trial request after reset timeout closes breaker.
+    breaker._opened_at -= media.DEFAULT_RESET_TIMEOUT
+    assert breaker.state == media.BREAKER_HALF_OPEN
+    assert await media.fetch(MOCK_URL, {}, _mock_session(status=404)) is None
+    assert breaker.state == media.BREAKER_CLOSED
+    assert breaker.failures == 0
+
+    # Server errors count as failures.
+    session = _mock_session(status=503)
+    for _ in range(media.DEFAULT_FAILURE_THRESHOLD):
+        assert await media.fetch(MOCK_URL, {}, session) is None
+    assert breaker.state == media.BREAKER_OPEN
+    assert breaker.opened == 2
+
+
+def test_circuit_breaker_half_open():
+    """Test one trial request is allowed while half open."""
+    breaker = media.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=0):
+        breaker.record(False)
+        assert not breaker.allow()
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=10):
+        assert breaker.allow()
+        assert not breaker.allow()
+        # Cancelled trial allows another.
+        breaker.record(None)
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == media.BREAKER_OPEN
+    with patch("pyps4_2ndscreen.media_art.time.monotonic", return_value=20):
+        assert breaker.allow()
+        breaker.record(True)
+        assert breaker.state == media.BREAKER_CLOSED
+    assert breaker.rejected == 2
+
+
+async def test_benchmarks():
+    """Test benchmark scenarios run against fake store."""
+    results = await run_benchmarks(titles=10)
+    assert all(len(result.latencies) == 10 for result in results)
+    results = {result.name: result for result in results}
+    assert results["search concurrent"].requests == 10
+    assert results["search recent hits"].requests == 0
+    assert results["single flight burst"].requests == 1
+    assert results["metadata cache warm"].requests == 0
+    assert results["catalog"].requests == 0
+    assert results["image cold"].requests == 10
+    assert results["image warm"].requests == 0
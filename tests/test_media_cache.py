@@ -0,0 +1,258 @@
+"""Tests for pyps4_2ndscreen.media_cache."""
+import asyncio
+import multiprocessing
+import sqlite3
+import threading
+from unittest.mock import call, patch
+
+import pytest
+from asynctest import CoroutineMock as mock_coro
+
+from pyps4_2ndscreen import media_cache
+from pyps4_2ndscreen.media_art import ResultItem
+
+MOCK_TITLE_ID = "CUSA00129"
+MOCK_REGION = "United States"
+MOCK_URL = "https://someurl.com/image"
+MOCK_DATA = {
+    "title_name": "Netflix",
+    "gameContentTypesList": [{"name": "App", "key": "APP"}],
+}
+
+
+def _mock_item(title_id=MOCK_TITLE_ID):
+    return ResultItem(title_id, MOCK_URL, MOCK_DATA)
+
+
+def test_get_set(tmp_path):
+    """Test items are cached by title and normalized region."""
+    path = str(tmp_path / "cache.db")
+    cache = media_cache.MetadataCache(path)
+    assert cache.get(MOCK_TITLE_ID, MOCK_REGION) is None
+    cache.set(MOCK_TITLE_ID, MOCK_REGION, _mock_item())
+    assert len(cache) == 1
+
+    # Deprecated region resolves to the same store.
+    item = cache.get(MOCK_TITLE_ID, "R1")
+    assert item.name == "Netflix"
+    assert item.game_type == "APP"
+    assert item.cover_art == MOCK_URL
+    assert cache.get(MOCK_TITLE_ID, "Japan") is None
+    cache.close()
+
+    # Entries survive restarts.
+    cache = media_cache.MetadataCache(path)
+    assert cache.get(MOCK_TITLE_ID, MOCK_REGION).sku_id == MOCK_TITLE_ID
+    cache.delete(MOCK_TITLE_ID, MOCK_REGION)
+    assert not cache
+    cache.close()
+
+
+def test_expiry(tmp_path):
+    """Test expired entries are not returned."""
+    cache = media_cache.MetadataCache(
+        str(tmp_path / "cache.db"), ttl=10, ttl_jitter=0
+    )
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=100):
+        cache.set(MOCK_TITLE_ID, MOCK_REGION, _mock_item())
+        cache.set("CUSA00001", MOCK_REGION, _mock_item("CUSA00001"), ttl=100)
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=109):
+        assert cache.get(MOCK_TITLE_ID, MOCK_REGION) is not None
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=110):
+        assert cache.get(MOCK_TITLE_ID, MOCK_REGION) is None
+        assert len(cache) == 1
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=200):
+        cache.purge_expired()
+    assert not cache
+    cache.close()
+
+
+def test_lru_eviction(tmp_path):
+    """Test least recently used entries are evicted."""
+    cache = media_cache.MetadataCache(str(tmp_path / "cache.db"), max_entries=2)
+    for index, title_id in enumerate(("CUSA00001", "CUSA00002")):
+        with patch("pyps4_2ndscreen.media_cache.time.time", return_value=index):
+            cache.set(title_id, MOCK_REGION, _mock_item(title_id))
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=2):
+        assert cache.get("CUSA00001", MOCK_REGION) is not None
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=3):
+        cache.set("CUSA00003", MOCK_REGION, _mock_item("CUSA00003"))
+    assert len(cache) == 2
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=4):
+        assert cache.get("CUSA00002", MOCK_REGION) is None
+        assert cache.get("CUSA00001", MOCK_REGION) is not None
+    cache.clear()
+    assert not cache
+    cache.close()
+
+
+def _last_access(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT last_access FROM titles").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_access_batched(tmp_path):
+    """Test access times are written in batches."""
+    path = str(tmp_path / "cache.db")
+    interval = media_cache.ACCESS_FLUSH_INTERVAL
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=0):
+        cache = media_cache.MetadataCache(path)
+        cache.set(MOCK_TITLE_ID, MOCK_REGION, _mock_item())
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=1):
+        assert cache.get(MOCK_TITLE_ID, MOCK_REGION) is not None
+    assert _last_access(path) == 0
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=interval):
+        assert cache.get_stale(MOCK_TITLE_ID, MOCK_REGION)[0] is not None
+    assert _last_access(path) == interval
+
+    # Recorded access times are written on close.
+    with patch(
+        "pyps4_2ndscreen.media_cache.time.time", return_value=interval + 1
+    ):
+        assert cache.get(MOCK_TITLE_ID, MOCK_REGION) is not None
+    assert _last_access(path) == interval
+    cache.close()
+    assert _last_access(path) == interval + 1
+
+
+def _write_entries(path, start):
+    cache = media_cache.MetadataCache(path)
+    for index in range(start, start + 50):
+        title_id = "CUSA{:05d}".format(index)
+        cache.set(title_id, MOCK_REGION, _mock_item(title_id))
+        cache.get(title_id, MOCK_REGION)
+    cache.close()
+
+
+def test_multi_process(tmp_path):
+    """Test concurrent writers in separate processes."""
+    path = str(tmp_path / "cache.db")
+    processes = [
+        multiprocessing.Process(target=_write_entries, args=(path, start))
+        for start in (0, 50, 100)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+    cache = media_cache.MetadataCache(path)
+    assert len(cache) == 150
+    cache.close()
+
+
+def test_errors(tmp_path):
+    """Test database errors are not raised."""
+    cache = media_cache.MetadataCache(str(tmp_path))
+    assert cache.get(MOCK_TITLE_ID, MOCK_REGION) is None
+    cache.set(MOCK_TITLE_ID, MOCK_REGION, _mock_item())
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_ttl_jitter(tmp_path):
+    """Test expiry of entries cached together is spread out."""
+    cache = media_cache.MetadataCache(
+        str(tmp_path / "cache.db"), ttl=1000, ttl_jitter=0.5
+    )
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=0):
+        for index in range(20):
+            title_id = "CUSA{:05d}".format(index)
+            cache.set(title_id, MOCK_REGION, _mock_item(title_id))
+    expires = [
+        row[0] for row in cache._connection().execute("SELECT expires FROM titles")
+    ]
+    assert all(500 <= value <= 1000 for value in expires)
+    assert len(set(expires)) > 1
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_refresh(tmp_path):
+    """Test stale entries are returned and refreshed in background."""
+    cache = media_cache.MetadataCache(
+        str(tmp_path / "cache.db"), ttl=10, ttl_jitter=0, refresh_jitter=0
+    )
+    assert cache.get_stale(MOCK_TITLE_ID, MOCK_REGION) == (None, False)
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=100):
+        cache.set(MOCK_TITLE_ID, MOCK_REGION, _mock_item())
+    with patch("pyps4_2ndscreen.media_cache.time.time", return_value=105):
+        item, stale = cache.get_stale(MOCK_TITLE_ID, MOCK_REGION)
+    assert item.name == "Netflix"
+    assert not stale
+    item, stale = cache.get_stale(MOCK_TITLE_ID, MOCK_REGION)
+    assert item.name == "Netflix"
+    assert stale
+
+    new_item = ResultItem(MOCK_TITLE_ID, "https://newurl.com", MOCK_DATA)
+    search = mock_coro(return_value=new_item)
+    task = cache.refresh(MOCK_TITLE_ID, MOCK_REGION, search)
+    assert cache.refresh(MOCK_TITLE_ID, "R1", search) is task
+    assert await task is new_item
+    search.assert_awaited_once()
+    assert cache.get(MOCK_TITLE_ID, MOCK_REGION).cover_art == "https://newurl.com"
+    assert not cache._refreshing
+
+    # Failed refresh keeps stale entry.
+    search = mock_coro(side_effect=media_cache.PSDataIncomplete)
+    assert await cache.refresh(MOCK_TITLE_ID, MOCK_REGION, search) is None
+    assert cache.get(MOCK_TITLE_ID, MOCK_REGION) is not None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_limits(tmp_path):
+    """Test background refreshes are limited and delayed by jitter."""
+    cache = media_cache.MetadataCache(
+        str(tmp_path / "cache.db"), refresh_jitter=0.05, refresh_concurrency=2
+    )
+    running = []
+    max_running = []
+
+    async def _search():
+        running.append(1)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return _mock_item()
+
+    with patch(
+        "pyps4_2ndscreen.media_cache.random.uniform", return_value=0.05
+    ) as mock_uniform:
+        start = asyncio.get_event_loop().time()
+        await asyncio.gather(
+            *[
+                cache.refresh("CUSA{:05d}".format(index), MOCK_REGION, _search)
+                for index in range(6)
+            ]
+        )
+    assert asyncio.get_event_loop().time() - start >= 0.05
+    assert call(0, 0.05) in mock_uniform.mock_calls
+    assert max(max_running) == 2
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_async_methods(tmp_path):
+    """Test async methods access database in an executor."""
+    cache = media_cache.MetadataCache(str(tmp_path / "cache.db"))
+    threads = []
+    set_item = cache.set
+
+    def _set(*args):
+        threads.append(threading.get_ident())
+        set_item(*args)
+
+    cache.set = _set
+    await cache.async_set(MOCK_TITLE_ID, MOCK_REGION, _mock_item())
+    assert threads[0] != threading.get_ident()
+    item = await cache.async_get(MOCK_TITLE_ID, MOCK_REGION)
+    assert item.sku_id == MOCK_TITLE_ID
+    item, stale = await cache.async_get_stale(MOCK_TITLE_ID, MOCK_REGION)
+    assert item.sku_id == MOCK_TITLE_ID
+    assert not stale
+    assert await cache.async_get("CUSA00001", MOCK_REGION) is None
+    cache.close()
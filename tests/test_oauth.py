@@ -0,0 +1,111 @@
+"""Tests for pyps4_2ndscreen.oauth."""
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+
+from pyps4_2ndscreen import oauth
+
+pytestmark = pytest.mark.asyncio
+
+MOCK_USER_ID = "1234567890123456789"
+MOCK_URL = "https://remoteplay.dl.playstation.net/remoteplay/redirect?code={}"
+
+
+class _TokenServer:
+    """Local stand-in for PSN token endpoint."""
+
+    def __init__(self):
+        self.token_requests = 0
+        self.account_requests = 0
+        self.peers = set()
+        self._runner = None
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/token", self._handle_token)
+        app.router.add_get("/token/{token}", self._handle_account)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        return "http://127.0.0.1:{}/token".format(self._runner.addresses[0][1])
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _handle_token(self, request):
+        self.token_requests += 1
+        self.peers.add(request.transport.get_extra_info("peername"))
+        code = (await request.post())["code"]
+        if code == "bad":
+            raise web.HTTPBadRequest()
+        # Same token for codes of the same account.
+        return web.json_response(
+            {"access_token": "token-{}".format(code[:3]), "expires_in": 60}
+        )
+
+    async def _handle_account(self, request):
+        self.account_requests += 1
+        self.peers.add(request.transport.get_extra_info("peername"))
+        return web.json_response({"user_id": MOCK_USER_ID})
+
+
+@pytest.fixture(name="token_url")
+async def token_url_fixture():
+    """Start token server and patch token URL."""
+    server = _TokenServer()
+    url = await server.start()
+    oauth.get_account_cache().clear()
+    with patch("pyps4_2ndscreen.oauth.TOKEN_URL", new=url):
+        yield server
+    await oauth.async_close_session()
+    await server.stop()
+    oauth.get_account_cache().clear()
+
+
+async def test_get_user_account(token_url):
+    """Test account is retrieved and cached by token."""
+    account = await oauth.async_get_user_account(MOCK_URL.format("abc1"))
+    assert account["user_id"] == MOCK_USER_ID
+    assert account["credentials"] == oauth._format_user_id(MOCK_USER_ID, "sha256")
+    assert account["user_rpid"] == oauth._format_user_id(MOCK_USER_ID)
+
+    account = await oauth.async_get_user_account(MOCK_URL.format("abc2"))
+    assert account["user_id"] == MOCK_USER_ID
+    assert token_url.token_requests == 2
+    assert token_url.account_requests == 1
+
+    assert await oauth.async_get_user_account(MOCK_URL.format("bad")) is None
+    assert await oauth.async_get_user_account("https://invalid") is None
+
+
+async def test_get_user_accounts(token_url):
+    """Test batch shares one session and yields all results."""
+    urls = [MOCK_URL.format("{:03d}x".format(index)) for index in range(20)]
+    results = [
+        result
+        async for result in oauth.async_get_user_accounts(
+            urls + [urls[0], MOCK_URL.format("bad")], concurrency=4
+        )
+    ]
+    accounts = dict(results)
+    assert len(results) == 21
+    assert accounts[MOCK_URL.format("bad")] is None
+    assert all(accounts[url]["user_id"] == MOCK_USER_ID for url in urls)
+    assert token_url.token_requests == 21
+    assert len(token_url.peers) <= 4
+
+    with pytest.raises(ValueError):
+        async for _ in oauth.async_get_user_accounts(urls, concurrency=0):
+            pass
+
+
+def test_account_cache():
+    """Test cached accounts expire with token."""
+    cache = oauth.AccountCache()
+    cache.set("token", {"user_id": MOCK_USER_ID}, 10)
+    assert cache.get("token") == {"user_id": MOCK_USER_ID}
+    with patch("pyps4_2ndscreen.oauth.time.monotonic", return_value=1e12):
+        assert cache.get("token") is None
+    assert not len(cache)
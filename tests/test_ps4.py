@@ -1,21 +1,28 @@
 """Tests for pyps4_2ndscreen.ps4."""
 
+import asyncio
 import socket
 from unittest.mock import MagicMock, patch
 
 import pytest
 from asynctest import CoroutineMock as mock_coro
 
-from pyps4_2ndscreen import ps4
+from pyps4_2ndscreen import ddp, ps4
+from pyps4_2ndscreen.command_queue import CommandQueue, PendingCommand
 from pyps4_2ndscreen.ddp import (
     DDPProtocol,
-    get_ddp_launch_message,
-    get_ddp_wake_message,
+    get_ddp_launch_bytes,
+    get_ddp_wake_bytes,
 )
+from pyps4_2ndscreen.media_art import ResultItem
+from pyps4_2ndscreen.media_cache import MetadataCache
 
 from .test_ddp import (
     MOCK_CREDS,
     MOCK_DDP_DICT,
+    MOCK_DDP_RESPONSE,
+    MOCK_DDP_RESPONSE_STANDBY,
+    MOCK_RANDOM_PORT,
     MOCK_HOST,
     MOCK_HOST_ID,
     MOCK_HOST_NAME,
@@ -206,6 +213,79 @@ async def test_get_ps_store_data():
         assert result_item is None
 
 
+async def test_get_ps_store_data_cached(tmp_path):
+    """Test title data is served from metadata cache after first lookup."""
+    mock_ps4 = ps4.Ps4Legacy(MOCK_HOST, MOCK_CREDS)
+    mock_ps4.set_metadata_cache(MetadataCache(str(tmp_path / "cache.db")))
+    mock_result = ResultItem(
+        MOCK_TITLE_ID,
+        MOCK_COVER_URL,
+        {"title_name": MOCK_TITLE_NAME, "gameContentTypesList": []},
+    )
+
+    with patch(
+        "pyps4_2ndscreen.ps4.async_search_ps_store",
+        new=mock_coro(return_value=mock_result),
+    ) as mock_call:
+        for _ in range(3):
+            result_item = await mock_ps4.async_get_ps_store_data(
+                MOCK_TITLE_NAME, MOCK_TITLE_ID, MOCK_REGION
+            )
+            assert result_item.name == MOCK_TITLE_NAME
+            assert result_item.cover_art == MOCK_COVER_URL
+        assert len(mock_call.mock_calls) == 1
+    assert mock_ps4.ps_cover == MOCK_COVER_URL
+    mock_ps4.metadata_cache.close()
+
+
+async def test_get_ps_store_data_stale(tmp_path):
+    """Test stale title data is returned and refreshed in background."""
+    mock_ps4 = ps4.Ps4Legacy(MOCK_HOST, MOCK_CREDS)
+    cache = MetadataCache(str(tmp_path / "cache.db"), refresh_jitter=0)
+    mock_ps4.set_metadata_cache(cache, stale_while_revalidate=True)
+    data = {"title_name": MOCK_TITLE_NAME, "gameContentTypesList": []}
+    cache.set(
+        MOCK_TITLE_ID, MOCK_REGION, ResultItem(MOCK_TITLE_ID, MOCK_COVER_URL, data),
+        ttl=-1,
+    )
+    new_url = "https://newurl.com"
+    searched = asyncio.Event()
+
+    async def _search(*args, **kwargs):
+        await searched.wait()
+        return ResultItem(MOCK_TITLE_ID, new_url, data)
+
+    with patch("pyps4_2ndscreen.ps4.async_search_ps_store", new=_search):
+        result_item = await mock_ps4.async_get_ps_store_data(
+            MOCK_TITLE_NAME, MOCK_TITLE_ID, MOCK_REGION
+        )
+        assert result_item.cover_art == MOCK_COVER_URL
+        assert mock_ps4.ps_cover == MOCK_COVER_URL
+        assert len(cache._refreshing) == 1
+        searched.set()
+        await asyncio.gather(*cache._refreshing.values())
+
+    assert cache.get(MOCK_TITLE_ID, MOCK_REGION).cover_art == new_url
+    cache.close()
+
+
+async def test_get_ps_store_data_race():
+    """Test other regions are raced with region if given."""
+    mock_ps4 = ps4.Ps4Legacy(MOCK_HOST, MOCK_CREDS)
+    mock_result = MagicMock()
+    with patch(
+        "pyps4_2ndscreen.ps4.async_search_ps_store_race",
+        new=mock_coro(return_value=mock_result),
+    ) as mock_call:
+        result_item = await mock_ps4.async_get_ps_store_data(
+            MOCK_TITLE_NAME, MOCK_TITLE_ID, MOCK_REGION, race_regions=["Japan"]
+        )
+    assert result_item is mock_result
+    mock_call.assert_awaited_once_with(
+        MOCK_TITLE_ID, [MOCK_REGION, "Japan"], session=None
+    )
+
+
 # ##### Ps4Legacy Tests ######
 
 
@@ -453,7 +533,7 @@ def test_async_launch():
     mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
     mock_ddp = DDPProtocol()
     mock_ddp.send_msg = MagicMock()
-    mock_launch_msg = get_ddp_launch_message(MOCK_CREDS)
+    mock_launch_msg = get_ddp_launch_bytes(MOCK_CREDS)
 
     mock_ps4.launch()
     assert len(mock_ddp.send_msg.mock_calls) == 0
@@ -469,7 +549,7 @@ async def test_async_wakeup():
     mock_ps4.status = MOCK_STANDBY_STATUS
     mock_ddp = DDPProtocol()
     mock_ddp.send_msg = MagicMock()
-    mock_wake_msg = get_ddp_wake_message(MOCK_CREDS)
+    mock_wake_msg = get_ddp_wake_bytes(MOCK_CREDS)
 
     mock_ps4.wakeup()
     assert len(mock_ddp.send_msg.mock_calls) == 0
@@ -547,14 +627,33 @@ async def test_async_start_title():
     mock_tcp = MagicMock()
     mock_tcp.start_title = mock_coro()
     mock_start_id = "CUSA10001"
-    mock_task = ("start_title", mock_start_id, None)
+    mock_task = PendingCommand("start_title", (mock_start_id, None))
 
     await mock_ps4.start_title(mock_start_id, None)
     assert len(mock_tcp.start_title.mock_calls) == 0
-    assert mock_ps4.task_queue == mock_task
+    assert list(mock_ps4.task_queue) == [mock_task]
     assert len(mock_ps4.wakeup.mock_calls) == 1
 
+    # Test multiple commands are queued in order.
+    await mock_ps4.start_title("CUSA10002", None, ttl=10)
+    commands = list(mock_ps4.task_queue)
+    assert len(commands) == 2
+    assert commands[0] == mock_task
+    assert commands[1].args == ("CUSA10002", None)
+    assert commands[1].expires is not None
+    mock_ps4.task_queue.clear()
+
+    # Test command is queued if PS4 is on and connection fails.
     mock_ps4.status = MOCK_DDP_DICT
+    mock_ps4.async_connect = mock_coro()
+    await mock_ps4.start_title(mock_start_id, None)
+    mock_ps4.async_connect.assert_awaited_once_with()
+    assert list(mock_ps4.task_queue) == [
+        PendingCommand("start_title", (mock_start_id, MOCK_TITLE_ID))
+    ]
+    assert len(mock_ps4.wakeup.mock_calls) == 2
+    mock_ps4.task_queue.clear()
+
     mock_ps4.tcp_protocol = mock_tcp
     await mock_ps4.start_title(mock_start_id)
     mock_ps4.tcp_protocol.start_title.assert_called_once_with(
@@ -562,6 +661,15 @@ async def test_async_start_title():
     )
 
 
+def test_async_set_command_queue(tmp_path):
+    """Test command queue is replaced."""
+    mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
+    assert isinstance(mock_ps4.task_queue, CommandQueue)
+    mock_queue = CommandQueue(str(tmp_path / "queue.json"))
+    mock_ps4.set_command_queue(mock_queue)
+    assert mock_ps4.task_queue is mock_queue
+
+
 async def test_async_remote_control():
     """Test Remote Control."""
     mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
@@ -572,14 +680,22 @@ async def test_async_remote_control():
     mock_rc_command = "ps"
     mock_rc_int = ps4.BUTTONS.get("ps")
     mock_hold_time = 0
-    mock_task = ("remote_control", mock_rc_int, mock_hold_time)
+    mock_task = PendingCommand("remote_control", (mock_rc_int, mock_hold_time))
 
     await mock_ps4.remote_control(mock_rc_command)
     assert len(mock_tcp.remote_control.mock_calls) == 0
-    assert mock_ps4.task_queue == mock_task
+    assert list(mock_ps4.task_queue) == [mock_task]
     assert len(mock_ps4.wakeup.mock_calls) == 1
+    mock_ps4.task_queue.clear()
 
+    # Test command is queued if PS4 is on and connection fails.
     mock_ps4.status = MOCK_DDP_DICT
+    mock_ps4.async_connect = mock_coro()
+    await mock_ps4.remote_control(mock_rc_command)
+    mock_ps4.async_connect.assert_awaited_once_with()
+    assert list(mock_ps4.task_queue) == [mock_task]
+    mock_ps4.task_queue.clear()
+
     mock_ps4.tcp_protocol = mock_tcp
     await mock_ps4.remote_control(mock_rc_command)
     mock_ps4.tcp_protocol.remote_control.assert_called_once_with(
@@ -812,3 +928,189 @@ async def test_async_change_ddp_endpoint_errors():
         assert mock_ps4.ddp_protocol == mock_old_protocol
         assert mock_ps4.port == mock_old_port
         assert mock_ps4.ddp_protocol.callbacks[MOCK_HOST][mock_ps4] == MagicMock
+
+
+def _mock_booting_ddp(mock_ps4, boot_polls):
+    """Return DDP protocol that responds OK after number of polls."""
+    mock_ddp = DDPProtocol()
+    mock_ddp._transport = MagicMock()
+    loop = asyncio.get_event_loop()
+    polls = []
+
+    def _sendto(msg, addr):
+        if msg == get_ddp_wake_bytes(MOCK_CREDS):
+            return
+        polls.append(msg)
+        response = MOCK_DDP_RESPONSE_STANDBY
+        if len(polls) > boot_polls:
+            response = MOCK_DDP_RESPONSE
+        loop.call_soon(
+            mock_ddp._handle, response.encode(), (addr[0], MOCK_RANDOM_PORT)
+        )
+
+    mock_ddp._transport.sendto.side_effect = _sendto
+    mock_ps4.set_protocol(mock_ddp)
+    return mock_ddp, polls
+
+
+async def test_async_wake_and_connect():
+    """Test wake and connect probes status and reports timings."""
+    mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
+    mock_ps4.status = MOCK_STANDBY_STATUS
+    mock_ddp, polls = _mock_booting_ddp(mock_ps4, boot_polls=3)
+    mock_cb = MagicMock()
+    mock_ps4.add_callback(mock_cb)
+    mock_tcp = MagicMock()
+    mock_tcp.login = mock_coro()
+
+    async def _connect(auto_login=True):
+        mock_ps4.tcp_protocol = mock_tcp
+        mock_ps4._connected = True
+        mock_ps4._power_on = False
+
+    mock_ps4.async_connect = MagicMock(side_effect=_connect)
+
+    with patch("pyps4_2ndscreen.ps4.PROBE_INTERVAL", 0.01):
+        timings = await mock_ps4.wake_and_connect(timeout=5)
+    assert mock_ps4.is_running
+    assert len(polls) == 4
+    mock_ps4.async_connect.assert_called_once_with(auto_login=False)
+    mock_tcp.login.assert_awaited_once_with(
+        power_on=True, delay=mock_ps4.login_delay
+    )
+    for stage in (
+        ps4.STAGE_WAKEUP,
+        ps4.STAGE_BOOT,
+        ps4.STAGE_CONNECT,
+        ps4.STAGE_LOGIN,
+        ps4.STAGE_TOTAL,
+    ):
+        assert stage in timings
+    assert timings[ps4.STAGE_TOTAL] >= timings[ps4.STAGE_BOOT]
+
+    # Original callback is restored and called.
+    assert mock_ddp.callbacks[MOCK_HOST][mock_ps4] is mock_cb
+    assert mock_cb.mock_calls
+
+
+async def test_async_wake_and_connect_queued():
+    """Test queued commands login instead of wake and connect."""
+    mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
+    mock_ps4.status = MOCK_DDP_DICT
+    mock_ddp, _ = _mock_booting_ddp(mock_ps4, boot_polls=0)
+    mock_tcp = MagicMock()
+    mock_tcp.login = mock_coro()
+
+    async def _connect(auto_login=True):
+        mock_ps4.tcp_protocol = mock_tcp
+        mock_ps4._connected = True
+
+    mock_ps4.async_connect = MagicMock(side_effect=_connect)
+    mock_ps4.task_queue.put("start_title", "CUSA00001", None)
+    timings = await mock_ps4.wake_and_connect()
+    assert ps4.STAGE_WAKEUP not in timings
+    assert ps4.STAGE_LOGIN not in timings
+    assert not mock_tcp.login.mock_calls
+    assert MOCK_HOST not in mock_ddp.callbacks
+
+    # Test login if queued commands have expired.
+    mock_ps4.task_queue.clear()
+    mock_ps4.task_queue.put("start_title", "CUSA00001", None, ttl=-1)
+    mock_ps4._connected = False
+    timings = await mock_ps4.wake_and_connect()
+    assert ps4.STAGE_LOGIN in timings
+    assert len(mock_tcp.login.mock_calls) == 1
+
+
+async def test_async_wake_and_connect_errors():
+    """Test wake and connect errors."""
+    mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
+    with pytest.raises(ps4.NotReady):
+        await mock_ps4.wake_and_connect()
+
+    # Test timeout while booting.
+    mock_ps4.status = MOCK_STANDBY_STATUS
+    _mock_booting_ddp(mock_ps4, boot_polls=100)
+    with pytest.raises(ps4.NotReady):
+        await mock_ps4.wake_and_connect(timeout=0.3)
+
+    # Test connection refused.
+    mock_ps4.status = MOCK_DDP_DICT
+    mock_ps4.async_connect = mock_coro()
+    with pytest.raises(ps4.NotReady):
+        await mock_ps4.wake_and_connect()
+
+
+async def test_async_wake_and_connect_unanswered():
+    """Test unanswered probes back off and do not broadcast."""
+    mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
+    mock_ps4.status = MOCK_STANDBY_STATUS
+    mock_ddp = DDPProtocol(max_polls=1)
+    mock_ddp._transport = MagicMock()
+    mock_ps4.set_protocol(mock_ddp)
+    mock_cb = MagicMock()
+    mock_ps4.add_callback(mock_cb)
+
+    ddp.update_host(MOCK_HOST_ID, MOCK_HOST)
+    with patch(
+        "pyps4_2ndscreen.ps4.PROBE_INTERVAL", 0.01
+    ), pytest.raises(ps4.NotReady):
+        await mock_ps4.wake_and_connect(timeout=0.5)
+    sent = mock_ddp._transport.sendto.call_args_list
+    assert len(sent) < 15
+    assert all(call[0][1][0] == MOCK_HOST for call in sent)
+    assert mock_ps4.status == MOCK_STANDBY_STATUS
+    assert not mock_cb.mock_calls
+
+
+async def test_prefetch_title_changed():
+    """Test store data is fetched when running title changes."""
+    mock_ps4 = ps4.Ps4Async(MOCK_HOST, MOCK_CREDS)
+    mock_ddp = DDPProtocol()
+    mock_ddp._transport = MagicMock()
+    mock_ps4.set_protocol(mock_ddp)
+    started = []
+    release = asyncio.Event()
+
+    async def _search(title_id, region, session=None):
+        started.append(title_id)
+        await release.wait()
+        return ResultItem(
+            title_id, MOCK_COVER_URL, {"title_name": MOCK_TITLE_NAME}
+        )
+
+    def _callback():
+        # Lookup is already running when callback is called.
+        if mock_ps4.prefetch_region is not None:
+            assert mock_ps4._prefetch_task is not None
+
+    mock_ps4.add_callback(_callback)
+    addr = (MOCK_HOST, MOCK_RANDOM_PORT)
+
+    # Disabled by default.
+    mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), addr)
+    assert mock_ps4._prefetch_task is None
+
+    mock_ps4.set_prefetch(MOCK_REGION)
+    mock_ps4.status = None
+    with patch("pyps4_2ndscreen.ps4.async_search_ps_store", new=_search):
+        mock_ddp._handle(MOCK_DDP_RESPONSE.encode(), addr)
+        task = mock_ps4._prefetch_task
+        await asyncio.sleep(0)
+        assert started == [MOCK_TITLE_ID]
+
+        # Same title is not fetched again.
+        assert mock_ps4.title_changed(MOCK_TITLE_ID) is task
+
+        # New title cancels previous fetch.
+        new_task = mock_ps4.title_changed("CUSA00001")
+        await asyncio.sleep(0)
+        assert task.cancelled()
+        assert started == [MOCK_TITLE_ID, "CUSA00001"]
+        release.set()
+        await new_task
+    assert mock_ps4.ps_cover == MOCK_COVER_URL
+    assert mock_ps4.ps_name == MOCK_TITLE_NAME
+
+    mock_ps4.set_prefetch(None)
+    assert mock_ps4.title_changed("CUSA00002") is None